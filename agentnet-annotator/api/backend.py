@@ -3,6 +3,7 @@
 import os
 import signal
 import sys
+import multiprocessing
 from flask import Flask
 from flask_cors import CORS
 from flask_socketio import SocketIO
@@ -205,4 +206,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Clip rendering workers are spawned processes, required for the packaged app
+    multiprocessing.freeze_support()
     main()
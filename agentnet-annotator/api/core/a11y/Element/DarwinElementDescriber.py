@@ -1,14 +1,17 @@
-import math
-import statistics
-
 from numpy import mean
 
+from . import DarwinScoring
+from .DarwinScoring import (
+    ANCESTOR_CHILD_KEYS,
+    CHILD_KEYS,
+    POSITION_WEIGHT,
+    SEMANTIC_WEIGHT,
+    SIBLING_WEIGHT,
+    area_score,
+)
+from .LiteralParser import parse_literal
 from .UIElementDescriber import UIElementDescriber
 
-MAX_AREA = 1920 * 1020 / 2  # 最大面积
-MIN_AREA = 1000       # 最小面积
-POSITION_HIT_B = math.exp(math.log(MAX_AREA / MIN_AREA) / 1)
-
 
 class DarwinElementDescriber(UIElementDescriber):
     def __init__(self, x, y):
@@ -33,7 +36,7 @@ class DarwinElementDescriber(UIElementDescriber):
 
     def build_from_json(self, data, rule="bounding"):
         if (isinstance(data, str)):
-            data = eval(data)
+            data = parse_literal(data)
             if (not isinstance(data, dict)):
                 return self
         if data.get("AXFocusableAncestor", data.get("AXHighestEditableAncestor", None)) != None:
@@ -44,14 +47,10 @@ class DarwinElementDescriber(UIElementDescriber):
             data.pop("AXHighestEditableAncestor", None)
             new_json["AXFrame"] = new_json.get(
                 "AXFrame", data.get("AXFrame", None))
-            if new_json.get("AXRows", None) != None:
-                new_json["AXRows"].append(data)
-            elif new_json.get("AXVisibleChildren", None) != None:
-                new_json["AXVisibleChildren"].append(data)
-            elif new_json.get("AXChildrenInNavigationOrder", None) != None:
-                new_json["AXChildrenInNavigationOrder"].append(data)
-            elif new_json.get("AXChildren", None) != None:
-                new_json["AXChildren"].append(data)
+            for key in ANCESTOR_CHILD_KEYS:
+                if new_json.get(key, None) != None:
+                    new_json[key].append(data)
+                    break
             else:
                 new_json["AXChildren"] = [data]
             new_node.build_from_json(new_json, rule)
@@ -74,21 +73,9 @@ class DarwinElementDescriber(UIElementDescriber):
         self.semantic_attrs = [attr for attr in self.attrs if attr in [
             "value", "title", "description", "role", "subrole", "role_description", "orientation"
         ] and isinstance(getattr(self, attr), str) and "ax" not in getattr(self, attr).lower()]
-        if "AXChildrenInNavigationOrder" in data:
-            self.build_children(children_json=data.get(
-                "AXChildrenInNavigationOrder"), rule=rule)
-        if "AXVisibleChildren" in data:
-            self.build_children(children_json=data.get(
-                "AXVisibleChildren"), rule=rule)
-        if "AXRows" in data:
-            self.build_children(children_json=data.get(
-                "AXRows"), rule=rule)
-        if "AXChildren" in data:
-            self.build_children(children_json=data.get(
-                "AXChildren"), rule=rule)
-        if "AXColumns" in data:
-            self.build_children(children_json=data.get(
-                "AXColumns"), rule=rule)
+        for key in CHILD_KEYS:
+            if key in data:
+                self.build_children(children_json=data.get(key), rule=rule)
         # if "AXChildrenInNavigationOrder" in data or "AXVisibleChildren" in data or "AXRows" in data or "AXChildren" in data:
         #     self.build_children(children_json=data.get("AXChildren", data.get(
         #         "AXChildrenInNavigationOrder", data.get("AXVisibleChildren", data.get("AXRows", [])))), rule="bounding")
@@ -119,7 +106,7 @@ class DarwinElementDescriber(UIElementDescriber):
                     else:
                         child_frame = child_json.get("AXFrame", None)
                         if isinstance(child_frame, str):
-                            child_frame = eval(child_frame)
+                            child_frame = parse_literal(child_frame)
                         nearesr_ancestor_rect = self.get_nearest_ancestor_rect()
                         if child_frame.get("x", None) == None:
                             child_frame.update(
@@ -182,7 +169,11 @@ class DarwinElementDescriber(UIElementDescriber):
 
     def calculate_score(self):
         self.vote_by_heuristic_rules(
-            [(self.similar_sibling_score, 1), (self.position_hit, 1), (self.has_semantic_info, 2)])
+            [
+                (self.similar_sibling_score, SIBLING_WEIGHT),
+                (self.position_hit, POSITION_WEIGHT),
+                (self.has_semantic_info, SEMANTIC_WEIGHT),
+            ])
         for child in self.children:
             child.calculate_score()
 
@@ -264,86 +255,34 @@ class DarwinElementDescriber(UIElementDescriber):
         for sibling in siblings:
             if sibling is not self and self.is_similar_to(sibling):
                 count += 1
-        final_score = min(count / length, 1.0)*10
-        if self.children == [] and len(self.parent.children) > 5:
-            # 结构太单薄而相似，惩罚20%
-            final_score *= 0.75
-        if self.parent.similar_sibling_score_cache and self.parent.similar_sibling_score_cache > 2:
-            # 父节点的相似度分数较高，子组件也要继承其80%的分数
-            final_score += self.parent.similar_sibling_score_cache * 0.75
+        final_score = DarwinScoring.sibling_score(
+            count, length, self.children == [], self.parent.similar_sibling_score_cache)
         self.similar_sibling_score_cache = final_score
         return final_score
 
     def layout_type(self):
-        if len(self.children) < 2:
-            return "unknown"
-
-        # 提取子节点的坐标和尺寸
-        x_coords = [child.rect['x'] for child in self.children if child.rect]
-        y_coords = [child.rect['y'] for child in self.children if child.rect]
-        widths = [child.rect['w'] for child in self.children if child.rect]
-        heights = [child.rect['h'] for child in self.children if child.rect]
-
-        # 计算 x 和 y 坐标的标准差
-        try:
-            std_x = statistics.stdev(x_coords)
-            std_y = statistics.stdev(y_coords)
-        except:
-            return "unknown"
-
-        # 设置容差值，例如屏幕坐标的5%
-        tolerance = 0.05 * max(widths + heights)
-
-        # 确定坐标相似度较高的方向
-        if std_y < std_x:  # y 坐标更一致，可能是横向布局
-            # 检查 x 坐标是否大致递增
-            if all(x_coords[i] + widths[i] <= x_coords[i + 1] + tolerance for i in range(len(x_coords) - 1)):
-                return "horizontal"
-        elif std_x < std_y:  # x 坐标更一致，可能是竖向布局
-            # 检查 y 坐标是否大致递增
-            if all(y_coords[i] + heights[i] <= y_coords[i + 1] + tolerance for i in range(len(y_coords) - 1)):
-                return "vertical"
-
-        return "unknown"
+        return DarwinScoring.layout_type([child.rect for child in self.children])
 
     def position_hit(self):
         if not self.rect:
             return 0  # 如果没有矩形信息，返回0分
 
         rect_x, rect_y, rect_w, rect_h = self.rect['x'], self.rect['y'], self.rect['w'], self.rect['h']
-        area = rect_w * rect_h
-        score = 0
         # 判断点击位置是否在元素内部
         if rect_x <= self.x <= rect_x + rect_w and rect_y <= self.y <= rect_y + rect_h:
-            if area < MIN_AREA:  # 面积小于最小面积，直接得满分
-                score = 10
-            else:
-                # 计算对数分数
-                score = 10 * math.log(MAX_AREA / area, POSITION_HIT_B)
-        else:
-            # 如果命中父节点
-            if self.parent and self.parent.position_hit() != 0:
-                tmp_layout_type = self.parent.layout_type()
-                if tmp_layout_type == "horizontal":
-                    # 如果是水平布局，则只要命中x坐标即可
-                    if rect_x <= self.x <= rect_x + rect_w:
-                        if area < MIN_AREA:
-                            score = 10
-                        else:
-                            score = 10 * \
-                                math.log(MAX_AREA / area, POSITION_HIT_B)
-                elif tmp_layout_type == "vertical":
-                    # 如果是垂直布局，则只要命中y坐标即可
-                    if rect_y <= self.y <= rect_y + rect_h:
-                        if area < MIN_AREA:
-                            score = 10
-                        else:
-                            score = 10 * \
-                                math.log(MAX_AREA / area, POSITION_HIT_B)
-            else:
-                score = 0
-
-        return min(max(score, 0), 10)  # 确保分数在0到10分之间
+            return area_score(self.rect)
+        # 如果命中父节点
+        if self.parent and self.parent.position_hit() != 0:
+            tmp_layout_type = self.parent.layout_type()
+            if tmp_layout_type == "horizontal":
+                # 如果是水平布局，则只要命中x坐标即可
+                if rect_x <= self.x <= rect_x + rect_w:
+                    return area_score(self.rect)
+            elif tmp_layout_type == "vertical":
+                # 如果是垂直布局，则只要命中y坐标即可
+                if rect_y <= self.y <= rect_y + rect_h:
+                    return area_score(self.rect)
+        return 0
 
 
 if __name__ == "__main__":
@@ -0,0 +1,325 @@
+import math
+
+import numpy as np
+
+from . import DarwinScoring
+from .DarwinScoring import (
+    ANCESTOR_CHILD_KEYS,
+    CHILD_KEYS,
+    POSITION_WEIGHT,
+    SEMANTIC_WEIGHT,
+    SIBLING_WEIGHT,
+    area_score,
+)
+from .LiteralParser import parse_literal
+from .SiblingSimilarity import attr_mask, similar_sibling_counts
+
+# attributes of every built describer, see DarwinElementDescriber.attrs
+BASE_ATTRS = ("similarity_cache", "x", "y", "semantic_attrs", "size")
+# semantic attributes in the order of DarwinElementDescriber.semantic_attrs
+SEMANTIC_ATTRS = ("value", "role", "role_description", "orientation", "title", "description")
+# score rounding slack of the upper bounds
+EPSILON = 1e-9
+
+
+class DarwinElementIndex:
+    """
+    Element dump flattened into arrays, to resolve the target of a click
+    without building and scoring a DarwinElementDescriber tree.
+
+    The nodes are the describers build_from_json(rule="general") would
+    build, and the target is the one find_most_score_node would pick after
+    calculate_score, ties going to the first node in preorder. Everything
+    independent of the click is computed once per dump. A click only
+    computes the position hits of the nodes whose frame holds it and of
+    their aligned children, then scores nodes best first by an upper bound,
+    computing the sibling similarity of the few that can still win.
+    """
+
+    def __init__(self, data: dict):
+        self.parent = []
+        self.children = []
+        self.attrs = []
+        self.rect = []
+        self.sem = []
+        self.semantic = []
+
+        root = self._build(data, -1, False)
+        if self.parent[root] != -1:
+            # the root was hoisted under its focusable ancestor
+            root = self.parent[root]
+        self.root = root
+
+        # the scored nodes, in preorder
+        self.order = []
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            self.order.append(node)
+            stack.extend(reversed(self.children[node]))
+        self.preorder = {node: idx for idx, node in enumerate(self.order)}
+        self._check_rects()
+
+        rects = [self.rect[node] for node in self.order]
+        self.x0 = np.array([rect["x"] if rect else np.nan for rect in rects], dtype=float)
+        self.y0 = np.array([rect["y"] if rect else np.nan for rect in rects], dtype=float)
+        self.x1 = self.x0 + np.array([rect["w"] if rect else np.nan for rect in rects], dtype=float)
+        self.y1 = self.y0 + np.array([rect["h"] if rect else np.nan for rect in rects], dtype=float)
+        self.sem_score = np.array([self.sem[node] * SEMANTIC_WEIGHT for node in self.order], dtype=float)
+
+        self.sib_cache = {}
+        self.similar_cache = {}
+        self.layout_cache = {}
+        self.sib_bound = self._sibling_bounds()
+
+    def _new_node(self, parent: int) -> int:
+        # a describer left as constructed: "" title and description, no rect
+        self.parent.append(parent)
+        self.children.append([])
+        self.attrs.append(None)
+        self.rect.append(None)
+        self.sem.append(2)
+        self.semantic.append({})
+        return len(self.parent) - 1
+
+    def _build(self, data, parent: int, is_child: bool) -> int:
+        """
+        Mirror of DarwinElementDescriber.build_from_json, without changing data
+        """
+        node = self._new_node(parent)
+        if isinstance(data, str):
+            data = parse_literal(data)
+            if not isinstance(data, dict):
+                return node
+        ancestor = data.get("AXFocusableAncestor", data.get("AXHighestEditableAncestor", None))
+        if ancestor != None:
+            data = {
+                key: value
+                for key, value in data.items()
+                if key not in ("AXFocusableAncestor", "AXHighestEditableAncestor")
+            }
+            new_json = dict(ancestor)
+            new_json["AXFrame"] = new_json.get("AXFrame", data.get("AXFrame", None))
+            for key in ANCESTOR_CHILD_KEYS:
+                if new_json.get(key, None) != None:
+                    new_json[key] = new_json[key] + [data]
+                    break
+            else:
+                new_json["AXChildren"] = [data]
+            self.parent[node] = self._build(new_json, -1, False)
+            return node
+
+        title = data.get("AXTitle", None)
+        description = data.get("AXDescription", None) or data.get("AXHelp", None)
+        rect = data.get("AXFrame", None)
+        if isinstance(rect, str):
+            rect = parse_literal(rect)
+        if rect and "left" in rect:  # Windows
+            rect = dict(rect)
+            rect["x"] = rect["left"]
+            rect["y"] = rect["top"]
+            rect["w"] = rect["right"] - rect["left"]
+            rect["h"] = rect["bottom"] - rect["top"]
+        # raises on frames without a size, like the describer
+        size = rect["w"] * rect["h"] if rect else 0
+        values = {
+            "value": data.get("AXValue", None),
+            "role": data.get("AXRole", None),
+            "role_description": data.get("AXRoleDescription", None),
+            "enabled": data.get("AXEnabled", None),
+            "orientation": data.get("AXOrientation", None),
+            "title": title,
+            "description": description,
+            "rect": rect,
+            "size": size,
+            "subrule": data.get("AXSubrole", None),
+        }
+        attrs = set(BASE_ATTRS)
+        if is_child:
+            attrs.update(("parent", "index"))
+        attrs.update(name for name, value in values.items() if value != None)
+        self.attrs[node] = frozenset(attrs)
+        self.rect[node] = rect
+        self.sem[node] = sum(
+            values[name] != None
+            for name in ("title", "description", "role", "role_description", "value")
+        )
+        self.semantic[node] = {
+            name: values[name]
+            for name in SEMANTIC_ATTRS
+            if isinstance(values[name], str) and "ax" not in values[name].lower()
+        }
+
+        for key in CHILD_KEYS:
+            if key in data:
+                self.children[node] = [
+                    self._build(child, node, True) for child in data[key]
+                ]
+        return node
+
+    def _check_rects(self):
+        # position_hit reads the frame of every scored node
+        for node in self.order:
+            rect = self.rect[node]
+            if rect and any(rect[key] is None for key in ("x", "y", "w", "h")):
+                raise TypeError(f"Incomplete AXFrame: {rect}")
+
+    def _eligible(self, node: int) -> bool:
+        # only nodes with attributes and a frame can be similar
+        return bool(self.attrs[node]) and bool(self.rect[node])
+
+    def _similar_counts(self, parent: int) -> dict:
+        """
+        is_similar_to counts of the children of parent, from one batch pass
+        """
+        if parent not in self.similar_cache:
+            children = self.children[parent]
+            counts = similar_sibling_counts(
+                [attr_mask(self.attrs[child]) if self.attrs[child] else 0 for child in children],
+                [self.rect[child]["w"] if self.rect[child] else math.nan for child in children],
+                [self.rect[child]["h"] if self.rect[child] else math.nan for child in children],
+            )
+            self.similar_cache[parent] = {
+                child: int(count) for child, count in zip(children, counts)
+            }
+        return self.similar_cache[parent]
+
+    def _inherited(self, node: int):
+        """
+        similar_sibling_score_cache of the parent of node when node is
+        scored, None for the root and for parents outside of the scored tree
+        """
+        parent = self.parent[node]
+        if parent == -1 or parent not in self.preorder or self.parent[parent] == -1:
+            return None
+        return self.sibling_score(parent)
+
+    def sibling_score(self, node: int):
+        """
+        DarwinElementDescriber.similar_sibling_score
+        """
+        if node in self.sib_cache:
+            return self.sib_cache[node]
+        parent = self.parent[node]
+        if parent == -1 or self.children[parent] == []:
+            self.sib_cache[node] = False
+            return False
+        siblings = self.children[parent]
+        length = len(siblings)
+        # nodes outside of the children of their parent are never eligible
+        count = self._similar_counts(parent).get(node, 0)
+        final_score = DarwinScoring.sibling_score(
+            count, length, self.children[node] == [], self._inherited(node)
+        )
+        self.sib_cache[node] = final_score
+        return final_score
+
+    def _sibling_bounds(self) -> np.ndarray:
+        """
+        Upper bound of sibling_score for every scored node, counting every
+        eligible sibling as similar
+        """
+        eligible_num = {}
+        bounds = {}
+        for node in self.order:
+            parent = self.parent[node]
+            if parent == -1 or self.children[parent] == []:
+                bounds[node] = 0.0
+                continue
+            siblings = self.children[parent]
+            if parent not in eligible_num:
+                eligible_num[parent] = sum(self._eligible(sibling) for sibling in siblings)
+            count = eligible_num[parent] - 1 if self._eligible(node) else 0
+            # the parent comes first in preorder
+            inherited = None
+            if parent in bounds and self.parent[parent] != -1:
+                inherited = bounds[parent]
+            bounds[node] = DarwinScoring.sibling_score(
+                count, len(siblings), self.children[node] == [], inherited
+            )
+        return np.array([bounds[node] for node in self.order], dtype=float)
+
+    def layout_type(self, node: int) -> str:
+        """
+        DarwinElementDescriber.layout_type
+        """
+        if node not in self.layout_cache:
+            self.layout_cache[node] = DarwinScoring.layout_type(
+                [self.rect[child] for child in self.children[node]]
+            )
+        return self.layout_cache[node]
+
+    def _position_hits(self, x, y) -> dict:
+        """
+        Non-zero DarwinElementDescriber.position_hit scores of a click, by node
+        """
+        inside = np.flatnonzero(
+            (self.x0 <= x) & (x <= self.x1) & (self.y0 <= y) & (y <= self.y1)
+        )
+        hits = {}
+        for idx in inside:
+            node = self.order[idx]
+            score = area_score(self.rect[node])
+            if score != 0:
+                hits[node] = score
+
+        # children outside of the click score when their parent is hit and
+        # they line up with the click along the layout of the parent
+        inside_nodes = {self.order[idx] for idx in inside}
+        stack = list(hits)
+        while stack:
+            parent = stack.pop()
+            layout = None
+            for child in self.children[parent]:
+                rect = self.rect[child]
+                if not rect or child in inside_nodes:
+                    continue
+                if layout is None:
+                    layout = self.layout_type(parent)
+                if layout == "horizontal":
+                    aligned = rect["x"] <= x <= rect["x"] + rect["w"]
+                elif layout == "vertical":
+                    aligned = rect["y"] <= y <= rect["y"] + rect["h"]
+                else:
+                    break
+                if aligned:
+                    score = area_score(rect)
+                    if score != 0 and child not in hits:
+                        hits[child] = score
+                        stack.append(child)
+        return hits
+
+    def score(self, node: int, position: float) -> float:
+        score = 0
+        score += self.sibling_score(node) * SIBLING_WEIGHT
+        score += position * POSITION_WEIGHT
+        score += self.sem[node] * SEMANTIC_WEIGHT
+        return score
+
+    def resolve(self, x, y) -> int:
+        """
+        Node of the target of a click at (x, y)
+        """
+        hits = self._position_hits(x, y)
+        bounds = self.sib_bound + self.sem_score
+        for node, position in hits.items():
+            bounds[self.preorder[node]] += position
+        candidates = np.lexsort((np.arange(len(self.order)), -bounds))
+
+        best, best_score = None, None
+        for idx in candidates:
+            if best is not None and bounds[idx] + EPSILON < best_score:
+                break
+            node = self.order[idx]
+            score = self.score(node, hits.get(node, 0))
+            if best is None or score > best_score or (
+                score == best_score and idx < self.preorder[best]
+            ):
+                best, best_score = node, score
+        return best
+
+    def to_dict(self, node: int) -> dict:
+        return dict(self.semantic[node])
+
+    def target(self, x, y) -> dict:
+        return self.to_dict(self.resolve(x, y))
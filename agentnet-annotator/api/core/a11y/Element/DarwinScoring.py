@@ -0,0 +1,85 @@
+import math
+import statistics
+
+MAX_AREA = 1920 * 1020 / 2  # 最大面积
+MIN_AREA = 1000       # 最小面积
+POSITION_HIT_B = math.exp(math.log(MAX_AREA / MIN_AREA) / 1)
+
+# weights of the similar sibling, position hit and semantic info scores
+SIBLING_WEIGHT = 1
+POSITION_WEIGHT = 1
+SEMANTIC_WEIGHT = 2
+
+# the child lists an element is built from, the last one present wins
+CHILD_KEYS = (
+    "AXChildrenInNavigationOrder",
+    "AXVisibleChildren",
+    "AXRows",
+    "AXChildren",
+    "AXColumns",
+)
+# the lists a hoisted ancestor takes the element into, the first one present wins
+ANCESTOR_CHILD_KEYS = ("AXRows", "AXVisibleChildren", "AXChildrenInNavigationOrder", "AXChildren")
+
+
+def area_score(rect: dict) -> float:
+    """
+    Position hit score of a frame holding the click, 10 for small frames
+    down to 0 for frames of MAX_AREA and more
+    """
+    area = rect["w"] * rect["h"]
+    if area < MIN_AREA:
+        return 10
+    return min(max(10 * math.log(MAX_AREA / area, POSITION_HIT_B), 0), 10)
+
+
+def layout_type(rects: list) -> str:
+    """
+    "horizontal", "vertical" or "unknown" layout of the children frames,
+    None for children without a frame
+    """
+    if len(rects) < 2:
+        return "unknown"
+
+    # 提取子节点的坐标和尺寸
+    x_coords = [rect['x'] for rect in rects if rect]
+    y_coords = [rect['y'] for rect in rects if rect]
+    widths = [rect['w'] for rect in rects if rect]
+    heights = [rect['h'] for rect in rects if rect]
+
+    # 计算 x 和 y 坐标的标准差
+    try:
+        std_x = statistics.stdev(x_coords)
+        std_y = statistics.stdev(y_coords)
+    except Exception:
+        return "unknown"
+
+    # 设置容差值，例如屏幕坐标的5%
+    tolerance = 0.05 * max(widths + heights)
+
+    # 确定坐标相似度较高的方向
+    if std_y < std_x:  # y 坐标更一致，可能是横向布局
+        # 检查 x 坐标是否大致递增
+        if all(x_coords[i] + widths[i] <= x_coords[i + 1] + tolerance for i in range(len(x_coords) - 1)):
+            return "horizontal"
+    elif std_x < std_y:  # x 坐标更一致，可能是竖向布局
+        # 检查 y 坐标是否大致递增
+        if all(y_coords[i] + heights[i] <= y_coords[i + 1] + tolerance for i in range(len(y_coords) - 1)):
+            return "vertical"
+
+    return "unknown"
+
+
+def sibling_score(count: int, sibling_num: int, is_leaf: bool, inherited) -> float:
+    """
+    Similar sibling score of an element with count similar siblings out of
+    sibling_num, inherited being the score of its parent
+    """
+    final_score = min(count / sibling_num, 1.0) * 10
+    if is_leaf and sibling_num > 5:
+        # 结构太单薄而相似，惩罚20%
+        final_score *= 0.75
+    if inherited and inherited > 2:
+        # 父节点的相似度分数较高，子组件也要继承其80%的分数
+        final_score += inherited * 0.75
+    return final_score
@@ -0,0 +1,31 @@
+import ast
+import copy
+import json
+from functools import lru_cache
+
+# distinct strings kept parsed, recordings repeat the same frames
+CACHE_SIZE = 1024
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _parse(text: str):
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text.strip())
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError) as e:
+        raise ValueError(f"Not a literal: {text[:80]!r}") from e
+
+
+def parse_literal(text: str):
+    """
+    Value of a stringified dict, list or frame of a legacy recording, like
+    eval but without running code: JSON first, then Python literals.
+    Repeated strings are parsed once, every caller gets its own copy.
+    """
+    value = _parse(text)
+    if isinstance(value, (dict, list)):
+        return copy.deepcopy(value)
+    return value
@@ -0,0 +1,82 @@
+import threading
+
+import numpy as np
+
+# rows of the pairwise matrices computed at once
+BLOCK_SIZE = 512
+SIZE_TOLERANCE = 0.1
+SIMILARITY_THRESHOLD = 0.75
+
+_attr_bits = {}
+_attr_bits_lock = threading.Lock()
+
+# popcount of every byte, for numpy without bitwise_count
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def attr_mask(attrs) -> int:
+    """
+    Bitmask of a collection of attribute names, one bit per name
+    """
+    mask = 0
+    for name in attrs:
+        bit = _attr_bits.get(name)
+        if bit is None:
+            with _attr_bits_lock:
+                bit = _attr_bits.setdefault(name, len(_attr_bits))
+            if bit >= 64:
+                raise ValueError(f"Too many attribute names for a 64 bit mask: {name}")
+        mask |= 1 << bit
+    return mask
+
+
+def _popcount(masks: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(masks)
+    counts = _BYTE_POPCOUNT[masks.view(np.uint8)]
+    return counts.reshape(masks.shape + (8,)).sum(axis=-1)
+
+
+def similar_sibling_counts(masks, widths, heights) -> np.ndarray:
+    """
+    For every sibling, how many of the others DarwinElementDescriber.is_similar_to
+    finds similar, in one NumPy pass over the sibling group.
+
+    masks are the attr_mask of the siblings, 0 for a sibling without attrs,
+    widths and heights are NaN for a sibling without a rect. Such siblings
+    are never similar. Matches is_similar_to exactly: the composition is the
+    Jaccard index of the attribute sets, the rect similarity compares sizes
+    with a 10% tolerance, and their mean has to reach 0.75.
+    """
+    masks = np.asarray(masks, dtype=np.uint64)
+    widths = np.asarray(widths, dtype=float)
+    heights = np.asarray(heights, dtype=float)
+    counts = np.zeros(len(masks), dtype=np.int64)
+
+    eligible = np.flatnonzero((masks != 0) & ~np.isnan(widths) & ~np.isnan(heights))
+    if len(eligible) < 2:
+        return counts
+    masks, widths, heights = masks[eligible], widths[eligible], heights[eligible]
+
+    for start in range(0, len(eligible), BLOCK_SIZE):
+        rows = slice(start, start + BLOCK_SIZE)
+        row_masks = masks[rows, None]
+        composition = _popcount(row_masks & masks) / _popcount(row_masks | masks)
+
+        row_widths, row_heights = widths[rows, None], heights[rows, None]
+        w_distance = np.abs(row_widths - widths) / np.maximum(
+            np.maximum(row_widths, widths), 1
+        )
+        h_distance = np.abs(row_heights - heights) / np.maximum(
+            np.maximum(row_heights, heights), 1
+        )
+        w_similarity = np.maximum(0, 1 - w_distance / SIZE_TOLERANCE)
+        h_similarity = np.maximum(0, 1 - h_distance / SIZE_TOLERANCE)
+        rect_similarity = (w_similarity + h_similarity) / 2
+
+        similar = (composition + rect_similarity) / 2 >= SIMILARITY_THRESHOLD
+        # a sibling is not compared with itself
+        block_rows = np.arange(similar.shape[0])
+        similar[block_rows, block_rows + start] = False
+        counts[eligible[rows]] = similar.sum(axis=1)
+    return counts
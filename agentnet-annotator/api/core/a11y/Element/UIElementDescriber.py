@@ -1,6 +1,8 @@
 import abc
 from abc import abstractmethod
 
+from .LiteralParser import parse_literal
+
 
 class UIElementDescriber(abc.ABC):
     title = ""
@@ -26,7 +28,7 @@ class UIElementDescriber(abc.ABC):
         self.description = json.get("description", None)
         self.rect = json.get("rect", None)
         if (isinstance(self.rect, str)):
-            self.rect = eval(self.rect)
+            self.rect = parse_literal(self.rect)
         if self.rect and "left" in self.rect:  # Windows
             self.rect['x'] = self.rect['left']
             self.rect['y'] = self.rect['top']
@@ -1,7 +1,10 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 import sys
 
+from .focus import FocusSource, PollingFocusSource
+
 if sys.platform == "darwin":
     from . import _darwin as impl
 elif sys.platform == "linux":
@@ -12,8 +15,8 @@ else:
     raise Exception(f"Unsupported platform: {sys.platform}")
 
 
-def get_accessibility_tree():
-    return impl.get_accessibility_tree()
+def get_accessibility_tree(token=None):
+    return impl.get_accessibility_tree(token)
 
 def get_active_window_data(
     include_window_data: bool = True,
@@ -74,9 +77,44 @@ def parse_element(element: dict, x: float, y: float):
     return impl.parse_element(element, x, y)
 
 
+def parse_elements(element: dict, points: list) -> list:
+    return impl.parse_elements(element, points)
+
+
+def parse_element_batches(batches: list, workers: int = 4) -> list:
+    """
+    Targets of [(element, points), ...], a list of targets per element.
+    Every element is built once for all of its clicks, and the elements
+    are resolved on a pool of workers.
+    """
+    if len(batches) <= 1 or workers <= 1:
+        return [parse_elements(element, points) for element, points in batches]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="parse-element") as executor:
+        return list(executor.map(lambda batch: parse_elements(*batch), batches))
+
+
 def get_top_window():
     return impl.get_top_window()
 
 
 def get_top_window_name():
     return impl.get_top_window_name()
+
+
+def get_foreground_key():
+    """
+    Cheap identity of the foreground window, to tell when the top window
+    queries above have to be run again
+    """
+    return impl.get_foreground_key()
+
+
+def create_focus_source(mode: str = "poll") -> FocusSource:
+    """
+    "push": OS focus change notifications where the platform has them
+    (Windows), "poll": read the top window every 200ms. macOS polls the
+    focused app pid and reads the name when it changes.
+    """
+    if mode == "push" and hasattr(impl, "PushFocusSource"):
+        return impl.PushFocusSource()
+    return PollingFocusSource(get_top_window_name, get_foreground_key)
@@ -3,7 +3,6 @@ from typing import Any, Literal, Union, Tuple
 import json
 import pickle
 import plistlib
-import re
 import time
 
 import AppKit
@@ -11,9 +10,12 @@ import ApplicationServices
 import Foundation
 import oa_atomacos
 import Quartz
-import concurrent
 
-from .Element.DarwinElementDescriber import DarwinElementDescriber
+from .Element.DarwinElementIndex import DarwinElementIndex
+from .Element.LiteralParser import parse_literal
+from .cancellation import CaptureCancelled, CaptureToken
+from .ax_backend import ApplicationServicesBackend, walk_ax_tree
+from .ax_geometry import decode_ax_value, parse_ax_value_repr
 from ..logger import logger
 
 RESERVED_KEYS = {
@@ -39,6 +41,14 @@ RESERVED_KEYS = {
 }
 
 MAX_DEPTH = 50
+MAX_WIDTH = 1024
+MAX_CALLS = 20000
+# seconds, the walk returns what it has read when it runs out
+TIME_BUDGET = 5.0
+# the children of every node have always been stored under the last reserved key
+CHILDREN_KEY = "AXColumns"
+
+AX_BACKEND = ApplicationServicesBackend()
 
 
 def get_top_window() -> dict:
@@ -73,6 +83,23 @@ def get_top_window_name() -> str:
         return "Desktop"
 
 
+SYSTEM_WIDE_ELEMENT = ApplicationServices.AXUIElementCreateSystemWide()
+
+
+def get_foreground_key() -> int | None:
+    """
+    Pid of the focused app, asked through AX: NSWorkspace only updates
+    frontmostApplication with a main run loop, which the backend has not
+    """
+    error_code, app = ApplicationServices.AXUIElementCopyAttributeValue(
+        SYSTEM_WIDE_ELEMENT, "AXFocusedApplication", None
+    )
+    if error_code:
+        return None
+    error_code, pid = ApplicationServices.AXUIElementGetPid(app, None)
+    return None if error_code else pid
+
+
 def get_active_window_meta() -> dict:
     """
     Get the metadata of the active window.
@@ -125,139 +152,30 @@ def get_active_window(window_meta: dict) -> ApplicationServices.AXUIElementRef |
     return window[0]
 
 
-def _create_axui_node(node, nodes: set = None, depth: int = 0, bbox: tuple = None, switched: bool = False):
-    nodes = nodes or set()
-    if node in nodes:
-        return None, switched
-    nodes.add(node)
-
-    reserved_keys = {
-        "AXEnabled": "st",
-        "AXFocused": "st",
-        "AXFullScreen": "st",
-        "AXTitle": "attr",
-        "AXChildrenInNavigationOrder": "attr",
-        "AXChildren": "attr",
-        "AXFrame": "attr",
-        "AXRole": "role",
-        "AXHelp": "attr",
-        "AXRoleDescription": "role",
-        "AXSubrole": "role",
-        "AXURL": "attr",
-        "AXValue": "val",
-        "AXDescription": "attr",
-        "AXDOMIdentifier": "attr",
-        "AXSelected": "st",
-        "AXInvalid": "st",
-        "AXRows": "attr",
-        "AXColumns": "attr",
-    }
-    attribute_dict = {}
-
-    error_code, attr_names = ApplicationServices.AXUIElementCopyAttributeNames(
-        node, None
+def _create_axui_node(node, bbox: tuple = None, token: CaptureToken = None):
+    """
+    Walk the tree under node on the shared walker pool, reading the
+    attributes of every node in one call.
+    Returns the tree, whether node was invalid (the window switched) and
+    whether the tree is partial: the walk hit its limits or TIME_BUDGET.
+    """
+    tree, switched, walker = walk_ax_tree(
+        node,
+        bbox,
+        AX_BACKEND,
+        list(RESERVED_KEYS),
+        CHILDREN_KEY,
+        token=token,
+        max_depth=MAX_DEPTH,
+        max_width=MAX_WIDTH,
+        max_calls=MAX_CALLS,
+        time_budget=TIME_BUDGET,
     )
-
-    if error_code:
-        # -25202: AXError.invalidUIElement
-        #         The accessibility object received in this event is invalid.
-        switched = True
-        return None, switched
-
-    value = None
-
-    if "AXFrame" in attr_names:
-        error_code, attr_val = ApplicationServices.AXUIElementCopyAttributeValue(
-            node, "AXFrame", None
-        )
-        rep = repr(attr_val)
-        x_value = re.search(r"x:(-?[\d.]+)", rep)
-        y_value = re.search(r"y:(-?[\d.]+)", rep)
-        w_value = re.search(r"w:(-?[\d.]+)", rep)
-        h_value = re.search(r"h:(-?[\d.]+)", rep)
-        type_value = re.search(r"type\s?=\s?(\w+)", rep)
-        value = {
-            "x": float(x_value.group(1)) if x_value else None,
-            "y": float(y_value.group(1)) if y_value else None,
-            "w": float(w_value.group(1)) if w_value else None,
-            "h": float(h_value.group(1)) if h_value else None,
-            "type": type_value.group(1) if type_value else None,
-        }
-
-        if not any(v is None for v in value.values()):
-            x_min = max(bbox[0], value["x"])
-            x_max = min(bbox[2], value["x"] + value["w"])
-            y_min = max(bbox[1], value["y"])
-            y_max = min(bbox[3], value["y"] + value["h"])
-
-            if x_min > x_max or y_min > y_max:
-                # No intersection
-                return None, switched
-
-    for attr_name, ns_key in reserved_keys.items():
-        if attr_name not in attr_names:
-            continue
-
-        if value and attr_name == "AXFrame":
-            bb = value
-            if not any(v is None for v in bb.values()):
-                attribute_dict["AXFrame"] = str(bb)
-            continue
-
-        error_code, attr_val = ApplicationServices.AXUIElementCopyAttributeValue(
-            node, attr_name, None
-        )
-
-        # Set the attribute_dict
-        if not (
-            isinstance(attr_val, ApplicationServices.AXUIElementRef)
-            or isinstance(attr_val, (AppKit.NSArray, list))
-        ):
-            if attr_val is not None:
-                attribute_dict[attr_name] = str(attr_val)
-
-    future_to_child = []
-
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        for attr_name, ns_key in reserved_keys.items():
-            if attr_name not in attr_names:
-                continue
-
-            error_code, attr_val = ApplicationServices.AXUIElementCopyAttributeValue(
-                node, attr_name, None
-            )
-            if isinstance(attr_val, ApplicationServices.AXUIElementRef):
-                future_to_child.append(
-                    executor.submit(_create_axui_node, attr_val,
-                                    nodes, depth + 1, bbox, switched)
-                )
-
-            elif isinstance(attr_val, (AppKit.NSArray, list)):
-                for child in attr_val:
-                    future_to_child.append(
-                        executor.submit(
-                            _create_axui_node, child, nodes, depth + 1, bbox, switched
-                        )
-                    )
-
-        try:
-            if isinstance(future_to_child, list):
-                attribute_dict[attr_name] = []
-                for future in concurrent.futures.as_completed(future_to_child):
-                    result = future.result()
-                    if result[0] is not None:
-                        attribute_dict[attr_name].append(result[0])
-                        switched = switched or result[1]
-            else:
-                for future in concurrent.futures.as_completed(future_to_child):
-                    result = future.result()
-                    if result[0] is not None:
-                        attribute_dict[attr_name] = result[0]
-                        switched = switched or result[1]
-        except Exception as e:
-            print(e)
-
-    return attribute_dict, switched
+    if walker.timed_out:
+        logger.warning(f"AXTree walk ran out of time after {walker.call_num} nodes")
+    elif walker.truncated:
+        logger.warning(f"AXTree walk truncated after {walker.call_num} nodes")
+    return tree, switched, walker.truncated or walker.timed_out
 
 
 def dump_state(
@@ -373,21 +291,7 @@ def deepconvert_objc(object: Any) -> Any | list | dict | Literal[0]:
     # handle core-foundation class AXValueRef
     elif isinstance(object, ApplicationServices.AXValueRef):
         # convert to dict - note: this object is not iterable
-        # TODO: access directly, e.g. via
-        # ApplicationServices.AXUIElementCopyAttributeValue
-        rep = repr(object)
-        x_value = re.search(r"x:(-?[\d.]+)", rep)
-        y_value = re.search(r"y:(-?[\d.]+)", rep)
-        w_value = re.search(r"w:(-?[\d.]+)", rep)
-        h_value = re.search(r"h:(-?[\d.]+)", rep)
-        type_value = re.search(r"type\s?=\s?(\w+)", rep)
-        value = {
-            "x": float(x_value.group(1)) if x_value else None,
-            "y": float(y_value.group(1)) if y_value else None,
-            "w": float(w_value.group(1)) if w_value else None,
-            "h": float(h_value.group(1)) if h_value else None,
-            "type": type_value.group(1) if type_value else None,
-        }
+        value = decode_ax_value(object)
     elif isinstance(object, Foundation.NSURL):
         value = str(object.absoluteString())
     elif isinstance(object, Foundation.__NSCFAttributedString):
@@ -415,14 +319,17 @@ def deepconvert_objc(object: Any) -> Any | list | dict | Literal[0]:
     return value
 
 
-def get_window_data(window_meta: dict) -> Tuple[dict, bool]:
+def get_window_data(window_meta: dict, token: CaptureToken = None) -> Tuple[dict, bool, bool]:
     """Get the data of the window.
 
     Args:
         window_meta (dict): The metadata of the window.
+        token (CaptureToken): cancels the walk when cancelled or expired.
 
     Returns:
         dict: A dictionary containing the data of the window.
+        bool: Whether the window switched during the walk.
+        bool: Whether the tree is partial, cut by the walk limits.
     """
     start_time = time.time()
     window = get_active_window(window_meta)
@@ -431,10 +338,10 @@ def get_window_data(window_meta: dict) -> Tuple[dict, bool]:
           window_meta["kCGWindowBounds"]["X"] +
           window_meta["kCGWindowBounds"]["Width"],
           window_meta["kCGWindowBounds"]["Y"] + window_meta["kCGWindowBounds"]["Height"])
-    state, switched = _create_axui_node(window, bbox=bb)
+    state, switched, partial = _create_axui_node(window, bbox=bb, token=token)
     print(
         f"Time taken to dump window {window_meta['kCGWindowName']}: {time.time() - start_time}")
-    return state, switched
+    return state, switched, partial
 
 
 def get_active_window_state() -> dict | None:
@@ -470,6 +377,53 @@ def get_active_window_state() -> dict | None:
     return rval
 
 
+# the lists of child elements in an element state
+ELEMENT_LIST_KEYS = (
+    "AXChildrenInNavigationOrder",
+    "AXVisibleChildren",
+    "AXRows",
+    "AXChildren",
+    "AXColumns",
+)
+
+
+def _structured(value):
+    """
+    Dict of a frame or element left as a string, value itself when it is
+    not one
+    """
+    if not isinstance(value, str):
+        return value
+    if value.startswith("<AXValue"):
+        return parse_ax_value_repr(value)
+    if value.lstrip().startswith("{"):
+        try:
+            return parse_literal(value)
+        except ValueError:
+            pass
+    return value
+
+
+def normalize_element_state(state):
+    """
+    Parse the frames and child elements left as strings in an element
+    state, so that parse_element reads plain dicts
+    """
+    state = _structured(state)
+    stack = [state]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        if "AXFrame" in node:
+            node["AXFrame"] = _structured(node["AXFrame"])
+        for key in ELEMENT_LIST_KEYS:
+            if isinstance(node.get(key), list):
+                node[key] = [_structured(child) for child in node[key]]
+                stack.extend(node[key])
+    return state
+
+
 def get_active_element_state(x: int, y: int) -> dict:
     """Get the state of the active element at the specified coordinates.
 
@@ -501,39 +455,61 @@ def get_active_element_state(x: int, y: int) -> dict:
         state = dump_state(el.ref)
         state = deepconvert_objc(state)
 
-    return state
+    return normalize_element_state(state)
 
 
 def parse_element(element, x: float, y: float):
+    return parse_elements(element, [(x, y)])[0]
+
+
+def parse_elements(element, points: list) -> list:
+    """
+    Targets of the clicks at points on one element dump, the index of the
+    dump being built once for all of them
+    """
+    if not isinstance(element, dict):
+        return [{} for _ in points]
     try:
-        if not isinstance(element, dict):
-            return {}
-        describer = DarwinElementDescriber(x, y)
-        describer = describer.build_from_json(element, rule="general")
-        describer.calculate_score()
-        target = describer.find_most_score_node()
-        return target.to_dict() if target else {}
+        # same target as DarwinElementDescriber, scoring only the nodes
+        # that can win
+        index = DarwinElementIndex(element)
     except Exception as e:
         logger.error(f"Error parsing element: {e}")
-        return {}
+        return [{} for _ in points]
+    targets = []
+    for x, y in points:
+        try:
+            targets.append(index.target(x, y))
+        except Exception as e:
+            logger.error(f"Error parsing element: {e}")
+            targets.append({})
+    return targets
 
 
-def get_accessibility_tree():
+def get_accessibility_tree(token: CaptureToken = None):
     tree_status = {
         "complete": True,
         "switched": False,
         "closed": False,
+        "truncated": False,
     }
-    switched = False
+    switched = partial = False
     try:
         top_window_key_before = get_active_window_state()
         meta = get_active_window_meta()
-        tree, switched = get_window_data(meta)
+        tree, switched, partial = get_window_data(meta, token=token)
+    except CaptureCancelled as e:
+        logger.info(f"get_accessibility_tree: {str(e)}")
+        return None
     except Exception as e:
         tree_status["complete"] = False
         tree_status["closed"] = True
         logger.exception(f"get_accessibility_tree error: {str(e)}")
 
+    if partial:
+        tree_status["complete"] = False
+        tree_status["truncated"] = True
+
     if switched:
         tree_status["complete"] = False
         tree_status["switched"] = True
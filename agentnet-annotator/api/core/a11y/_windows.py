@@ -7,13 +7,24 @@ import win32gui
 
 MAX_DEPTH = 30
 MAX_WIDTH = 1024
+MAX_CALLS = 20000
+# seconds, the walk returns what it has read when it runs out
+TIME_BUDGET = 5.0
+# the element tree is read at click time
+ELEMENT_TIME_BUDGET = 1.0
 
 
 import ctypes
+import ctypes.wintypes
 import psutil
 import win32gui
+from threading import Event, Thread
 
 from ..logger import logger
+from .cancellation import CaptureCancelled, CaptureToken
+from .focus import FocusSource, PollingFocusSource
+from .tree_walker import CAPTURE_POOL, ELEMENT_POOL
+from .uia_provider import UIAutomationProvider, walk_control_tree
 from screeninfo import get_monitors
 
 
@@ -21,12 +32,12 @@ for monitor in get_monitors():
     screenWidth = monitor.width
     screenHeight = monitor.height
 
-# GETTING TOP WINDOW NAME {{{ #
+UIA_PROVIDER = UIAutomationProvider()
 
+# GETTING TOP WINDOW NAME {{{ #
 
-def get_top_window_name() -> str:
-    hwnd = win32gui.GetForegroundWindow()
 
+def get_window_process_name(hwnd) -> str:
     pid = ctypes.c_ulong()
     ctypes.windll.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
     pid_value = pid.value
@@ -40,6 +51,117 @@ def get_top_window_name() -> str:
     return process_name.split(".", 1)[0]
 
 
+def get_top_window_name() -> str:
+    return get_window_process_name(win32gui.GetForegroundWindow())
+
+
+def get_foreground_key() -> tuple:
+    hwnd = win32gui.GetForegroundWindow()
+    pid = ctypes.c_ulong()
+    ctypes.windll.user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+    return hwnd, pid.value
+
+
+EVENT_SYSTEM_FOREGROUND = 0x0003
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+WM_QUIT = 0x0012
+
+WinEventProc = ctypes.WINFUNCTYPE(
+    None,
+    ctypes.wintypes.HANDLE,
+    ctypes.wintypes.DWORD,
+    ctypes.wintypes.HWND,
+    ctypes.wintypes.LONG,
+    ctypes.wintypes.LONG,
+    ctypes.wintypes.DWORD,
+    ctypes.wintypes.DWORD,
+)
+
+# HWINEVENTHOOK is pointer sized, the default c_int return would truncate it
+user32 = ctypes.windll.user32
+user32.SetWinEventHook.restype = ctypes.wintypes.HANDLE
+user32.SetWinEventHook.argtypes = [
+    ctypes.wintypes.DWORD,
+    ctypes.wintypes.DWORD,
+    ctypes.wintypes.HMODULE,
+    WinEventProc,
+    ctypes.wintypes.DWORD,
+    ctypes.wintypes.DWORD,
+    ctypes.wintypes.DWORD,
+]
+user32.UnhookWinEvent.restype = ctypes.wintypes.BOOL
+user32.UnhookWinEvent.argtypes = [ctypes.wintypes.HANDLE]
+
+
+class PushFocusSource(FocusSource):
+    """
+    Foreground window changes from an EVENT_SYSTEM_FOREGROUND WinEvent hook,
+    on a thread running the message loop the hook needs. Polls the
+    foreground window instead when the hook cannot be set.
+    """
+
+    def __init__(self):
+        self.on_focus = None
+        self.thread = None
+        self.thread_id = None
+        self.fallback = None
+        self.ready = Event()
+
+    def start(self, on_focus):
+        self.on_focus = on_focus
+        self.ready.clear()
+        self.thread = Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self.ready.wait()
+
+    def _on_event(self, hook, event, hwnd, id_object, id_child, event_thread, event_time):
+        time_stamp = time.perf_counter()
+        try:
+            top_window_name = get_window_process_name(hwnd)
+        except Exception as e:
+            logger.info(f"PushFocusSource: {e}")
+            return
+        if top_window_name is not None:
+            self.on_focus(time_stamp, top_window_name)
+
+    def _run(self):
+        self.thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+        # keep the callback alive while the hook is set
+        callback = WinEventProc(self._on_event)
+        hook = user32.SetWinEventHook(
+            EVENT_SYSTEM_FOREGROUND,
+            EVENT_SYSTEM_FOREGROUND,
+            None,
+            callback,
+            0,
+            0,
+            WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS,
+        )
+        if not hook:
+            logger.error(
+                f"PushFocusSource: SetWinEventHook failed ({ctypes.GetLastError()}), polling instead"
+            )
+            self.fallback = PollingFocusSource(get_top_window_name, get_foreground_key)
+            self.fallback.start(self.on_focus)
+            self.ready.set()
+            return
+        self.ready.set()
+        msg = ctypes.wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        user32.UnhookWinEvent(hook)
+
+    def stop(self):
+        if self.thread is not None and self.thread.is_alive():
+            user32.PostThreadMessageW(self.thread_id, WM_QUIT, 0, 0)
+            self.thread.join()
+        if self.fallback is not None:
+            self.fallback.stop()
+            self.fallback = None
+
+
 # }}} GETTING TOP WINDOW NAME #
 
 # GETTING TREES {{{ #
@@ -72,7 +194,7 @@ def get_top_window_key(control: auto.Control):
         return window_tree"""
 
 
-def get_accessibility_tree():
+def get_accessibility_tree(token: CaptureToken = None):
     window_tree = {}
     with auto.UIAutomationInitializerInThread():
         focused_control = auto.GetFocusedControl()
@@ -93,13 +215,22 @@ def get_accessibility_tree():
             "complete": True,
             "switched": False,
             "closed": False,
+            "truncated": False,
         }
         top_window_key_before = get_top_window_key(top_window)
         top_window_key_after = ()
         try:
-            window_tree = traverse_control_tree(top_window, depth=0)
+            window_tree, partial = traverse_control_tree(
+                top_window, time_budget=TIME_BUDGET, token=token
+            )
             top_window_key_after = get_top_window_key(focused_control)
+            if partial:
+                tree_status["complete"] = False
+                tree_status["truncated"] = True
 
+        except CaptureCancelled as e:
+            logger.info(f"get_accessibility_tree: {str(e)}")
+            return None
         except Exception as e:
             tree_status["complete"] = False
             tree_status["closed"] = True
@@ -123,23 +254,50 @@ def get_active_element_state(x, y):
     with auto.UIAutomationInitializerInThread():
         element = auto.ControlFromPoint(x, y)
         logger.info(f"Element: {element}")
-        element_tree = traverse_control_tree(element)
+        element_tree, _ = traverse_control_tree(
+            element, time_budget=ELEMENT_TIME_BUDGET, pool_name=ELEMENT_POOL
+        )
         return element_tree
 
 
 def parse_element(element, x: float, y: float):
+    return parse_elements(element, [(x, y)])[0]
+
+
+def parse_elements(element, points: list) -> list:
+    """
+    Targets of the clicks at points on one element tree, the describers
+    being built once and scored again for every click
+    """
     try:
-        describer = WindowsElementDescriber(x, y)
+        describer = WindowsElementDescriber(0, 0)
         describer = describer.build_from_json(element)
-        describer.calculate_score()
-        target = describer.find_most_score_node()
-        if target.score < 0:
-            return None
-        #logger.info(f"Parse element: {(str(target.to_dict()))}")
-        return target.to_dict()
     except Exception as e:
         logger.info(e)
-        return None
+        return [None for _ in points]
+    nodes = []
+    stack = [describer]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.children)
+
+    targets = []
+    for x, y in points:
+        try:
+            for node in nodes:
+                node.x, node.y, node.score = x, y, 0
+            describer.calculate_score()
+            target = describer.find_most_score_node()
+            if target.score < 0:
+                targets.append(None)
+                continue
+            #logger.info(f"Parse element: {(str(target.to_dict()))}")
+            targets.append(target.to_dict())
+        except Exception as e:
+            logger.info(e)
+            targets.append(None)
+    return targets
 
 
 # }}} GETTING ELEMENT AT POINT #
@@ -147,20 +305,33 @@ def parse_element(element, x: float, y: float):
 # HELPER FUNCTIONS {{{ #
 
 
-def traverse_control_tree(control, depth=0):
-    tree = {
-        "Name": control.Name,
-        "ControlType": control.ControlTypeName,
-        "BoundingRectangle": dictify_rect(control.BoundingRectangle),
-        "Depth": depth,
-        "Children": [],
-    }
-    if depth < MAX_DEPTH:
-        for child in control.GetChildren()[:MAX_WIDTH]:
-            child_tree = traverse_control_tree(child, depth + 1)
-            if child_tree:
-                tree["Children"].append(child_tree)
-    return tree
+def traverse_control_tree(
+    control,
+    time_budget: float = None,
+    token: CaptureToken = None,
+    pool_name: str = CAPTURE_POOL,
+):
+    """
+    Tree of control, read breadth first with one cached fetch per control.
+    Returns the tree and whether it is partial: time_budget ran out, or the
+    walk stopped at MAX_DEPTH, MAX_WIDTH children or MAX_CALLS controls.
+    Element queries walk on their own pool, not behind window captures.
+    """
+    tree, walker = walk_control_tree(
+        control.Element,
+        UIA_PROVIDER,
+        token=token,
+        max_depth=MAX_DEPTH,
+        max_width=MAX_WIDTH,
+        max_calls=MAX_CALLS,
+        time_budget=time_budget,
+        pool_name=pool_name,
+    )
+    if walker.timed_out:
+        logger.warning(f"UIA tree walk ran out of time after {walker.call_num} controls")
+    elif walker.truncated:
+        logger.warning(f"UIA tree walk hit its limits after {walker.call_num} controls")
+    return tree, walker.truncated or walker.timed_out
 
 
 def dictify_rect(rect: auto.uiautomation.Rect) -> dict:
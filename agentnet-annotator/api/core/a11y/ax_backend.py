@@ -0,0 +1,242 @@
+import time
+import threading
+from typing import Any, List, Optional
+
+try:
+    import AppKit
+    import ApplicationServices
+except ImportError:
+    # the fake backend works off macOS, for tests and benchmarks
+    AppKit = None
+    ApplicationServices = None
+
+from .ax_geometry import decode_ax_value, parse_ax_value_repr
+from .cancellation import CaptureToken
+from .tree_walker import TreeWalker
+
+# AXValueType of the placeholders AXUIElementCopyMultipleAttributeValues
+# returns for the attributes it failed to read
+AX_ERROR_TYPE = 5
+
+
+class AXBackend:
+    """
+    Source of AX elements. attribute_values defaults to one
+    attribute_value call per attribute.
+    """
+
+    def attribute_names(self, node) -> Optional[List[str]]:
+        """
+        Attribute names of node, None for an invalid element
+        """
+        raise NotImplementedError
+
+    def attribute_value(self, node, name: str) -> Any:
+        raise NotImplementedError
+
+    def attribute_values(self, node, names: List[str]) -> List[Any]:
+        return [self.attribute_value(node, name) for name in names]
+
+    def is_element(self, value) -> bool:
+        raise NotImplementedError
+
+    def is_array(self, value) -> bool:
+        return isinstance(value, list)
+
+    def decode_geometry(self, value) -> dict:
+        return decode_ax_value(value)
+
+
+class ApplicationServicesBackend(AXBackend):
+    def attribute_names(self, node):
+        error_code, attr_names = ApplicationServices.AXUIElementCopyAttributeNames(
+            node, None
+        )
+        # -25202: AXError.invalidUIElement
+        #         The accessibility object received in this event is invalid.
+        return None if error_code else attr_names
+
+    def attribute_value(self, node, name):
+        error_code, attr_val = ApplicationServices.AXUIElementCopyAttributeValue(
+            node, name, None
+        )
+        return None if error_code else attr_val
+
+    def attribute_values(self, node, names):
+        error_code, values = ApplicationServices.AXUIElementCopyMultipleAttributeValues(
+            node, names, 0, None
+        )
+        if error_code or values is None or len(values) != len(names):
+            return super().attribute_values(node, names)
+        return [None if self._is_error(value) else value for value in values]
+
+    def _is_error(self, value) -> bool:
+        return (
+            isinstance(value, ApplicationServices.AXValueRef)
+            and ApplicationServices.AXValueGetType(value) == AX_ERROR_TYPE
+        )
+
+    def is_element(self, value):
+        return isinstance(value, ApplicationServices.AXUIElementRef)
+
+    def is_array(self, value):
+        return isinstance(value, (AppKit.NSArray, list))
+
+
+class FakeAXElement:
+    """
+    In-memory AX element, attributes maps names to values, child elements
+    and lists of child elements
+    """
+
+    __slots__ = ("attributes", "valid", "__weakref__")
+
+    def __init__(self, attributes: dict, valid: bool = True):
+        self.attributes = attributes
+        self.valid = valid
+
+
+class FakeAXBackend(AXBackend):
+    """
+    AX backend over FakeAXElement trees, counting calls. call_latency
+    seconds are spent in every call, like the round trip to the app.
+    """
+
+    def __init__(self, call_latency: float = 0.0):
+        self.call_latency = call_latency
+        self.call_num = 0
+        self.lock = threading.Lock()
+
+    def _call(self):
+        with self.lock:
+            self.call_num += 1
+        if self.call_latency:
+            time.sleep(self.call_latency)
+
+    def attribute_names(self, node):
+        self._call()
+        return list(node.attributes) if node.valid else None
+
+    def attribute_value(self, node, name):
+        self._call()
+        return node.attributes.get(name)
+
+    def attribute_values(self, node, names):
+        self._call()
+        return [node.attributes.get(name) for name in names]
+
+    def is_element(self, value):
+        return isinstance(value, FakeAXElement)
+
+    def decode_geometry(self, value):
+        if isinstance(value, dict):
+            return dict(value)
+        return parse_ax_value_repr(repr(value))
+
+
+class AXAttributeCache:
+    """
+    Attributes of the nodes of one capture, in the order of attributes.
+    Every node is read once, in a single call with batch.
+    """
+
+    def __init__(self, backend: AXBackend, attributes: List[str], batch: bool = True):
+        self.backend = backend
+        self.attributes = attributes
+        self.batch = batch
+        self.cache = {}
+
+    def get(self, node) -> Optional[dict]:
+        """
+        {name: value} of the attributes node has, None for an invalid node
+        """
+        if node in self.cache:
+            return self.cache[node]
+        attr_names = self.backend.attribute_names(node)
+        if attr_names is None:
+            values = None
+        else:
+            names = [name for name in self.attributes if name in attr_names]
+            if self.batch:
+                values = dict(zip(names, self.backend.attribute_values(node, names)))
+            else:
+                values = {name: self.backend.attribute_value(node, name) for name in names}
+        self.cache[node] = values
+        return values
+
+
+def read_ax_node(node, bbox: tuple, attributes: AXAttributeCache):
+    """
+    Attribute dict and child elements of one node: None for a node outside
+    of bbox and -1 for an invalid node
+    """
+    values = attributes.get(node)
+    if values is None:
+        return -1, []
+    backend = attributes.backend
+
+    value = None
+    if "AXFrame" in values:
+        value = backend.decode_geometry(values["AXFrame"])
+
+        if not any(v is None for v in value.values()):
+            x_min = max(bbox[0], value["x"])
+            x_max = min(bbox[2], value["x"] + value["w"])
+            y_min = max(bbox[1], value["y"])
+            y_max = min(bbox[3], value["y"] + value["h"])
+
+            if x_min > x_max or y_min > y_max:
+                # No intersection
+                return None, []
+
+    attribute_dict = {}
+    children = []
+    for attr_name, attr_val in values.items():
+        if value and attr_name == "AXFrame":
+            if not any(v is None for v in value.values()):
+                attribute_dict["AXFrame"] = str(value)
+            continue
+
+        # element values are walked as children
+        if backend.is_element(attr_val):
+            children.append(attr_val)
+        elif backend.is_array(attr_val):
+            children.extend(attr_val)
+        elif attr_val is not None:
+            attribute_dict[attr_name] = str(attr_val)
+
+    return attribute_dict, children
+
+
+def walk_ax_tree(
+    root,
+    bbox: tuple,
+    backend: AXBackend,
+    attributes: List[str],
+    children_key: str,
+    token: CaptureToken = None,
+    batch: bool = True,
+    **limits,
+):
+    """
+    Walk the tree under root. Returns the tree, whether root was invalid
+    (the window switched) and the walker, with the limits it hit.
+    """
+    cache = AXAttributeCache(backend, attributes, batch=batch)
+    switched = False
+
+    def visit(node, depth):
+        nonlocal switched
+        attribute_dict, children = read_ax_node(node, bbox, cache)
+        if attribute_dict == -1:
+            if depth == 0:
+                switched = True
+            return None, []
+        return attribute_dict, children
+
+    def attach(attribute_dict, children):
+        attribute_dict[children_key] = children
+
+    walker = TreeWalker(visit, attach, token=token, **limits)
+    tree = walker.walk(root)
+    return tree, switched, walker
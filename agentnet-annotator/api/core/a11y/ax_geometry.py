@@ -0,0 +1,79 @@
+import re
+
+try:
+    import ApplicationServices
+except ImportError:
+    # only the repr parser is available off macOS, e.g. for benchmarks
+    ApplicationServices = None
+
+# fields of an AXValue repr, e.g.
+# <AXValue 0x600003d9c3c0> {value = x:0.000000 y:25.000000 w:1440.000000 h:875.000000 type = kAXValueCGRectType}
+AX_VALUE_FIELDS = re.compile(r"([xywh]):(-?[\d.]+)|type\s?=\s?(\w+)")
+# the CGRect layout of AXFrame, read with a single match
+AX_RECT = re.compile(
+    r"\{value = x:(-?[\d.]+) y:(-?[\d.]+) w:(-?[\d.]+) h:(-?[\d.]+) type\s?=\s?(\w+)"
+)
+
+# AXValueType
+CG_POINT_TYPE = 1
+CG_SIZE_TYPE = 2
+CG_RECT_TYPE = 3
+
+AX_VALUE_TYPE_NAMES = {
+    CG_POINT_TYPE: "kAXValueCGPointType",
+    CG_SIZE_TYPE: "kAXValueCGSizeType",
+    CG_RECT_TYPE: "kAXValueCGRectType",
+}
+
+
+def parse_ax_value_repr(rep: str) -> dict:
+    """
+    Geometry of an AXValue from its repr, in one pass over the string.
+    The first occurrence of every field wins, missing fields are None.
+    """
+    match = AX_RECT.search(rep)
+    if match is not None:
+        x, y, w, h, value_type = match.groups()
+        return {"x": float(x), "y": float(y), "w": float(w), "h": float(h), "type": value_type}
+    value = {"x": None, "y": None, "w": None, "h": None, "type": None}
+    for match in AX_VALUE_FIELDS.finditer(rep):
+        field, number, value_type = match.groups()
+        if field is not None:
+            if value[field] is None:
+                value[field] = float(number)
+        elif value["type"] is None:
+            value["type"] = value_type
+    return value
+
+
+def decode_ax_value(ax_value) -> dict:
+    """
+    Geometry of an AXValue (CGRect, CGPoint or CGSize) as
+    {"x", "y", "w", "h", "type"}, read through AXValueGetValue and falling
+    back to the repr for the other value types
+    """
+    if ApplicationServices is None:
+        return parse_ax_value_repr(repr(ax_value))
+    try:
+        value_type = ApplicationServices.AXValueGetType(ax_value)
+        type_name = AX_VALUE_TYPE_NAMES.get(value_type)
+        if type_name is None:
+            return parse_ax_value_repr(repr(ax_value))
+        success, struct = ApplicationServices.AXValueGetValue(
+            ax_value, value_type, None
+        )
+    except Exception:
+        return parse_ax_value_repr(repr(ax_value))
+    if not success:
+        return parse_ax_value_repr(repr(ax_value))
+
+    value = {"x": None, "y": None, "w": None, "h": None, "type": type_name}
+    if value_type == CG_POINT_TYPE:
+        value["x"], value["y"] = float(struct.x), float(struct.y)
+    elif value_type == CG_SIZE_TYPE:
+        value["w"], value["h"] = float(struct.width), float(struct.height)
+    else:
+        value["x"], value["y"] = float(struct.origin.x), float(struct.origin.y)
+        value["w"] = float(struct.size.width)
+        value["h"] = float(struct.size.height)
+    return value
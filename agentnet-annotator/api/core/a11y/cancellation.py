@@ -0,0 +1,40 @@
+import time
+from threading import Event
+from typing import Optional
+
+
+class CaptureCancelled(Exception):
+    pass
+
+
+class CaptureToken:
+    """
+    Cancellation token of one accessibility tree capture.
+
+    The tree walkers call check() for every node, which raises
+    CaptureCancelled once the capture is cancelled or past its deadline.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.cancelled = Event()
+        self.deadline = None if timeout is None else time.perf_counter() + timeout
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
+    def is_cancelled(self) -> bool:
+        return self.cancelled.is_set() or self.expired()
+
+    def check(self):
+        if self.cancelled.is_set():
+            raise CaptureCancelled("capture cancelled")
+        if self.expired():
+            raise CaptureCancelled("capture deadline exceeded")
+
+
+def check_token(token: Optional[CaptureToken]):
+    if token is not None:
+        token.check()
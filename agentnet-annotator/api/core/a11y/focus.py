@@ -0,0 +1,92 @@
+import time
+from threading import Event, Thread
+from typing import Callable, Optional
+
+from ..logger import logger
+
+
+class FocusSource:
+    """
+    Tells on_focus(time_stamp, top_window_name) when the foreground app
+    changes, time_stamp being time.perf_counter() of the switch
+    """
+
+    def start(self, on_focus: Callable[[float, str], None]):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+
+class PollingFocusSource(FocusSource):
+    """
+    Reads the top window name every interval seconds. With get_key, a cheap
+    identity of the foreground window, the name is only read again when the
+    key changes or is older than max_age seconds.
+    """
+
+    def __init__(
+        self,
+        get_name: Callable[[], Optional[str]],
+        get_key: Callable = None,
+        interval: float = 0.2,
+        max_age: float = 1.0,
+    ):
+        self.get_name = get_name
+        self.get_key = get_key
+        self.interval = interval
+        self.max_age = max_age
+        self.stop_event = Event()
+        self.thread = None
+
+    def start(self, on_focus):
+        self.stop_event.clear()
+        self.thread = Thread(target=self._poll, args=(on_focus,), daemon=True)
+        self.thread.start()
+
+    def _poll(self, on_focus):
+        last_key = last_name = None
+        read_time = 0.0
+        while not self.stop_event.is_set():
+            try:
+                time_stamp = time.perf_counter()
+                key = self.get_key() if self.get_key is not None else None
+                if (
+                    self.get_key is None
+                    or key != last_key
+                    or time_stamp - read_time > self.max_age
+                ):
+                    name = self.get_name()
+                    last_key, read_time = key, time_stamp
+                    if name is not None and name != last_name:
+                        last_name = name
+                        on_focus(time_stamp, name)
+            except Exception:
+                logger.exception("PollingFocusSource error.")
+            self.stop_event.wait(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None and self.thread.is_alive():
+            self.thread.join()
+
+
+class FakeFocusSource(FocusSource):
+    """
+    Focus changes made by hand, for tests
+    """
+
+    def __init__(self):
+        self.on_focus = None
+
+    def start(self, on_focus):
+        self.on_focus = on_focus
+
+    def emit(self, top_window_name: str, time_stamp: float = None):
+        if self.on_focus is not None:
+            if time_stamp is None:
+                time_stamp = time.perf_counter()
+            self.on_focus(time_stamp, top_window_name)
+
+    def stop(self):
+        self.on_focus = None
@@ -0,0 +1,196 @@
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Tuple
+
+from .cancellation import CaptureToken, check_token
+
+MAX_WORKERS = 8
+# nodes a runner visits before it makes way for the other walks on the pool
+RUNNER_BATCH = 16
+
+# walks of the whole window, and of the element under a click
+CAPTURE_POOL = "capture"
+ELEMENT_POOL = "element"
+
+_pools = {}
+_pool_lock = threading.Lock()
+
+
+def get_walker_pool(name: str = CAPTURE_POOL) -> ThreadPoolExecutor:
+    """
+    Worker pool shared by the tree walks of the process with this pool name
+    """
+    with _pool_lock:
+        if name not in _pools:
+            _pools[name] = ThreadPoolExecutor(
+                max_workers=MAX_WORKERS, thread_name_prefix=f"a11y-{name}-walker"
+            )
+        return _pools[name]
+
+
+class _Record:
+    __slots__ = ("node", "depth", "data", "children")
+
+    def __init__(self, node, depth):
+        self.node = node
+        self.depth = depth
+        self.data = None
+        self.children = []
+
+
+class TreeWalker:
+    """
+    Walk an accessibility tree on the worker pool named pool_name.
+
+    visit(node, depth) reads one node and returns (data, children): the
+    output of the node, or None to prune it, and the child handles to walk.
+    attach(data, children_data) puts the output of the children under their
+    parent once the walk is done, in the order visit listed them.
+
+    At most workers runners visit nodes from the work queue of the walk.
+    A runner visits RUNNER_BATCH nodes, then goes to the back of the pool
+    queue, so walks running at the same time share the pool threads. The
+    walk stops expanding past max_depth, max_width children, max_calls
+    nodes or time_budget seconds from when it first gets a pool thread,
+    and visits every node once.
+    """
+
+    def __init__(
+        self,
+        visit: Callable[[Any, int], Tuple[Any, List]],
+        attach: Callable[[Any, List], None],
+        max_depth: int = 50,
+        max_width: int = 1024,
+        max_calls: int = 5000,
+        time_budget: Optional[float] = None,
+        workers: int = MAX_WORKERS,
+        token: CaptureToken = None,
+        pool_name: str = CAPTURE_POOL,
+    ):
+        self.visit = visit
+        self.attach = attach
+        self.max_depth = max_depth
+        self.max_width = max_width
+        self.max_calls = max_calls
+        self.time_budget = time_budget
+        self.workers = workers
+        self.token = token
+        self.pool_name = pool_name
+
+        self.pool = None
+        self.queue = deque()
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.visited = set()
+        self.pending = 0
+        self.runners = 0
+        self.call_num = 0
+        self.error = None
+        self.deadline = None
+        # the walk stopped early, on a limit or the time budget
+        self.truncated = False
+        # the walk ran out of time_budget, the tree is partial
+        self.timed_out = False
+
+    def walk(self, root) -> Any:
+        root_record = _Record(root, 0)
+        self.visited.add(root)
+        self.call_num = 1
+        self.pending = 1
+        self.queue.append(root_record)
+
+        self.pool = get_walker_pool(self.pool_name)
+        self._start_runners()
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self._assemble(root_record)
+
+    def _start_runners(self):
+        with self.lock:
+            start_num = min(self.workers - self.runners, len(self.queue))
+            self.runners += max(start_num, 0)
+        for _ in range(start_num):
+            self.pool.submit(self._run)
+
+    def _run(self):
+        with self.lock:
+            if self.deadline is None and self.time_budget is not None:
+                # waiting for a pool thread does not count against the budget
+                self.deadline = time.perf_counter() + self.time_budget
+        for _ in range(RUNNER_BATCH):
+            with self.lock:
+                if not self.queue:
+                    self.runners -= 1
+                    return
+                record = self.queue.popleft()
+            try:
+                if self.error is None:
+                    self._visit(record)
+            except BaseException as e:
+                with self.lock:
+                    if self.error is None:
+                        self.error = e
+            finally:
+                self._task_done()
+        self.pool.submit(self._run)
+
+    def _task_done(self):
+        with self.lock:
+            self.pending -= 1
+            if self.pending == 0:
+                self.done.set()
+
+    def _past_deadline(self) -> bool:
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            self.truncated = True
+            self.timed_out = True
+            return True
+        return False
+
+    def _visit(self, record: _Record):
+        check_token(self.token)
+        # nodes still queued when the time runs out are dropped
+        if record.depth > 0 and self._past_deadline():
+            return
+        data, children = self.visit(record.node, record.depth)
+        record.data = data
+        if data is None or not children:
+            return
+        if record.depth >= self.max_depth or len(children) > self.max_width:
+            self.truncated = True
+            if record.depth >= self.max_depth:
+                return
+            children = children[: self.max_width]
+        if self._past_deadline():
+            return
+
+        child_records = []
+        with self.lock:
+            for child in children:
+                # nodes can be reachable from several parents
+                if child in self.visited:
+                    continue
+                if self.call_num >= self.max_calls:
+                    self.truncated = True
+                    break
+                self.visited.add(child)
+                self.call_num += 1
+                child_records.append(_Record(child, record.depth + 1))
+            self.pending += len(child_records)
+            self.queue.extend(child_records)
+        record.children = child_records
+        self._start_runners()
+
+    def _assemble(self, record: _Record) -> Any:
+        if record.data is None:
+            return None
+        children_data = []
+        for child_record in record.children:
+            child_data = self._assemble(child_record)
+            if child_data is not None:
+                children_data.append(child_data)
+        self.attach(record.data, children_data)
+        return record.data
@@ -0,0 +1,135 @@
+import time
+import threading
+from typing import Any, List, Optional, Tuple
+
+try:
+    import uiautomation as auto
+except ImportError:
+    # the fake provider works off Windows, for tests and benchmarks
+    auto = None
+
+from .cancellation import CaptureToken
+from .tree_walker import TreeWalker
+
+
+class ControlProvider:
+    """
+    Source of UI Automation controls for the tree walk
+    """
+
+    def read(self, control) -> Tuple[dict, List[Any]]:
+        """
+        Name, ControlType and BoundingRectangle of control, and its children
+        """
+        raise NotImplementedError
+
+
+class UIAutomationProvider(ControlProvider):
+    """
+    Reads IUIAutomationElements. One BuildUpdatedCache call per control
+    fetches its properties and its children, like a CacheRequest with
+    TreeScope Element | Children, instead of a round trip per property
+    and one for GetChildren.
+    """
+
+    def __init__(self):
+        # COM and the cache request are per thread
+        self.local = threading.local()
+
+    def _cache_request(self):
+        cache_request = getattr(self.local, "cache_request", None)
+        if cache_request is None:
+            auto.InitializeUIAutomationInCurrentThread()
+            cache_request = auto._AutomationClient.instance().IUIAutomation.CreateCacheRequest()
+            cache_request.AddProperty(auto.PropertyId.NameProperty)
+            cache_request.AddProperty(auto.PropertyId.ControlTypeProperty)
+            cache_request.AddProperty(auto.PropertyId.BoundingRectangleProperty)
+            cache_request.TreeScope = auto.TreeScope.Element | auto.TreeScope.Children
+            self.local.cache_request = cache_request
+        return cache_request
+
+    def read(self, element):
+        cached = element.BuildUpdatedCache(self._cache_request())
+        rect = cached.CachedBoundingRectangle
+        props = {
+            "Name": cached.CachedName,
+            "ControlType": auto.ControlTypeNames.get(cached.CachedControlType, ""),
+            "BoundingRectangle": {
+                "left": rect.left,
+                "top": rect.top,
+                "right": rect.right,
+                "bottom": rect.bottom,
+            },
+        }
+        cached_children = cached.GetCachedChildren()
+        if not cached_children:
+            return props, []
+        return props, [
+            cached_children.GetElement(i) for i in range(cached_children.Length)
+        ]
+
+
+class FakeControl:
+    """
+    Synthetic control for FakeControlProvider
+    """
+
+    __slots__ = ("name", "control_type", "rect", "children", "__weakref__")
+
+    def __init__(
+        self,
+        name: str,
+        control_type: str = "PaneControl",
+        rect: Optional[dict] = None,
+        children: Optional[List["FakeControl"]] = None,
+    ):
+        self.name = name
+        self.control_type = control_type
+        self.rect = rect or {"left": 0, "top": 0, "right": 0, "bottom": 0}
+        self.children = children or []
+
+
+class FakeControlProvider(ControlProvider):
+    """
+    Provider over FakeControl trees, counting reads. call_latency seconds
+    are spent in every read, like the round trip to the app.
+    """
+
+    def __init__(self, call_latency: float = 0.0):
+        self.call_latency = call_latency
+        self.call_num = 0
+        self.lock = threading.Lock()
+
+    def read(self, control):
+        with self.lock:
+            self.call_num += 1
+        if self.call_latency:
+            time.sleep(self.call_latency)
+        props = {
+            "Name": control.name,
+            "ControlType": control.control_type,
+            "BoundingRectangle": dict(control.rect),
+        }
+        return props, list(control.children)
+
+
+def walk_control_tree(
+    root, provider: ControlProvider, token: CaptureToken = None, **limits
+):
+    """
+    Walk the controls under root breadth first on a shared walker pool,
+    the capture pool unless limits name another pool_name.
+    Returns the tree and the walker, with the limits it hit.
+    """
+
+    def visit(control, depth):
+        props, children = provider.read(control)
+        props["Depth"] = depth
+        return props, children
+
+    def attach(tree, children):
+        tree["Children"] = children
+
+    walker = TreeWalker(visit, attach, token=token, **limits)
+    tree = walker.walk(root)
+    return tree, walker
@@ -0,0 +1,143 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Callable
+
+from .a11y import (
+    create_focus_source,
+    get_active_element_data,
+    get_foreground_key,
+    get_top_window,
+    get_top_window_name,
+)
+from .a11y.focus import FocusSource
+from .logger import logger
+
+
+class A11yService:
+    """
+    Accessibility queries shared by the producers of one recording.
+
+    Top window queries are cached while the foreground window (pid, and
+    hwnd on Windows) stays the same, for at most ttl seconds. The focus
+    source, polling or pushed by the OS, tells the subscribers when the top
+    window name changes. Element-at-point queries run on a small worker
+    pool, and concurrent queries of the same point share one result.
+    """
+
+    def __init__(
+        self, focus_source: FocusSource = None, ttl: float = 1.0, workers: int = 2
+    ):
+        self.focus_source = focus_source or create_focus_source()
+        self.ttl = ttl
+        self.workers = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="a11y-service"
+        )
+        self.lock = Lock()
+        # query name -> (foreground key, time, value)
+        self.cache = {}
+        # callback -> last name it was told
+        self.subscribers = {}
+        # (x, y) -> Future of the element query in flight
+        self.pending_elements = {}
+        self.running = False
+
+        # metrics
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.element_queries = 0
+        self.element_shared = 0
+
+    def _cached(self, name: str, fetch: Callable):
+        key = get_foreground_key()
+        now = time.perf_counter()
+        with self.lock:
+            entry = self.cache.get(name)
+            if entry is not None and entry[0] == key and now - entry[1] < self.ttl:
+                self.cache_hits += 1
+                return entry[2]
+            self.cache_misses += 1
+        value = fetch()
+        with self.lock:
+            self.cache[name] = (key, now, value)
+        return value
+
+    def top_window(self):
+        return self._cached("top_window", get_top_window)
+
+    def top_window_name(self):
+        return self._cached("top_window_name", get_top_window_name)
+
+    def subscribe_top_window(self, callback: Callable[[float, str], None]):
+        """
+        callback(time_stamp, top_window_name) is called with the current
+        name, then from the focus source whenever it changes
+        """
+        with self.lock:
+            self.subscribers[callback] = None
+        try:
+            top_window_name = self.top_window_name()
+        except Exception:
+            logger.exception("a11y_service subscribe_top_window error.")
+            return
+        if top_window_name is not None:
+            self._notify(time.perf_counter(), top_window_name)
+
+    def unsubscribe_top_window(self, callback):
+        with self.lock:
+            self.subscribers.pop(callback, None)
+
+    def _on_focus(self, time_stamp: float, top_window_name: str):
+        with self.lock:
+            # the name is fresher than the cache
+            self.cache.pop("top_window_name", None)
+            self.cache.pop("top_window", None)
+        self._notify(time_stamp, top_window_name)
+
+    def _notify(self, time_stamp: float, top_window_name: str):
+        with self.lock:
+            changed = [
+                callback
+                for callback, last_name in self.subscribers.items()
+                if last_name != top_window_name
+            ]
+            for callback in changed:
+                self.subscribers[callback] = top_window_name
+        for callback in changed:
+            callback(time_stamp, top_window_name)
+
+    def element_at(self, x, y) -> Future:
+        """
+        Future of the a11y tree of the element at (x, y)
+        """
+        key = (int(x), int(y))
+        with self.lock:
+            self.element_queries += 1
+            future = self.pending_elements.get(key)
+            if future is not None:
+                self.element_shared += 1
+                return future
+            future = self.workers.submit(get_active_element_data, x, y)
+            self.pending_elements[key] = future
+        future.add_done_callback(lambda _: self._element_done(key, future))
+        return future
+
+    def _element_done(self, key, future: Future):
+        with self.lock:
+            if self.pending_elements.get(key) is future:
+                del self.pending_elements[key]
+
+    def start(self):
+        self.running = True
+        self.focus_source.start(self._on_focus)
+
+    def stop(self):
+        if self.running:
+            self.running = False
+            self.focus_source.stop()
+        self.workers.shutdown(wait=True)
+        logger.info(
+            f"A11yService: top window cache {self.cache_hits} hits, "
+            f"{self.cache_misses} misses, {self.element_queries} element queries, "
+            f"{self.element_shared} shared"
+        )
@@ -0,0 +1,220 @@
+import os
+import hashlib
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Optional
+
+if __name__ == "__main__":
+    import sys
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parent_dir = os.path.abspath(os.path.join(current_dir, "../../"))
+    sys.path.append(parent_dir)
+    from api.core.time_index import TimeSeriesIndex
+    from api.core.utils import read_encrypted_jsonl, write_encrypted_jsonl
+else:
+    from .time_index import TimeSeriesIndex
+    from .utils import read_encrypted_jsonl, write_encrypted_jsonl
+
+BASE = "base"
+DELTA = "delta"
+ROOT_ID = "root"
+
+# attributes identifying a node among its siblings, macOS and Windows trees
+IDENTITY_KEYS = (
+    "AXRole",
+    "AXSubrole",
+    "AXDOMIdentifier",
+    "AXTitle",
+    "AXFrame",
+    "ControlType",
+    "Name",
+    "BoundingRectangle",
+)
+
+
+def _is_child_list(value) -> bool:
+    return (
+        isinstance(value, list)
+        and len(value) > 0
+        and all(isinstance(child, dict) for child in value)
+    )
+
+
+def _node_id(parent_id: str, key: str, child: dict, ordinal: int) -> str:
+    signature = "|".join(str(child.get(name, "")) for name in IDENTITY_KEYS)
+    path = f"{parent_id}/{key}/{signature}#{ordinal}"
+    return hashlib.blake2b(path.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def flatten_tree(tree: dict) -> dict:
+    """
+    Node table of a tree: node id -> {"attrs": ..., "children": {key: [ids]}}.
+
+    A node id hashes its parent id, the attribute holding it, its identity
+    attributes and its rank among siblings with the same identity, so a
+    node keeps its id across snapshots as long as it keeps its place.
+    Child lists are None in attrs, to keep the key order of the node.
+    """
+    nodes = {}
+    stack = [(ROOT_ID, tree)]
+    while stack:
+        node_id, node = stack.pop()
+        attrs, children = {}, {}
+        for key, value in node.items():
+            if not _is_child_list(value):
+                attrs[key] = value
+                continue
+            attrs[key] = None
+            child_ids, ordinals = [], {}
+            for child in value:
+                child_id = _node_id(node_id, key, child, 0)
+                ordinal = ordinals.get(child_id, 0)
+                ordinals[child_id] = ordinal + 1
+                if ordinal:
+                    child_id = _node_id(node_id, key, child, ordinal)
+                child_ids.append(child_id)
+                stack.append((child_id, child))
+            children[key] = child_ids
+        nodes[node_id] = {"attrs": attrs, "children": children}
+    return nodes
+
+
+def build_tree(nodes: dict, node_id: str = ROOT_ID) -> dict:
+    node = nodes[node_id]
+    tree = dict(node["attrs"])
+    for key, child_ids in node["children"].items():
+        tree[key] = [build_tree(nodes, child_id) for child_id in child_ids]
+    return tree
+
+
+class A11ySnapshotEncoder:
+    """
+    Encode consecutive a11y records as base and delta snapshots.
+
+    A base record keeps the full tree in "axtree". A delta record only lists
+    the ids of the removed nodes and the added or changed nodes, a node
+    whose children changed included. A base is written every base_interval
+    records, and whenever the delta would touch more than max_delta_ratio
+    of the nodes, e.g. after switching windows.
+    """
+
+    def __init__(self, base_interval: int = 20, max_delta_ratio: float = 0.5):
+        self.base_interval = base_interval
+        self.max_delta_ratio = max_delta_ratio
+        self.previous_nodes = None
+        self.delta_num = 0
+
+    def encode(self, record: dict) -> dict:
+        nodes = flatten_tree(record["axtree"])
+        previous_nodes, self.previous_nodes = self.previous_nodes, nodes
+
+        if previous_nodes is not None and self.delta_num < self.base_interval:
+            removed = [node_id for node_id in previous_nodes if node_id not in nodes]
+            changed = {
+                node_id: node
+                for node_id, node in nodes.items()
+                if previous_nodes.get(node_id) != node
+            }
+            if len(removed) + len(changed) <= self.max_delta_ratio * len(nodes):
+                self.delta_num += 1
+                return {
+                    "time_stamp": record["time_stamp"],
+                    "snapshot": DELTA,
+                    "removed": removed,
+                    "nodes": changed,
+                }
+
+        self.delta_num = 0
+        return {
+            "time_stamp": record["time_stamp"],
+            "snapshot": BASE,
+            "axtree": record["axtree"],
+        }
+
+
+class A11yTimeline:
+    """
+    Trees of the a11y.jsonl records, full or delta encoded.
+
+    A delta applies to the record before it in the file. The node table of
+    the last rebuilt record is kept, so walking the records forward applies
+    every delta once, and the last cache_size trees are cached.
+    """
+
+    def __init__(self, records: list, cache_size: int = 8):
+        self.records = records
+        self.index = TimeSeriesIndex(records)
+        self.base_positions = [
+            idx
+            for idx, record in enumerate(records)
+            if record.get("snapshot", BASE) == BASE
+        ]
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.state_idx = None
+        self.state = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def _nodes(self, idx: int) -> Optional[dict]:
+        base_pos = bisect_right(self.base_positions, idx) - 1
+        if base_pos < 0:
+            return None
+        base_idx = self.base_positions[base_pos]
+        if self.state_idx is None or not base_idx <= self.state_idx <= idx:
+            self.state = flatten_tree(self.records[base_idx]["axtree"])
+            self.state_idx = base_idx
+        for delta_idx in range(self.state_idx + 1, idx + 1):
+            delta = self.records[delta_idx]
+            for node_id in delta["removed"]:
+                self.state.pop(node_id, None)
+            self.state.update(delta["nodes"])
+        self.state_idx = idx
+        return self.state
+
+    def tree(self, idx: int) -> Optional[dict]:
+        """
+        Tree of the record at position idx
+        """
+        record = self.records[idx]
+        if record.get("snapshot", BASE) == BASE:
+            return record["axtree"]
+        if idx in self.cache:
+            self.cache.move_to_end(idx)
+            return self.cache[idx]
+        nodes = self._nodes(idx)
+        tree = None if nodes is None else build_tree(nodes)
+        self.cache[idx] = tree
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return tree
+
+    def tree_at(self, time_stamp: float) -> Optional[dict]:
+        """
+        Tree of the last record before time_stamp, or the first record
+        """
+        idx = self.index.pred(time_stamp)
+        return None if idx is None else self.tree(idx)
+
+
+def expand_a11y_snapshots(path: str, output_path: str = None) -> bool:
+    """
+    Write a delta encoded a11y.jsonl with a full tree in every record to
+    output_path, in place by default. False when there is nothing to expand.
+    """
+    if not os.path.exists(path):
+        return False
+    records = read_encrypted_jsonl(path)
+    if all(record.get("snapshot", BASE) == BASE for record in records):
+        return False
+    timeline = A11yTimeline(records)
+    write_encrypted_jsonl(
+        output_path or path,
+        [
+            {"time_stamp": record["time_stamp"], "axtree": timeline.tree(idx)}
+            for idx, record in enumerate(records)
+        ],
+    )
+    return True
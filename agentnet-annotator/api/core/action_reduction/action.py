@@ -3,7 +3,6 @@ import cv2
 import numpy as np
 from collections import OrderedDict
 from typing import List, Dict, Optional
-import time
 
 from copy import deepcopy
 
@@ -16,14 +15,19 @@ if __name__ == "__main__":
         MODIFIED_KEYS, MOUSE_LONG_PRESS_INTERVAL,
         wrap_func_key,
     )
+    from api.core.action_reduction.action_list import ActionList
     from api.core.logger import logger
 else:
     from .reduction_helper import (
         MODIFIED_KEYS, MOUSE_LONG_PRESS_INTERVAL,
         wrap_func_key,
     )
+    from .action_list import ActionList
     from ..logger import logger
 
+# color of the overlays in the video_overlays.json sidecar, (0, 0, 255) in BGR
+OVERLAY_COLOR = "#ff0000"
+
 
 class ActionBuilder:
     @staticmethod
@@ -227,104 +231,61 @@ class Action:
         else:
             return self.children[-1]._get_video_end_time()
 
-    def _get_video_name(self, recording_path):
-        for file_name in os.listdir(recording_path):
-            if file_name.endswith(".mp4"):
-                return file_name
-
     def process_start_end_time(self, start_time, end_time):
         if end_time - start_time < 0.5:
             start_time = start_time - 0.3
             end_time = end_time + 0.1
         return start_time, end_time
 
-    def to_video(self, recording_path, video_attrs, window_attrs):
+    def get_video_time_range(self, video_attrs):
+        """
+        Get the clip range of the action, relative to the start of the video
+        """
         video_start_time = video_attrs["video_start_time"]
         start_time = self._get_video_start_time() - video_start_time
         end_time = self._get_video_end_time() - video_start_time
-        start_time, end_time = self.process_start_end_time(
-            start_time, end_time)
-
-        video_clip_name = f"{self.id}_{self.action}"
+        return self.process_start_end_time(start_time, end_time)
 
-        if end_time <= start_time:
-            logger.warning(
-                f"action.py to_video error: Invalid time range for action {self.id}. Skipping."
-            )
-            return
-
-        video_name = self._get_video_name(recording_path)
-        video_path = os.path.join(recording_path, video_name)
-
-        max_attempts = 10
-        attempt = 0
-        cap = None
-        while attempt < max_attempts:
-            try:
-                cap = cv2.VideoCapture(video_path)
-                if cap.isOpened() and cap is not None:
-                    break
-                attempt += 1
-                logger.warning(
-                    f"Attempt {attempt} to open video file failed. Retrying in 1 second..."
-                )
-                time.sleep(1)
-            except Exception as e:
-                logger.exception(
-                    f"Error during attempt {attempt} to open video: {str(e)}")
-                attempt += 1
-                time.sleep(1)
-
-        fps = int(cap.get(cv2.CAP_PROP_FPS))
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        fourcc = cv2.VideoWriter_fourcc(*"avc1")
-
-        os.makedirs(os.path.join(recording_path, "video_clips"), exist_ok=True)
-        output_path = os.path.join(
-            recording_path, "video_clips", f"{video_clip_name}.mp4"
-        )
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-        video_attrs.update(
-            {
-                "fps": fps,
-                "width": width,
-                "height": height,
-                "total_frames": total_frames,
-            }
-        )
-
-        self.process_video_segment(
-            start_time,
-            end_time,
-            cap,
-            out,
-            video_attrs=video_attrs,
-            window_attrs=window_attrs,
-        )
-
-    def process_video_segment(
-        self, start_time, end_time, cap, out, video_attrs: dict, window_attrs: dict
-    ):
-        """
-        video_attrs["fps"], video_attrs["width"], video_attrs["height"], video_attrs["total_frames"]
-        window_attrs["height"], window_attrs["width"]
-        """
+    def get_frame_range(self, start_time, end_time, video_attrs):
         fps, total_frames = video_attrs["fps"], video_attrs["total_frames"]
         start_frame = max(0, int(start_time * fps))
         end_frame = min(total_frames, int(end_time * fps))
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        return start_frame, end_frame
 
-        for _ in range(start_frame, end_frame):
-            ret, frame = cap.read()
-            if not ret:
-                break
+    def init_video_overlay(
+        self, start_time, end_time, video_attrs: dict, window_attrs: dict
+    ) -> dict:
+        """
+        Prepare the drawing state of the clip, which is handed to
+        draw_video_overlay for every frame in [start_frame, end_frame)
+        """
+        start_frame, end_frame = self.get_frame_range(
+            start_time, end_time, video_attrs)
+        return {
+            "start_time": start_time,
+            "end_time": end_time,
+            "start_frame": start_frame,
+            "end_frame": end_frame,
+        }
 
-            out.write(frame)
+    def draw_video_overlay(self, frame, frame_number: int, overlay: dict):
+        """
+        Draw the action on one frame of its clip, in place
+        """
+        pass
 
-        cap.release()
-        out.release()
+    def overlay_dump(
+        self, start_time, end_time, video_attrs: dict, window_attrs: dict
+    ) -> list:
+        """
+        Describe the overlay of a stream-copied clip as shapes for the player.
+        "start"/"end" are seconds from the clip start, a shape without them
+        is shown for the whole clip. Points are in video pixels.
+        """
+        return []
+
+    def _overlay_time(self, time_stamp, start_time, video_attrs):
+        return round(max(0, time_stamp - video_attrs["video_start_time"] - start_time), 3)
 
 
 class Move(Action):
@@ -380,68 +341,98 @@ class Type(Action):
             self.description += wrap_func_key(key)
         logger.error("transform {}".format(self.key_names))
 
-    def process_video_segment(
-        self, start_time, end_time, cap, out, video_attrs, window_attrs
-    ):
-        video_start_time = video_attrs["video_start_time"]
-        fps, width, height, total_frames = (
-            video_attrs["fps"],
-            video_attrs["width"],
-            video_attrs["height"],
-            video_attrs["total_frames"],
+    def init_video_overlay(self, start_time, end_time, video_attrs, window_attrs):
+        overlay = super().init_video_overlay(
+            start_time, end_time, video_attrs, window_attrs
+        )
+        overlay.update(
+            {
+                "video_start_time": video_attrs["video_start_time"],
+                "fps": video_attrs["fps"],
+                "width": video_attrs["width"],
+                "height": video_attrs["height"],
+                "key_index": 0,
+                "current_key": "",
+            }
+        )
+        return overlay
+
+    def draw_video_overlay(self, frame, frame_number, overlay):
+        video_start_time, fps, width, height = (
+            overlay["video_start_time"],
+            overlay["fps"],
+            overlay["width"],
+            overlay["height"],
         )
-        start_frame = max(0, int(start_time * fps))
-        end_frame = min(total_frames, int(end_time * fps))
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-
         font_scale, font_thickness, font = 2.5, 3, cv2.FONT_HERSHEY_SIMPLEX
         text_color = (0, 0, 255)
-
-        key_index = 0
-        current_key = ""
         key_display_time = 0.5
 
-        for frame_number in range(start_frame, end_frame):
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            current_time = start_time + (frame_number - start_frame) / fps
+        key_index = overlay["key_index"]
+        current_time = overlay["start_time"] + (
+            frame_number - overlay["start_frame"]
+        ) / fps
 
-            # check if show new key
-            if (
-                key_index < len(self.time_trace)
-                and self.time_trace[key_index] <= current_time + video_start_time
-            ):
-                current_key = self.key_names[key_index]
-                key_index += 1
-            elif (
-                current_time + video_start_time
-                > self.time_trace[key_index - 1] + key_display_time
-            ):
-                current_key = ""  # clean key after show
+        # check if show new key
+        if (
+            key_index < len(self.time_trace)
+            and self.time_trace[key_index] <= current_time + video_start_time
+        ):
+            overlay["current_key"] = self.key_names[key_index]
+            overlay["key_index"] = key_index + 1
+        elif (
+            current_time + video_start_time
+            > self.time_trace[key_index - 1] + key_display_time
+        ):
+            overlay["current_key"] = ""  # clean key after show
 
-            if current_key:
-                text_size = cv2.getTextSize(
-                    current_key, font, font_scale, font_thickness
-                )[0]
-                text_x = (width - text_size[0]) // 2
-                text_y = height - 100
+        current_key = overlay["current_key"]
+        if current_key:
+            text_size = cv2.getTextSize(
+                current_key, font, font_scale, font_thickness
+            )[0]
+            text_x = (width - text_size[0]) // 2
+            text_y = height - 100
 
-                cv2.putText(
-                    frame,
-                    current_key,
-                    (text_x, text_y),
-                    font,
-                    font_scale,
-                    text_color,
-                    font_thickness,
-                )
+            cv2.putText(
+                frame,
+                current_key,
+                (text_x, text_y),
+                font,
+                font_scale,
+                text_color,
+                font_thickness,
+            )
 
-            out.write(frame)
+    def overlay_dump(self, start_time, end_time, video_attrs, window_attrs):
+        font_scale, font_thickness, font = 2.5, 3, cv2.FONT_HERSHEY_SIMPLEX
+        key_display_time = 0.5
+        width, height = video_attrs["width"], video_attrs["height"]
+        video_start_time = video_attrs["video_start_time"]
 
-        cap.release()
-        out.release()
+        shapes = []
+        for i, (key, time_stamp) in enumerate(zip(self.key_names, self.time_trace)):
+            hide_time = time_stamp + key_display_time
+            if i + 1 < len(self.time_trace):
+                hide_time = min(hide_time, self.time_trace[i + 1])
+            if hide_time < start_time + video_start_time:
+                continue
+            if time_stamp > end_time + video_start_time:
+                break
+            text_size = cv2.getTextSize(key, font, font_scale, font_thickness)[0]
+            shapes.append(
+                {
+                    "shape": "text",
+                    "text": key,
+                    "origin": [(width - text_size[0]) // 2, height - 100],
+                    "font_scale": font_scale,
+                    "thickness": font_thickness,
+                    "color": OVERLAY_COLOR,
+                    "start": self._overlay_time(time_stamp, start_time, video_attrs),
+                    "end": self._overlay_time(hide_time, start_time, video_attrs),
+                }
+            )
+        return shapes
 
 
 class Click(Action):  # single, double, triple, drag
@@ -574,72 +565,55 @@ class Click(Action):  # single, double, triple, drag
         )
         self.end_time = event["end_time"]
 
-    def process_video_segment(
-        self, start_time, end_time, cap, out, video_attrs, window_attrs
-    ):
+    def init_video_overlay(self, start_time, end_time, video_attrs, window_attrs):
         if self.action == "drag":
-            return self.process_drag_video_segment(
-                start_time, end_time, cap, out, video_attrs, window_attrs
+            return self.init_drag_video_overlay(
+                start_time, end_time, video_attrs, window_attrs
             )
         else:
-            return self.process_click_video_segment(
-                start_time, end_time, cap, out, video_attrs, window_attrs
+            return self.init_click_video_overlay(
+                start_time, end_time, video_attrs, window_attrs
             )
 
-    def process_click_video_segment(
-        self, start_time, end_time, cap, out, video_attrs, window_attrs
+    def draw_video_overlay(self, frame, frame_number, overlay):
+        if self.action == "drag":
+            return self.draw_drag_video_overlay(frame, frame_number, overlay)
+        else:
+            return self.draw_click_video_overlay(frame, frame_number, overlay)
+
+    def init_click_video_overlay(
+        self, start_time, end_time, video_attrs, window_attrs
     ):
-        fps, width, height, total_frames = (
-            video_attrs["fps"],
-            video_attrs["width"],
-            video_attrs["height"],
-            video_attrs["total_frames"],
+        overlay = super().init_video_overlay(
+            start_time, end_time, video_attrs, window_attrs
         )
+        width, height = video_attrs["width"], video_attrs["height"]
         height_ratio, width_ratio = (
             height / window_attrs["height"],
             width / window_attrs["width"],
         )
-        start_frame = max(0, int(start_time * fps))
-        end_frame = min(total_frames, int(end_time * fps))
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-
-        x, y = int(self.coordinate["x"] * height_ratio), int(
-            self.coordinate["y"] * width_ratio
+        overlay["center"] = (
+            int(self.coordinate["x"] * height_ratio),
+            int(self.coordinate["y"] * width_ratio),
         )
+        return overlay
 
-        for _ in range(start_frame, end_frame):
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            cv2.circle(frame, (x, y), 15, (0, 0, 255), 2)
-            out.write(frame)
+    def draw_click_video_overlay(self, frame, frame_number, overlay):
+        cv2.circle(frame, overlay["center"], 15, (0, 0, 255), 2)
 
-        cap.release()
-        out.release()
-
-    def process_drag_video_segment(
-        self, start_time, end_time, cap, out, video_attrs, window_attrs
+    def init_drag_video_overlay(
+        self, start_time, end_time, video_attrs, window_attrs
     ):
-        video_start_time = video_attrs["video_start_time"]
-        fps, width, height, total_frames = (
-            video_attrs["fps"],
-            video_attrs["width"],
-            video_attrs["height"],
-            video_attrs["total_frames"],
+        overlay = super().init_video_overlay(
+            start_time, end_time, video_attrs, window_attrs
         )
+        video_start_time = video_attrs["video_start_time"]
+        width, height = video_attrs["width"], video_attrs["height"]
         height_ratio, width_ratio = (
             height / window_attrs["height"],
             width / window_attrs["width"],
         )
-        start_frame = max(0, int(start_time * fps))
-        end_frame = min(total_frames, int(end_time * fps))
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
 
-        trace_color = (0, 0, 255)
-        trace_thickness = 2
-
-        arrow_color = (0, 0, 255)
         arrow_size = 20
 
         drawn_points = []
@@ -649,28 +623,26 @@ class Click(Action):  # single, double, triple, drag
         else:
             time_trace = self.drag_time_trace
             trace = self.drag_trace
-            
-        for time_point in time_trace:
+
+        for (x, y), time_point in zip(trace, time_trace):
             if (
                 start_time + video_start_time
                 <= time_point
                 <= end_time + video_start_time
             ):
-                x, y = trace[
-                    time_trace.index(time_point)
-                ]
                 x, y = int(x * width_ratio), int(y * height_ratio)
                 drawn_points.append((x, y))
-        
+
+        arrow = None
         mid_index = len(drawn_points) // 2
         if mid_index > 0:
             start_point = drawn_points[mid_index - 1]
             end_point = drawn_points[mid_index:mid_index+3][-1]
-            
+
             # Calculate direction for arrowhead
             direction = np.array(end_point) - np.array(start_point)
             norm = np.linalg.norm(direction)
-            
+
             if norm != 0:
                 direction = direction / norm * arrow_size
             else:
@@ -680,38 +652,67 @@ class Click(Action):  # single, double, triple, drag
 
             # Arrow tip points
             tip_point = tuple(map(int, np.array(start_point)))
-            
+
             # Calculate wing positions relative to the direction
             left_wing = tuple(map(int, np.array(tip_point) + perpendicular / 2 - direction / 2))
             right_wing = tuple(map(int, np.array(tip_point) - perpendicular / 2 - direction / 2))
+            arrow = np.array([tip_point, left_wing, right_wing], dtype=np.int32)
 
-        
-        for frame_number in range(start_frame, end_frame):
-            ret, frame = cap.read()
-            if not ret:
-                break
+        overlay["drawn_points"] = drawn_points
+        overlay["arrow"] = arrow
+        return overlay
 
-            if len(drawn_points) > 1:
-                for i in range(1, len(drawn_points)):
-                    cv2.line(
-                        frame,
-                        drawn_points[i - 1],
-                        drawn_points[i],
-                        trace_color,
-                        trace_thickness,
-                    )
-
-                # Draw filled arrowhead (triangle)
-                cv2.fillPoly(
+    def draw_drag_video_overlay(self, frame, frame_number, overlay):
+        trace_color = (0, 0, 255)
+        trace_thickness = 2
+        arrow_color = (0, 0, 255)
+
+        drawn_points = overlay["drawn_points"]
+        if len(drawn_points) > 1:
+            for i in range(1, len(drawn_points)):
+                cv2.line(
                     frame,
-                    [np.array([tip_point, left_wing, right_wing], dtype=np.int32)],
-                    arrow_color
+                    drawn_points[i - 1],
+                    drawn_points[i],
+                    trace_color,
+                    trace_thickness,
                 )
 
-            out.write(frame)
+            # Draw filled arrowhead (triangle)
+            cv2.fillPoly(frame, [overlay["arrow"]], arrow_color)
+
+    def overlay_dump(self, start_time, end_time, video_attrs, window_attrs):
+        overlay = self.init_video_overlay(
+            start_time, end_time, video_attrs, window_attrs
+        )
+        if self.action != "drag":
+            return [
+                {
+                    "shape": "circle",
+                    "center": list(overlay["center"]),
+                    "radius": 15,
+                    "thickness": 2,
+                    "color": OVERLAY_COLOR,
+                }
+            ]
 
-        cap.release()
-        out.release()
+        drawn_points = overlay["drawn_points"]
+        if len(drawn_points) <= 1:
+            return []
+        return [
+            {
+                "shape": "polyline",
+                "points": [list(point) for point in drawn_points],
+                "thickness": 2,
+                "color": OVERLAY_COLOR,
+            },
+            {
+                "shape": "polygon",
+                "points": overlay["arrow"].tolist(),
+                "fill": True,
+                "color": OVERLAY_COLOR,
+            },
+        ]
 
 
 class Press(Action):  # type, press, long press
@@ -757,16 +758,24 @@ class Press(Action):  # type, press, long press
 
         # TODO: sort by time, include child action
         if len(self.children) > 1:
-            for i in range(len(self.children) - 1, 0, -1):
+            # one pass from the end, children moved into their previous
+            # sibling are unlinked instead of popped from the list
+            children = ActionList(self.children)
+            node = children.tail
+            while node is not None and node.prev is not None:
+                prev_node = node.prev
+                prev, child = prev_node.action, node.action
                 if (
-                    self.children[i - 1].end_time and self.children[i].end_time
-                    and self.children[i - 1].start_time < self.children[i].start_time
-                    and self.children[i - 1].end_time > self.children[i].end_time
+                    prev.end_time and child.end_time
+                    and prev.start_time < child.start_time
+                    and prev.end_time > child.end_time
                 ):
-                    logger.warning("Reducer: re-arrange: {} {} {}".format(
-                        i-1, i, self.children[i].key))
-                    child = self.children.pop(i)
-                    self.children[i - 1].add_child(child)
+                    logger.warning("Reducer: re-arrange: {} {}".format(
+                        prev.key, child.key))
+                    children.remove(node)
+                    prev.add_child(child)
+                node = prev_node
+            self.children[:] = children.to_list()
 
         if self.children and len(self.children) > 0:
             for child in self.children:
@@ -797,24 +806,15 @@ class Press(Action):  # type, press, long press
 
         
         
-    def process_video_segment(
-        self, start_time, end_time, cap, out, video_attrs, window_attrs
-    ):
-        fps, width, height, total_frames = (
-            video_attrs["fps"],
-            video_attrs["width"],
-            video_attrs["height"],
-            video_attrs["total_frames"],
+    def init_video_overlay(self, start_time, end_time, video_attrs, window_attrs):
+        overlay = super().init_video_overlay(
+            start_time, end_time, video_attrs, window_attrs
         )
-
-        start_frame = max(0, int(start_time * fps))
-        end_frame = min(total_frames, int(end_time * fps))
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        width, height = video_attrs["width"], video_attrs["height"]
 
         font_scale = 1
         font_thickness = 2
         font = cv2.FONT_HERSHEY_SIMPLEX
-        text_color = (0, 0, 255)  # 红色
 
         # remove emoji
         display_text = ""
@@ -825,30 +825,43 @@ class Press(Action):  # type, press, long press
                 else self.description
             )
 
-        for frame_number in range(start_frame, end_frame):
-            ret, frame = cap.read()
-            if not ret:
-                break
+        text_size = cv2.getTextSize(display_text, font, font_scale, font_thickness)[
+            0
+        ]
+        overlay["display_text"] = display_text
+        overlay["text_origin"] = ((width - text_size[0]) // 2, height - 60)
+        return overlay
 
-            text_size = cv2.getTextSize(display_text, font, font_scale, font_thickness)[
-                0
-            ]
-            text_x = (width - text_size[0]) // 2
-            text_y = height - 60
+    def draw_video_overlay(self, frame, frame_number, overlay):
+        font_scale = 1
+        font_thickness = 2
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        text_color = (0, 0, 255)  # 红色
 
-            cv2.putText(
-                frame,
-                display_text,
-                (text_x, text_y),
-                font,
-                font_scale,
-                text_color,
-                font_thickness,
-            )
-            out.write(frame)
+        cv2.putText(
+            frame,
+            overlay["display_text"],
+            overlay["text_origin"],
+            font,
+            font_scale,
+            text_color,
+            font_thickness,
+        )
 
-        cap.release()
-        out.release()
+    def overlay_dump(self, start_time, end_time, video_attrs, window_attrs):
+        overlay = self.init_video_overlay(
+            start_time, end_time, video_attrs, window_attrs
+        )
+        return [
+            {
+                "shape": "text",
+                "text": overlay["display_text"],
+                "origin": list(overlay["text_origin"]),
+                "font_scale": 1,
+                "thickness": 2,
+                "color": OVERLAY_COLOR,
+            }
+        ]
 
     def set_exception_end_event(self):
         self.complete = True
@@ -936,80 +949,141 @@ class Scroll(Action):
             self.description += "{}×{}  ".format(
                 direction, direction_count[direction])
 
-    def process_video_segment(
-        self, start_time, end_time, cap, out, video_attrs, window_attrs
-    ):
-        video_start_time = video_attrs["video_start_time"]
-        fps, width, height, total_frames = (
-            video_attrs["fps"],
-            video_attrs["width"],
-            video_attrs["height"],
-            video_attrs["total_frames"],
+    def init_video_overlay(self, start_time, end_time, video_attrs, window_attrs):
+        overlay = super().init_video_overlay(
+            start_time, end_time, video_attrs, window_attrs
         )
-        height_ratio, width_ratio = (
-            height / window_attrs["height"],
-            width / window_attrs["width"],
+        width, height = video_attrs["width"], video_attrs["height"]
+        overlay.update(
+            {
+                "video_start_time": video_attrs["video_start_time"],
+                "fps": video_attrs["fps"],
+                "width": width,
+                "height": height,
+                "height_ratio": height / window_attrs["height"],
+                "width_ratio": width / window_attrs["width"],
+                "scroll_index": 0,
+                "last_scroll_time": None,
+                "scroll": None,
+            }
+        )
+        return overlay
+
+    def draw_video_overlay(self, frame, frame_number, overlay):
+        video_start_time, fps, width, height = (
+            overlay["video_start_time"],
+            overlay["fps"],
+            overlay["width"],
+            overlay["height"],
         )
-        start_frame = max(0, int(start_time * fps))
-        end_frame = min(total_frames, int(end_time * fps))
-        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
-
-        scroll_index = 0
-        last_scroll_time = None
         min_display_time = 0.2
 
-        for frame_number in range(start_frame, end_frame):
-            ret, frame = cap.read()
-            if not ret:
-                break
+        scroll_index = overlay["scroll_index"]
+        current_time = overlay["start_time"] + (
+            frame_number - overlay["start_frame"]
+        ) / fps
 
-            current_time = start_time + (frame_number - start_frame) / fps
+        # new scroll
+        if (
+            scroll_index < len(self.time_trace)
+            and self.time_trace[scroll_index] <= current_time + video_start_time
+        ):
+            overlay["last_scroll_time"] = current_time
+            trace = self.trace[scroll_index]
+            overlay["scroll"] = (
+                int(trace["x"] * overlay["width_ratio"]),
+                int(trace["y"] * overlay["height_ratio"]),
+                trace["dx"],
+                trace["dy"],
+            )
+            scroll_index += 1
+            overlay["scroll_index"] = scroll_index
 
-            # new scroll
+        # if one scroll is showing
+        last_scroll_time = overlay["last_scroll_time"]
+        if last_scroll_time is not None:
+            # check if continue showing
             if (
-                scroll_index < len(self.time_trace)
-                and self.time_trace[scroll_index] <= current_time + video_start_time
+                current_time - last_scroll_time < min_display_time
+                or scroll_index == len(self.time_trace)
             ):
-                last_scroll_time = current_time
-                trace = self.trace[scroll_index]
-                x, y = int(
-                    trace["x"] * width_ratio), int(trace["y"] * height_ratio)
-                dx, dy = trace["dx"], trace["dy"]
-                scroll_index += 1
-
-            # if one scroll is showing
-            if last_scroll_time is not None:
-                # check if continue showing
-                if (
-                    current_time - last_scroll_time < min_display_time
-                    or scroll_index == len(self.time_trace)
-                ):
-                    # Draw arrow
-                    arrow_length = 60
-                    end_x = max(0, min(width - 1, x - int(dx * arrow_length)))
-                    end_y = max(0, min(height - 1, y - int(dy * arrow_length)))
-                    cv2.arrowedLine(
-                        frame, (x, y), (end_x, end_y), (0, 0, 255), 2, tipLength=0.3
-                    )
-
-                    # Add direction text
-                    direction_text = "Scroll " + self._get_direction_text(
-                        np.sign(dx), np.sign(dy)
-                    )
-                    text_x = x + 20 if x < width / 2 else x - 20
-                    cv2.putText(
-                        frame,
-                        direction_text,
-                        (int(text_x), y),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        1,
-                        (0, 0, 255),
-                        2,
-                    )
-                else:
-                    last_scroll_time = None  # stop current scroll
-
-            out.write(frame)
-
-        cap.release()
-        out.release()
+                x, y, dx, dy = overlay["scroll"]
+                # Draw arrow
+                arrow_length = 60
+                end_x = max(0, min(width - 1, x - int(dx * arrow_length)))
+                end_y = max(0, min(height - 1, y - int(dy * arrow_length)))
+                cv2.arrowedLine(
+                    frame, (x, y), (end_x, end_y), (0, 0, 255), 2, tipLength=0.3
+                )
+
+                # Add direction text
+                direction_text = "Scroll " + self._get_direction_text(
+                    np.sign(dx), np.sign(dy)
+                )
+                text_x = x + 20 if x < width / 2 else x - 20
+                cv2.putText(
+                    frame,
+                    direction_text,
+                    (int(text_x), y),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    1,
+                    (0, 0, 255),
+                    2,
+                )
+            else:
+                overlay["last_scroll_time"] = None  # stop current scroll
+
+    def overlay_dump(self, start_time, end_time, video_attrs, window_attrs):
+        width, height = video_attrs["width"], video_attrs["height"]
+        height_ratio, width_ratio = (
+            height / window_attrs["height"],
+            width / window_attrs["width"],
+        )
+        video_start_time = video_attrs["video_start_time"]
+        min_display_time = 0.2
+        arrow_length = 60
+
+        shapes = []
+        for i, (trace, time_stamp) in enumerate(zip(self.trace, self.time_trace)):
+            if time_stamp > end_time + video_start_time:
+                break
+            # the last scroll stays until the end of the clip
+            hide_time = None
+            if i + 1 < len(self.time_trace):
+                hide_time = min(time_stamp + min_display_time, self.time_trace[i + 1])
+                if hide_time < start_time + video_start_time:
+                    continue
+
+            x, y = int(trace["x"] * width_ratio), int(trace["y"] * height_ratio)
+            dx, dy = trace["dx"], trace["dy"]
+            end_x = max(0, min(width - 1, x - int(dx * arrow_length)))
+            end_y = max(0, min(height - 1, y - int(dy * arrow_length)))
+            text_x = x + 20 if x < width / 2 else x - 20
+
+            timing = {"start": self._overlay_time(time_stamp, start_time, video_attrs)}
+            if hide_time is not None:
+                timing["end"] = self._overlay_time(hide_time, start_time, video_attrs)
+            shapes.append(
+                {
+                    "shape": "arrow",
+                    "from": [x, y],
+                    "to": [end_x, end_y],
+                    "tip_length": 0.3,
+                    "thickness": 2,
+                    "color": OVERLAY_COLOR,
+                    **timing,
+                }
+            )
+            shapes.append(
+                {
+                    "shape": "text",
+                    "text": "Scroll "
+                    + self._get_direction_text(np.sign(dx), np.sign(dy)),
+                    "origin": [int(text_x), y],
+                    "font_scale": 1,
+                    "thickness": 2,
+                    "color": OVERLAY_COLOR,
+                    **timing,
+                }
+            )
+        return shapes
@@ -0,0 +1,61 @@
+from typing import Iterable, Iterator, Optional
+
+
+class ActionNode:
+    __slots__ = ("action", "prev", "next")
+
+    def __init__(self, action):
+        self.action = action
+        self.prev: Optional["ActionNode"] = None
+        self.next: Optional["ActionNode"] = None
+
+
+class ActionList:
+    """
+    Doubly linked list of sibling actions.
+
+    Removing an action or merging it into its neighbour while walking the
+    list is O(1), where list.pop(i) shifts the whole tail.
+    """
+
+    def __init__(self, actions: Iterable = ()):
+        self.head: Optional[ActionNode] = None
+        self.tail: Optional[ActionNode] = None
+        self.size = 0
+        for action in actions:
+            self.append(action)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self) -> Iterator:
+        node = self.head
+        while node is not None:
+            yield node.action
+            node = node.next
+
+    def append(self, action) -> ActionNode:
+        node = ActionNode(action)
+        if self.tail is None:
+            self.head = node
+        else:
+            self.tail.next = node
+            node.prev = self.tail
+        self.tail = node
+        self.size += 1
+        return node
+
+    def remove(self, node: ActionNode):
+        if node.prev is None:
+            self.head = node.next
+        else:
+            node.prev.next = node.next
+        if node.next is None:
+            self.tail = node.prev
+        else:
+            node.next.prev = node.prev
+        node.prev = node.next = None
+        self.size -= 1
+
+    def to_list(self) -> list:
+        return list(self)
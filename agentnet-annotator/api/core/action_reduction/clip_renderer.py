@@ -0,0 +1,391 @@
+import os
+import copy
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import cv2
+
+if __name__ == "__main__":
+    import sys
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parent_dir = os.path.abspath(os.path.join(current_dir, "../../../"))
+    sys.path.append(parent_dir)
+    from api.core.logger import logger
+    from api.core.constants import VIDEO_OVERLAY_FILE
+    from api.core.utils import stream_copy_clip, write_encrypted_json
+else:
+    from ..logger import logger
+    from ..constants import VIDEO_OVERLAY_FILE
+    from ..utils import stream_copy_clip, write_encrypted_json
+
+
+# Gaps between clips shorter than this are decoded through with grab()
+# instead of seeking, seeking costs a keyframe decode anyway
+SEEK_FRAME_THRESHOLD = 120
+
+# Attributes the overlays never read, dropped before actions are sent to workers
+UNPICKLED_ACTION_ATTRS = ("axtree", "target", "past_frame_target", "gpt_target")
+
+
+def find_video_name(recording_path):
+    for file_name in os.listdir(recording_path):
+        if file_name.endswith(".mp4"):
+            return file_name
+    return None
+
+
+def open_video_capture(video_path, max_attempts=10):
+    attempt = 0
+    cap = None
+    while attempt < max_attempts:
+        try:
+            cap = cv2.VideoCapture(video_path)
+            if cap is not None and cap.isOpened():
+                return cap
+            attempt += 1
+            logger.warning(
+                f"Attempt {attempt} to open video file failed. Retrying in 1 second..."
+            )
+            time.sleep(1)
+        except Exception as e:
+            logger.exception(f"Error during attempt {attempt} to open video: {str(e)}")
+            attempt += 1
+            time.sleep(1)
+    return cap
+
+
+class VideoClip:
+    """
+    One output clip: the action, its frame range in the source video and its writer
+    """
+
+    def __init__(self, action, start_time, end_time, output_path):
+        self.action = action
+        self.start_time = start_time
+        self.end_time = end_time
+        self.output_path = output_path
+        self.start_frame = None
+        self.end_frame = None
+        self.overlay = None
+        self.out = None
+
+
+class ClipRenderer:
+    """
+    Render the video clips of all actions in one ordered decode of the source video.
+
+    Every decoded frame is handed to each clip whose [start_frame, end_frame)
+    covers it, so overlapping pre-move and buffer windows are decoded once.
+    """
+
+    def __init__(self, recording_path, video_attrs: dict, window_attrs: dict):
+        self.recording_path = recording_path
+        self.video_attrs = video_attrs
+        self.window_attrs = window_attrs
+        self.clips_dir = os.path.join(recording_path, "video_clips")
+        self.video_path = None
+
+    def build_clips(self, actions) -> List[VideoClip]:
+        clips = []
+        for action in actions:
+            start_time, end_time = action.get_video_time_range(self.video_attrs)
+            if end_time <= start_time:
+                logger.warning(
+                    f"ClipRenderer: Invalid time range for action {action.id}. Skipping."
+                )
+                continue
+            output_path = os.path.join(
+                self.clips_dir, f"{action.id}_{action.action}.mp4"
+            )
+            clips.append(VideoClip(action, start_time, end_time, output_path))
+        return clips
+
+    def open_source(self):
+        if self.video_path is None:
+            video_name = find_video_name(self.recording_path)
+            if video_name is None:
+                raise FileNotFoundError(f"No video found in {self.recording_path}")
+            self.video_path = os.path.join(self.recording_path, video_name)
+
+        cap = open_video_capture(self.video_path)
+        if cap is None or not cap.isOpened():
+            raise IOError(f"Failed to open video {self.video_path}")
+
+        self.video_attrs.update(
+            {
+                "fps": int(cap.get(cv2.CAP_PROP_FPS)),
+                "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                "total_frames": int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            }
+        )
+        return cap
+
+    def render_parallel(self, actions, workers: int = None) -> int:
+        """
+        Split the clips into contiguous time shards and render each shard in a
+        worker process, which opens the source once and renders its shard in order
+        """
+        workers = workers or os.cpu_count() or 1
+        os.makedirs(self.clips_dir, exist_ok=True)
+        clips = self.build_clips(actions)
+        if len(clips) == 0:
+            return 0
+
+        cap = self.open_source()
+        cap.release()
+        for clip in clips:
+            clip.start_frame, clip.end_frame = clip.action.get_frame_range(
+                clip.start_time, clip.end_time, self.video_attrs
+            )
+        shards = split_into_shards(clips, workers)
+        if len(shards) <= 1:
+            return self.render(actions)
+
+        logger.info(
+            f"ClipRenderer: rendering {len(clips)} clips in {len(shards)} shards"
+        )
+        # spawn: the recorder process runs Qt and listener threads, unsafe to fork
+        with ProcessPoolExecutor(
+            max_workers=len(shards), mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            futures = [
+                executor.submit(
+                    render_shard,
+                    self.recording_path,
+                    self.video_path,
+                    self.video_attrs,
+                    self.window_attrs,
+                    shard_idx,
+                    [strip_action(clip.action) for clip in shard],
+                )
+                for shard_idx, shard in enumerate(shards)
+            ]
+            for shard_idx, future in enumerate(futures):
+                try:
+                    timing = future.result()
+                except Exception as e:
+                    logger.exception(
+                        f"ClipRenderer: shard {shard_idx} failed in worker, rendering in process: {str(e)}"
+                    )
+                    timing = render_shard(
+                        self.recording_path,
+                        self.video_path,
+                        self.video_attrs,
+                        self.window_attrs,
+                        shard_idx,
+                        [clip.action for clip in shards[shard_idx]],
+                    )
+                logger.info(
+                    "ClipRenderer: shard {shard} frames [{start_frame}, {end_frame}) "
+                    "{clip_num} clips in {time:.2f}s".format(**timing)
+                )
+        return len(clips)
+
+    def render_stream_copy(self, actions) -> int:
+        """
+        Cut the clips out of the source video with ffmpeg stream copy, no
+        re-encoding. The overlays go to the VIDEO_OVERLAY_FILE sidecar for the
+        player to draw; clips ffmpeg fails on are re-encoded with burned-in overlays.
+        """
+        os.makedirs(self.clips_dir, exist_ok=True)
+        clips = self.build_clips(actions)
+        if len(clips) == 0:
+            return 0
+
+        cap = self.open_source()
+        cap.release()
+
+        overlays = {}
+        failed_actions = []
+        for clip in clips:
+            start_time = max(0, clip.start_time)
+            if not stream_copy_clip(
+                self.video_path, clip.output_path, start_time, clip.end_time
+            ):
+                failed_actions.append(clip.action)
+                continue
+            overlays[os.path.basename(clip.output_path)] = {
+                "start_time": round(start_time, 3),
+                "end_time": round(clip.end_time, 3),
+                "width": self.video_attrs["width"],
+                "height": self.video_attrs["height"],
+                "shapes": clip.action.overlay_dump(
+                    start_time, clip.end_time, self.video_attrs, self.window_attrs
+                ),
+            }
+        write_encrypted_json(
+            os.path.join(self.recording_path, VIDEO_OVERLAY_FILE), overlays
+        )
+
+        if failed_actions:
+            logger.warning(
+                f"ClipRenderer: stream copy failed for {len(failed_actions)} clips, re-encoding them"
+            )
+            self.render(failed_actions)
+        return len(clips)
+
+    def render(self, actions) -> int:
+        """
+        Render the clips of the given actions, return the number of clips written
+        """
+        os.makedirs(self.clips_dir, exist_ok=True)
+        clips = self.build_clips(actions)
+        if len(clips) == 0:
+            return 0
+
+        cap = self.open_source()
+        try:
+            self._render_clips(cap, clips)
+        finally:
+            cap.release()
+        return len(clips)
+
+    def _open_clip(self, clip: VideoClip):
+        fourcc = cv2.VideoWriter_fourcc(*"avc1")
+        clip.out = cv2.VideoWriter(
+            clip.output_path,
+            fourcc,
+            self.video_attrs["fps"],
+            (self.video_attrs["width"], self.video_attrs["height"]),
+        )
+        clip.overlay = clip.action.init_video_overlay(
+            clip.start_time, clip.end_time, self.video_attrs, self.window_attrs
+        )
+
+    def _close_clip(self, clip: VideoClip):
+        if clip.out is not None:
+            clip.out.release()
+            clip.out = None
+        clip.overlay = None
+
+    def _render_clips(self, cap, clips: List[VideoClip]):
+        pending = []
+        for clip in clips:
+            clip.start_frame, clip.end_frame = clip.action.get_frame_range(
+                clip.start_time, clip.end_time, self.video_attrs
+            )
+            if clip.end_frame <= clip.start_frame:
+                # empty frame range, still leave a clip file for the action
+                self._open_clip(clip)
+                self._close_clip(clip)
+            else:
+                pending.append(clip)
+
+        # pop() from the end yields the clip with the earliest first frame
+        pending.sort(key=lambda clip: clip.start_frame, reverse=True)
+        active: List[VideoClip] = []
+
+        position = 0
+        try:
+            while pending or active:
+                if not active:
+                    next_frame = pending[-1].start_frame
+                    if next_frame - position > SEEK_FRAME_THRESHOLD:
+                        cap.set(cv2.CAP_PROP_POS_FRAMES, next_frame)
+                        position = next_frame
+                    while position < next_frame and cap.grab():
+                        position += 1
+                    if position < next_frame:
+                        break
+
+                while pending and pending[-1].start_frame <= position:
+                    clip = pending.pop()
+                    self._open_clip(clip)
+                    active.append(clip)
+
+                ret, frame = cap.read()
+                if not ret:
+                    break
+
+                for i, clip in enumerate(active):
+                    # every clip but the last draws on its own copy of the frame
+                    clip_frame = frame if i == len(active) - 1 else frame.copy()
+                    clip.action.draw_video_overlay(clip_frame, position, clip.overlay)
+                    clip.out.write(clip_frame)
+                position += 1
+
+                for clip in active:
+                    if clip.end_frame <= position:
+                        self._close_clip(clip)
+                active = [clip for clip in active if clip.out is not None]
+        finally:
+            # clips cut short by the end of the video keep what was written
+            for clip in active:
+                self._close_clip(clip)
+            for clip in pending:
+                self._open_clip(clip)
+                self._close_clip(clip)
+
+
+def split_into_shards(clips: List[VideoClip], shard_num: int) -> List[List[VideoClip]]:
+    """
+    Split clips ordered by start frame into at most shard_num contiguous shards
+    holding roughly the same number of frames
+    """
+    clips = sorted(clips, key=lambda clip: clip.start_frame)
+    total_frames = sum(max(0, clip.end_frame - clip.start_frame) for clip in clips)
+    shard_frames = total_frames / max(1, shard_num)
+
+    shards = []
+    shard = []
+    frames = 0
+    for clip in clips:
+        shard.append(clip)
+        frames += max(0, clip.end_frame - clip.start_frame)
+        if frames >= shard_frames and len(shards) < shard_num - 1:
+            shards.append(shard)
+            shard = []
+            frames = 0
+    if shard:
+        shards.append(shard)
+    return shards
+
+
+def strip_action(action):
+    """
+    Shallow copy of the action without the attributes that are expensive to pickle
+    """
+    action = copy.copy(action)
+    for attr in UNPICKLED_ACTION_ATTRS:
+        if hasattr(action, attr):
+            setattr(action, attr, None)
+    return action
+
+
+def render_shard(
+    recording_path, video_path, video_attrs, window_attrs, shard_idx, actions
+) -> dict:
+    """
+    Worker entry: render one shard with its own decoder
+    """
+    start_time = time.perf_counter()
+    renderer = ClipRenderer(
+        recording_path=recording_path,
+        video_attrs=dict(video_attrs),
+        window_attrs=window_attrs,
+    )
+    renderer.video_path = video_path
+    clip_num = renderer.render(actions)
+
+    start_frame, end_frame = 0, 0
+    if len(actions) > 0:
+        frame_ranges = [
+            action.get_frame_range(
+                *action.get_video_time_range(renderer.video_attrs),
+                renderer.video_attrs,
+            )
+            for action in actions
+        ]
+        start_frame = min(frame_range[0] for frame_range in frame_ranges)
+        end_frame = max(frame_range[1] for frame_range in frame_ranges)
+    return {
+        "shard": shard_idx,
+        "clip_num": clip_num,
+        "start_frame": start_frame,
+        "end_frame": end_frame,
+        "time": time.perf_counter() - start_time,
+    }
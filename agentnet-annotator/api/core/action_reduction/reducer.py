@@ -4,12 +4,12 @@ import sys
 import time
 import json
 import threading
-import queue
 import platform
 import ctypes
 import re
 from pathlib import Path
 import shutil
+from bisect import bisect_right
 
 
 def set_dll_path():
@@ -46,9 +46,15 @@ if __name__ == "__main__":
     parent_dir = os.path.abspath(os.path.join(current_dir, "../../../"))
     sys.path.append(parent_dir)
     from api.core.action_reduction.action import *
+    from api.core.action_reduction.action_list import ActionList
     from api.core.action_reduction.reduction_helper import *
+    from api.core.action_reduction.clip_renderer import ClipRenderer
+    from api.core.action_reduction.trace_compression import compress_trace
     from api.core.logger import logger
-    from api.core.a11y import parse_element
+    from api.core.a11y import parse_element_batches
+    from api.core.time_index import TimeSeriesIndex
+    from api.core.a11y_snapshot import A11yTimeline
+    from api.core.event_log import EventLog, get_event_log_path
     from api.core.utils import (
         get_recordings_dir,
         write_encrypted_jsonl,
@@ -56,10 +62,16 @@ if __name__ == "__main__":
     )
 else:
     from .action import *
+    from .action_list import ActionList
     from .reduction_helper import *
+    from .clip_renderer import ClipRenderer
+    from .trace_compression import compress_trace
     from ..logger import logger
     from ..ai_assistant import predict_targets
-    from ..a11y import parse_element
+    from ..a11y import parse_element_batches
+    from ..time_index import TimeSeriesIndex
+    from ..a11y_snapshot import A11yTimeline
+    from ..event_log import EventLog, get_event_log_path
     from ..utils import (
         get_recordings_dir,
         write_encrypted_jsonl,
@@ -76,6 +88,10 @@ class Reducer:
         self.event_buffer = []
         self.active_events = set()
         self.active_actions = {}
+        # key -> unmatched press events in buffer order
+        self.open_press_events = {}
+        # key -> (index, action) of incomplete press actions in reduced_actions
+        self.open_actions = {}
         self.errors = []
         self.remove_redundant_move = True
         self.built_actions = []
@@ -83,9 +99,24 @@ class Reducer:
         self.pre_move = None
         self.window_attrs = window_attrs
 
+        # online reduction: events fed by the recorder while recording
+        self.online = True
+        self.online_lock = threading.Lock()
+        self.online_event_num = 0
+        # event_idx of the last event reduced online
+        self.online_event_idx = -1
+
         self.terminate_method = "click"
         self.generate_window_a11y = configs["generate_window_a11y"]
         self.generate_element_a11y = configs["generate_element_a11y"]
+        # "single_pass": one decoder in this process, "process_pool": time shards in worker processes,
+        # "stream_copy": ffmpeg stream copies, overlays in VIDEO_OVERLAY_FILE for the player
+        self.clip_render_mode = configs.get("clip_render_mode", "single_pass")
+        self.clip_workers = configs.get("clip_workers", None)
+        # None: keep full move traces, "rdp" or "time_bucket": see compress_trace
+        self.trace_compression = configs.get("trace_compression", None)
+        self.trace_max_error = configs.get("trace_max_error", 2.0)
+        self.trace_bucket_interval = configs.get("trace_bucket_interval", 0.05)
         self.flatten = False
 
         self.reduce_status = {}
@@ -100,6 +131,27 @@ class Reducer:
         for event in events:
             self._compress_event(event)
 
+    def compress_event_log(self, event_log: EventLog, start: int = 0):
+        """
+        Compress the raw events of a binary event log from start on.
+        Runs of moves extend the pre_move trace straight from the columns.
+        """
+        idx = start
+        for run_start, run_end in event_log.move_runs(start):
+            for i in range(idx, run_start):
+                self._compress_event(event_log.event(i))
+            if self.pre_move is None:
+                self._compress_event(event_log.event(run_start))
+                run_start += 1
+            trace, time_trace = event_log.move_trace(run_start, run_end)
+            if len(time_trace) > 0:
+                self.pre_move["trace"].extend(trace)
+                self.pre_move["time_trace"].extend(time_trace)
+                self.pre_move["end_time"] = time_trace[-1]
+            idx = run_end
+        for i in range(idx, len(event_log)):
+            self._compress_event(event_log.event(i))
+
     def _compress_event(self, event):
         """
         Add one raw event to event_buffer.
@@ -141,6 +193,58 @@ class Reducer:
         else:
             raise ValueError("Event type {} is not supported.".format(event["action"]))
 
+    def feed_event(self, event):
+        """
+        Compress and reduce one raw event while recording, reduce_pipeline
+        then only finishes what the recording left open
+        """
+        with self.online_lock:
+            if not self.online:
+                return
+            try:
+                self._compress_event(event)
+                self.online_event_num += 1
+                self.online_event_idx = event["event_idx"]
+                self.reduce_all(final=False)
+            except Exception as e:
+                # fall back to reducing the whole recording after it stops
+                logger.exception(f"Reducer: feed_event failed, online reduction off: {str(e)}")
+                self.online = False
+                self.online_event_num = 0
+                self.online_event_idx = -1
+                self._reset_reduction()
+
+    def _online_resume_position(self, event_idxs) -> int:
+        """
+        Position of the first recorded event the online reduction has not
+        seen. Found by event_idx, not by count: the writers drop the records
+        they fail to encode.
+        """
+        if self.online_event_num == 0:
+            return 0
+        return bisect_right(event_idxs, self.online_event_idx)
+
+    def _reset_reduction(self):
+        self.reduced_actions = []
+        self.event_buffer = []
+        self.active_events = set()
+        self.active_actions = {}
+        self.open_press_events = {}
+        self.open_actions = {}
+        self.last_reduced_buffer_idx = 0
+        self.pre_move = None
+
+    def _is_event_settled(self, event):
+        """
+        Whether reduce_all can take the event before the recording ends:
+        a press waits for its release, a scroll for the next event closing it
+        """
+        if event.get("matched", False) is None:
+            return False
+        if event["action"] == "scroll" and not event["complete"]:
+            return False
+        return True
+
     def _get_last_event_in_buffer(self):
         if len(self.event_buffer) == 0:
             return None
@@ -207,6 +311,7 @@ class Reducer:
                     cur_event["pre_move"] = self.pre_move
                     self.pre_move = None
                 self.active_events.add(key)
+                self._push_open_press_event(cur_event)
                 self.event_buffer.append(cur_event)
         else:
             if self.pre_move is not None:  # TODO: sometimes, new event won't be added, neither the pre_move
@@ -217,6 +322,7 @@ class Reducer:
             cur_event["action"] = "type"
             cur_event["complete"] = True
             cur_event["key_names"] = [cur_event["name"]]
+            self._push_open_press_event(cur_event)
             self.event_buffer.append(cur_event)
 
     def _add_key_release_event_to_buffer(
@@ -237,12 +343,10 @@ class Reducer:
         key = (cur_event["key"][0], not cur_event["key"][1])
         if cur_event["name"] not in MODIFIED_KEYS:
             # TODO: handle not found or overlap
-            for i in range(len(self.event_buffer) - 1, -1, -1):
-                if self.event_buffer[i]["key"] == key and not self.event_buffer[i].get(
-                    "end_time"
-                ):
-                    self.event_buffer[i]["end_time"] = cur_event["time_stamp"]
-                    return
+            press_event = self._pop_open_press_event(key)
+            if press_event is not None:
+                press_event["end_time"] = cur_event["time_stamp"]
+                return
             logger.warning(
                 "Warning: _add_key_release_event_to_buffer: no key press event before release {}".format(
                     cur_event
@@ -256,16 +360,13 @@ class Reducer:
                 self.active_events.remove(key)
 
             # TODO: handle not found or overlap
-            for i in range(len(self.event_buffer) - 1, -1, -1):
-                if (
-                    self.event_buffer[i]["key"] == key
-                    and self.event_buffer[i]["matched"] is None
-                ):
-                    self.event_buffer[i]["end_time"] = cur_event["time_stamp"]
-                    self.event_buffer[i]["end_idx"] = len(self.event_buffer)
-                    self.event_buffer[i]["matched"] = len(self.event_buffer)
-                    self.event_buffer.append(cur_event)
-                    return
+            press_event = self._pop_open_press_event(key)
+            if press_event is not None:
+                press_event["end_time"] = cur_event["time_stamp"]
+                press_event["end_idx"] = len(self.event_buffer)
+                press_event["matched"] = len(self.event_buffer)
+                self.event_buffer.append(cur_event)
+                return
             logger.warning("Start press key not found: {}".format(cur_event))
 
     def _add_click_event_to_buffer(self, cur_event):
@@ -276,6 +377,7 @@ class Reducer:
 
         if cur_event["pressed"]:
             cur_event["matched"] = None
+            self._push_open_press_event(cur_event)
             self.event_buffer.append(cur_event)
             return
 
@@ -289,24 +391,45 @@ class Reducer:
 
         cur_event["end_time"] = cur_event["time_stamp"]
         key = (cur_event["key"][0], not cur_event["key"][1])
-        for i in range(
-            len(self.event_buffer) - 1, -1, -1
-        ):  # TODO: handle not found or overlap
-            if (
-                self.event_buffer[i]["key"] == key
-                and not self.event_buffer[i]["matched"]
-            ):
-                self.event_buffer[i]["end_time"] = cur_event["time_stamp"]
-                self.event_buffer[i]["end_idx"] = len(self.event_buffer)
-                self.event_buffer[i]["matched"] = len(self.event_buffer)
-                self.event_buffer.append(cur_event)
-                return
+        # TODO: handle not found or overlap
+        press_event = self._pop_open_press_event(key)
+        if press_event is not None:
+            press_event["end_time"] = cur_event["time_stamp"]
+            press_event["end_idx"] = len(self.event_buffer)
+            press_event["matched"] = len(self.event_buffer)
+            self.event_buffer.append(cur_event)
+            return
 
         logger.warning("Start press mouse not found: {}".format(cur_event))
 
-    def reduce_all(self):
-        idx = 0
+    def _push_open_press_event(self, event):
+        self.open_press_events.setdefault(event["key"], []).append(event)
+
+    def _pop_open_press_event(self, key):
+        """
+        The latest press event of key still waiting for its release
+        """
+        events = self.open_press_events.get(key)
+        if not events:
+            return None
+        return events.pop()
+
+    def _push_open_action(self, action):
+        self.open_actions.setdefault(action.key, []).append(
+            (len(self.reduced_actions), action)
+        )
+        self.reduced_actions.append(action)
+
+    def reduce_all(self, final=True):
+        """
+        Reduce event_buffer into reduced_actions, resuming after the events
+        reduced by the last call. With final=False, stop at the first event
+        that later events can still change.
+        """
+        idx = self.last_reduced_buffer_idx
         while idx < len(self.event_buffer):
+            if not final and not self._is_event_settled(self.event_buffer[idx]):
+                break
             logger.warning(
                 "{}  {} {}".format(
                     idx,
@@ -374,16 +497,20 @@ class Reducer:
 
                                 if self.event_buffer[i]["matched"] > match_idx:
                                     logger.error("Here ???")
-                                    exception_event = self.event_buffer.pop(i)
+                                    # move event i in front of idx, rotating
+                                    # only the events in between
+                                    exception_event = self.event_buffer[i]
                                     exception_event["start_time"] = event["start_time"]
                                     exception_event["time_stampe"] = event["start_time"]
-                                    self.event_buffer.insert(idx, exception_event)
+                                    self.event_buffer[idx : i + 1] = [
+                                        exception_event
+                                    ] + self.event_buffer[idx:i]
                                     continue
 
                         key = event["key"]
                         if key not in self.active_actions:
                             self.active_actions[key] = len(self.reduced_actions)
-                            self.reduced_actions.append(Press(event))
+                            self._push_open_action(Press(event))
                         else:
                             idx += 1
                             continue
@@ -440,8 +567,11 @@ class Reducer:
                                 idx, match_idx, self.event_buffer[idx + 2]
                             )
                         )
-                        exception_event = self.event_buffer.pop(idx + 2)
-                        self.event_buffer.insert(idx + 1, exception_event)
+                        # swap the release in front of the press
+                        self.event_buffer[idx + 1], self.event_buffer[idx + 2] = (
+                            self.event_buffer[idx + 2],
+                            self.event_buffer[idx + 1],
+                        )
                         match_idx -= 1
 
                     """for i in range(idx + 1, match_idx + 1):
@@ -464,7 +594,7 @@ class Reducer:
                         ].set_exception_end_event()
 
                     self.active_actions[key] = len(self.reduced_actions)
-                    self.reduced_actions.append(Click(event))
+                    self._push_open_action(Click(event))
 
                 else:
                     # mouse relsease action
@@ -520,20 +650,25 @@ class Reducer:
                 logger.warning(f"unsupported event: {event}")
 
             idx += 1
+        self.last_reduced_buffer_idx = idx
 
     def _find_start_key_idx(self, key):
+        """
+        Index of the latest incomplete top-level action pressing key.
+        reduced_actions only grows at the end or loses a suffix while
+        reducing, so an entry is valid as long as its index still holds it.
+        """
         key = (key[0], not key[1])
-        for i in range(len(self.reduced_actions) - 1, -1, -1):
-            if self.reduced_actions[i].key != key:
-                continue
-            else:
-                if self.reduced_actions[i].complete:
-                    logger.warning(
-                        f"Reducer _find_start_key_idx error: {key} key pair match but completed."
-                    )
-                    continue
-                else:
-                    return i
+        actions = self.open_actions.get(key)
+        while actions:
+            i, action = actions[-1]
+            if (
+                i < len(self.reduced_actions)
+                and self.reduced_actions[i] is action
+                and not action.complete
+            ):
+                return i
+            actions.pop()
         return None
 
     def _find_last_close_complete_identical_click(self, click_action, idx):
@@ -553,74 +688,48 @@ class Reducer:
         return None
 
     def transform(self, save=False):
-        # for i in range(len(self.reduced_actions)):
-        #    logger.warning("{} {}".format(i, self.reduced_actions[i].action))
-
-        self.complete_idx = 0
+        """
+        Drop incomplete actions, merge each type with the typing that follows
+        it and transform the actions, on a linked list so that removing the
+        merged actions does not shift the rest of the list.
+        """
         logger.error("transform {}".format(len(self.reduced_actions)))
-        while self.complete_idx < len(self.reduced_actions):
-
-            logger.warning(
-                "{} {} {}".format(
-                    self.complete_idx,
-                    len(self.reduced_actions),
-                    self.reduced_actions[self.complete_idx].action,
-                )
-            )
-            logger.warning("last_action: {}".format(self.reduced_actions[-1].action))
-            temp_action = self.reduced_actions[self.complete_idx]
+        actions = ActionList(self.reduced_actions)
+        node = actions.head
+        while node is not None:
+            temp_action = node.action
 
             if not temp_action.complete:
                 # TODO: may have corner case
-                if self.complete_idx < len(self.reduced_actions):
-                    logger.warning("Reducer: transform: action {} is not complete.")
-                    self.reduced_actions.pop(self.complete_idx)
-                    continue
-                else:
-                    return
+                logger.warning("Reducer: transform: action {} is not complete.")
+                next_node = node.next
+                actions.remove(node)
+                node = next_node
+                continue
             # only transform completed actions
 
             # scroll and type don't have children
             if temp_action.action == "type":
+                while node.next is not None:
+                    next_action = node.next.action
+                    if next_action.action == "type":
+                        temp_action.extend(next_action)
+                    elif next_action.action == "press" and next_action.is_typing():
+                        temp_action.extend(next_action.children[0])
+                    else:
+                        break
+                    actions.remove(node.next)
                 # if not last action (last action could be extended by new actions)
-                if self.complete_idx + 1 < len(self.reduced_actions):
-                    if self.reduced_actions[self.complete_idx + 1].action == "type":
-                        logger.warning(
-                            "here {} {} {}".format(
-                                self.complete_idx,
-                                self.reduced_actions[self.complete_idx].key,
-                                self.reduced_actions[self.complete_idx + 1].key,
-                            )
-                        )
-                        temp_action.extend(self.reduced_actions[self.complete_idx + 1])
-                        self.reduced_actions.pop(self.complete_idx + 1)
-                        temp_action.transform()
-                        continue
-                    elif (
-                        self.reduced_actions[self.complete_idx + 1].action == "press"
-                        and self.reduced_actions[self.complete_idx + 1].is_typing()
-                        and self.complete_idx < len(self.reduced_actions) - 1
-                    ):
-                        logger.warning(
-                            "there {} {} {}".format(
-                                self.complete_idx,
-                                self.reduced_actions[self.complete_idx].key,
-                                self.reduced_actions[self.complete_idx + 1].key,
-                            )
-                        )
-                        temp_action.extend(
-                            self.reduced_actions[self.complete_idx + 1].children[0]
-                        )
-                        self.reduced_actions.pop(self.complete_idx + 1)
-                        temp_action.transform()
-                        continue
-
+                if node.next is not None:
                     temp_action.transform()
 
             else:  # other actions
                 temp_action.transform()
 
-            self.complete_idx += 1
+            node = node.next
+
+        self.reduced_actions[:] = actions.to_list()
+        self.complete_idx = len(self.reduced_actions)
         if len(self.reduced_actions) > 0:
             self.reduced_actions[-1].transform()
 
@@ -675,40 +784,56 @@ class Reducer:
 
         logger.error(f"finish {len(self.reduced_actions)}")
 
-    def process_actions_multithreaded(self, recording_path, video_attrs, window_attrs):
-        def process_action(action, recording_path, video_attrs, window_attrs):
-            action.to_video(
-                recording_path=recording_path,
-                video_attrs=video_attrs,
-                window_attrs=window_attrs,
+    def compress_traces(self):
+        """
+        Downsample the move traces in place. Move actions, drag traces and
+        event_buffer share the lists of the pre_move events.
+        """
+        compressed = set()
+        point_num, kept_num = 0, 0
+        for event in self.event_buffer:
+            pre_move = event.get("pre_move")
+            if pre_move is None or id(pre_move["trace"]) in compressed:
+                continue
+            compressed.add(id(pre_move["trace"]))
+            trace, time_trace = compress_trace(
+                pre_move["trace"],
+                pre_move["time_trace"],
+                method=self.trace_compression,
+                max_error=self.trace_max_error,
+                bucket_interval=self.trace_bucket_interval,
             )
+            point_num += len(pre_move["trace"])
+            kept_num += len(trace)
+            pre_move["trace"][:] = trace
+            pre_move["time_trace"][:] = time_trace
+        logger.info(
+            f"Reducer: compress_traces: kept {kept_num} of {point_num} move samples"
+        )
 
-        threads = []
-        max_threads = 8
-        q = queue.Queue()
-
-        # Enqueue all actions
-        for action in self.reduced_actions:
-            q.put(action)
-
-        # Function to process actions from the queue
-        def worker():
-            while not q.empty():
-                action = q.get()
-                if action is None:
-                    break
-                process_action(action, recording_path, video_attrs, window_attrs)
-                q.task_done()
-
-        # Start initial batch of threads
-        for _ in range(min(max_threads, len(self.reduced_actions))):
-            thread = threading.Thread(target=worker)
-            threads.append(thread)
-            thread.start()
-
-        # Wait for all threads to finish
-        for thread in threads:
-            thread.join()
+    def render_video_clips(self, recording_path, video_attrs, window_attrs):
+        """
+        Render all video clips in a single ordered pass over the source video,
+        split into time shards over a process pool, or stream-copied with the
+        overlays in a sidecar
+        """
+        start_time = time.perf_counter()
+        renderer = ClipRenderer(
+            recording_path=recording_path,
+            video_attrs=video_attrs,
+            window_attrs=window_attrs,
+        )
+        if self.clip_render_mode == "process_pool":
+            clip_num = renderer.render_parallel(
+                self.reduced_actions, workers=self.clip_workers
+            )
+        elif self.clip_render_mode == "stream_copy":
+            clip_num = renderer.render_stream_copy(self.reduced_actions)
+        else:
+            clip_num = renderer.render(self.reduced_actions)
+        logger.info(
+            f"Reducer: rendered {clip_num} video clips in {time.perf_counter() - start_time}"
+        )
 
     def _save_action(self, action):
         action.complete_dump(recording_dir=self.recording_path)
@@ -741,41 +866,6 @@ class Reducer:
         write_encrypted_jsonl(file_path, data=data)
 
     def match_element(self):
-        def _find_nearest(time_stamp, data):
-            idx = 0
-            while (
-                idx < len(data) and data[idx]["time_stamp"] < time_stamp
-            ):  # if action time_stamp is greater than the current element, move to the next element
-                idx += 1
-            if idx == 0:
-                return idx
-            if idx != len(data):
-                prev_idx = idx - 1
-                if (
-                    time_stamp - data[prev_idx]["time_stamp"]
-                    < data[idx]["time_stamp"] - time_stamp
-                ):
-                    idx = prev_idx
-            else:
-                idx -= 1
-            return idx
-
-        def _find_pred(time_stamp, data):
-            idx = 0
-            while idx < len(data) and data[idx]["time_stamp"] < time_stamp:
-                idx += 1
-            if idx == 0:
-                return idx
-            return idx - 1
-
-        def _find_succ(time_stamp, data):
-            idx = 0
-            while idx < len(data) and data[idx]["time_stamp"] < time_stamp:
-                idx += 1
-            if idx == len(data):
-                return idx - 1
-            return idx
-
         def is_useful(target):
             if target == None:
                 return False
@@ -847,8 +937,6 @@ class Reducer:
         element_data = []
         if os.path.exists(element_data_path):
             element_data = read_encrypted_jsonl(element_data_path)
-            # sort element_data by time_stamp
-            element_data.sort(key=lambda x: x["time_stamp"])
 
         html_data_path = os.path.join(self.recording_path, "html.jsonl")
         html_data = []
@@ -857,7 +945,17 @@ class Reducer:
             with open(html_data_path, "w", encoding="utf-8") as f:
                 pass
 
+        element_index = TimeSeriesIndex(element_data)
+        html_element_index = TimeSeriesIndex(html_element_data)
+        html_index = TimeSeriesIndex(html_data)
         saved_htmls = set()
+        # id of a tree -> (tree, [(action, target attribute)]), every tree
+        # is parsed once for all the clicks on it
+        tree_clicks = {}
+        a11y_actions = []
+
+        def request_target(tree, action, attribute):
+            tree_clicks.setdefault(id(tree), (tree, []))[1].append((action, attribute))
 
         for action in self.reduced_actions:
             # Save element info
@@ -865,11 +963,11 @@ class Reducer:
                 if len(element_data) == 0:
                     action.target = None
                     continue
-                element_idx = _find_nearest(action.start_time, element_data)
+                element_idx = element_index.nearest(action.start_time)
                 action_use_html = False
                 if has_html:
                     logger.info("Has html data")
-                    html_idx = _find_nearest(action.start_time, html_element_data)
+                    html_idx = html_element_index.nearest(action.start_time)
                     html_timestamp = html_element_data[html_idx]["time_stamp"]
                     action_use_html = abs(html_timestamp - action.start_time) <= 0.3
 
@@ -883,33 +981,49 @@ class Reducer:
                     }  # Modified: ['text'] cause error
                 else:
                     if hasattr(action, "axtree"):
-                        past_frame_target = parse_element(
-                            action.axtree,
-                            action.coordinate["x"],
-                            action.coordinate["y"],
-                        )
-                        action.past_frame_target = past_frame_target
-                    action.target = parse_element(
-                        element_data[element_idx]["a11y_tree"],
-                        action.coordinate["x"],
-                        action.coordinate["y"],
+                        request_target(action.axtree, action, "past_frame_target")
+                    request_target(
+                        element_data[element_idx]["a11y_tree"], action, "target"
                     )
-                    """logger.info(
-                        f"ElementIndex:{element_idx}, Target:{str(action.target)}, Target useful:{str(is_useful(action.target))}, Past frame target:{str(action.past_frame_target)}"
-                    )"""
-                    if action.target is not None:
-                        if hasattr(action, "axtree"):
-                            if is_useful(action.target):
-                                action.target["mark"] = True
-                            else:
-                                action.target["mark"] = False
-                                if action.past_frame_target is not None:
-                                    action.past_frame_target["mark"] = True
-                        else:
-                            action.target["mark"] = True
+                    a11y_actions.append(action)
             if len(html_data) > 0:
-                saved_htmls.add(_find_pred(action.start_time, html_data))
-                saved_htmls.add(_find_succ(action.start_time, html_data))
+                saved_htmls.add(html_index.pred(action.start_time))
+                saved_htmls.add(html_index.succ(action.start_time))
+
+        batches = list(tree_clicks.values())
+        logger.info(
+            f"Reducer: match_element: {len(a11y_actions)} clicks on {len(batches)} trees"
+        )
+        batch_targets = parse_element_batches(
+            [
+                (
+                    tree,
+                    [
+                        (action.coordinate["x"], action.coordinate["y"])
+                        for action, _ in clicks
+                    ],
+                )
+                for tree, clicks in batches
+            ]
+        )
+        for (_, clicks), targets in zip(batches, batch_targets):
+            for (action, attribute), target in zip(clicks, targets):
+                setattr(action, attribute, target)
+
+        for action in a11y_actions:
+            """logger.info(
+                f"Target:{str(action.target)}, Target useful:{str(is_useful(action.target))}, Past frame target:{str(action.past_frame_target)}"
+            )"""
+            if action.target is not None:
+                if hasattr(action, "axtree"):
+                    if is_useful(action.target):
+                        action.target["mark"] = True
+                    else:
+                        action.target["mark"] = False
+                        if action.past_frame_target is not None:
+                            action.past_frame_target["mark"] = True
+                else:
+                    action.target["mark"] = True
 
         need_gpt_list = []
         for index, action in enumerate(self.reduced_actions):
@@ -968,33 +1082,20 @@ class Reducer:
                 logger.exception(f"Reducer: match_element: {str(e)}")
 
         # Save html info
-        saved_html_data = [html_data[idx] for idx in saved_htmls]
+        saved_html_data = [html_data[idx] for idx in sorted(saved_htmls)]
         write_encrypted_jsonl(
             os.path.join(self.recording_path, "html.jsonl"), data=saved_html_data
         )
 
     def match_axtree(self):
-        def _find_pred(time_stamp, data):
-            idx = 0
-            while idx < len(data) and data[idx]["time_stamp"] < time_stamp:
-                idx += 1
-            if idx == 0:
-                return idx
-            return idx - 1
-
         axtree_data = read_encrypted_jsonl(
             path=os.path.join(self.recording_path, "a11y.jsonl")
         )
-
-        # sort trees by their time_stamp
-        sorted_axtree_data = sorted(axtree_data, key=lambda x: x["time_stamp"])
+        # rebuilds the trees of delta encoded records
+        axtree_timeline = A11yTimeline(axtree_data)
 
         for action in self.reduced_actions:
-            axtree_idx = _find_pred(action.start_time, sorted_axtree_data)
-            if 0 <= axtree_idx < len(sorted_axtree_data):
-                action.axtree = sorted_axtree_data[axtree_idx]["axtree"]
-            else:
-                action.axtree = None
+            action.axtree = axtree_timeline.tree_at(action.start_time)
 
     def flatten_actions(self):
         """
@@ -1026,9 +1127,15 @@ class Reducer:
         try:
             start_time = time.perf_counter()
             recording_path = self.recording_path
-            events = read_encrypted_jsonl(
-                path=os.path.join(recording_path, "events.jsonl")
-            )
+            event_log = None
+            if os.path.exists(get_event_log_path(recording_path)):
+                event_log = EventLog(get_event_log_path(recording_path))
+                event_num = len(event_log)
+            else:
+                events = read_encrypted_jsonl(
+                    path=os.path.join(recording_path, "events.jsonl")
+                )
+                event_num = len(events)
 
             video_path = os.path.join(recording_path, "video_clips")
             if os.path.exists(video_path):
@@ -1042,10 +1149,25 @@ class Reducer:
             ):
                 os.remove(os.path.join(recording_path, "reduced_events_complete.jsonl"))
 
-            self.compress(events)
-            self.reduce_all()
+            # online reduction leaves only the events it has not seen
+            with self.online_lock:
+                self.online = False
+                if event_log is not None:
+                    start = self._online_resume_position(event_log["event_idx"])
+                    self.compress_event_log(event_log, start=start)
+                else:
+                    start = self._online_resume_position(
+                        [event.get("event_idx", -1) for event in events]
+                    )
+                    self.compress(events[start:])
+                self.reduce_all()
+            logger.info(
+                f"Reducer: {self.online_event_num} of {event_num} events reduced online"
+            )
             self.transform()
             self.finish()
+            if self.trace_compression:
+                self.compress_traces()
 
             event_buffer_path = os.path.join(recording_path, "event_buffer.jsonl")
             if os.path.exists(event_buffer_path):
@@ -1074,7 +1196,7 @@ class Reducer:
             video_start_time = metadata["video_start_timestamp"]
             video_attrs = {"video_start_time": video_start_time}
             time.sleep(1)
-            self.process_actions_multithreaded(
+            self.render_video_clips(
                 recording_path=recording_path,
                 video_attrs=video_attrs,
                 window_attrs=self.window_attrs,
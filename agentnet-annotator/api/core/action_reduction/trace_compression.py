@@ -0,0 +1,92 @@
+import numpy as np
+
+
+def rdp_indices(points: np.ndarray, max_error: float, keep=None) -> np.ndarray:
+    """
+    Ramer-Douglas-Peucker simplification of an (n, 2) array of points.
+
+    Returns the sorted indices of the points to keep: the end points, the
+    indices in keep, and enough points that no dropped point is farther than
+    max_error from the kept polyline.
+    """
+    n = len(points)
+    if n <= 2:
+        return np.arange(n)
+
+    kept = np.zeros(n, dtype=bool)
+    kept[[0, n - 1]] = True
+    if keep is not None:
+        kept[keep] = True
+
+    stack = []
+    seeds = np.flatnonzero(kept)
+    for start, end in zip(seeds[:-1], seeds[1:]):
+        stack.append((start, end))
+
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        segment = points[start + 1 : end]
+        p0, p1 = points[start], points[end]
+        direction = p1 - p0
+        length = np.hypot(direction[0], direction[1])
+        if length == 0:
+            distances = np.hypot(segment[:, 0] - p0[0], segment[:, 1] - p0[1])
+        else:
+            # perpendicular distance to the line through p0 and p1
+            distances = (
+                np.abs(
+                    direction[0] * (segment[:, 1] - p0[1])
+                    - direction[1] * (segment[:, 0] - p0[0])
+                )
+                / length
+            )
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > max_error:
+            mid = start + 1 + farthest
+            kept[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+
+    return np.flatnonzero(kept)
+
+
+def time_bucket_indices(time_trace: np.ndarray, interval: float) -> np.ndarray:
+    """
+    Indices of the first sample of every interval-long time bucket
+    """
+    buckets = np.floor((time_trace - time_trace[0]) / interval)
+    return np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+
+
+def compress_trace(
+    trace: list,
+    time_trace: list,
+    method: str = "rdp",
+    max_error: float = 2.0,
+    bucket_interval: float = 0.05,
+):
+    """
+    Downsample a mouse trace and its timestamps.
+
+    "rdp" keeps the points needed to stay within max_error pixels of the
+    full trace. "time_bucket" keeps one sample per bucket_interval seconds,
+    then adds back the points needed to stay within max_error.
+    Returns the kept (trace, time_trace), sharing the original point objects.
+    """
+    if len(trace) <= 2 or len(trace) != len(time_trace):
+        return trace, time_trace
+
+    points = np.asarray(trace, dtype=np.float64)
+    if method == "rdp":
+        indices = rdp_indices(points, max_error)
+    elif method == "time_bucket":
+        keep = time_bucket_indices(
+            np.asarray(time_trace, dtype=np.float64), bucket_interval
+        )
+        indices = rdp_indices(points, max_error, keep=keep)
+    else:
+        raise ValueError(f"Unknown trace compression method: {method}")
+
+    return [trace[i] for i in indices], [time_trace[i] for i in indices]
@@ -3,9 +3,7 @@ import mss
 import numpy as np
 from platform import system
 import os
-import pyautogui
-from threading import Thread
-from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, Condition
 from queue import Queue
 from pynput import mouse
 
@@ -23,10 +21,18 @@ if __name__ == "__main__":
     )
     from api.core.utils import send_notification
     from api.core.logger import logger
+    from api.core.frame_diff import TiledFrameDiffer
+    from api.core.capture_scheduler import CaptureScheduler
+    from api.core.a11y.cancellation import CaptureToken
+    from api.core.a11y_snapshot import A11ySnapshotEncoder
 else:
     from .a11y import get_accessibility_tree, get_top_window, get_top_window_name
     from .utils import send_notification
     from .logger import logger
+    from .frame_diff import TiledFrameDiffer
+    from .capture_scheduler import CaptureScheduler
+    from .a11y.cancellation import CaptureToken
+    from .a11y_snapshot import A11ySnapshotEncoder
 
 
 BROWSER_NAME_LIST = {
@@ -35,12 +41,117 @@ BROWSER_NAME_LIST = {
 }
 
 
+class AXTreeCaptureWorker(Thread):
+    """
+    Capture accessibility trees one at a time on a long-lived thread.
+
+    A request made while a capture runs cancels it, and the requests made
+    meanwhile coalesce into the next capture, so a burst of triggers gives
+    one fresh tree. A capture is abandoned after timeout seconds.
+    """
+
+    def __init__(self, on_tree, on_busy, timeout: float = 10.0):
+        super().__init__(daemon=True)
+        self.on_tree = on_tree
+        self.on_busy = on_busy
+        self.timeout = timeout
+        self.condition = Condition()
+        self.pending = False
+        self.current_token = None
+        self.running = True
+
+        # metrics
+        self.request_num = 0
+        self.capture_num = 0
+        self.cancelled_num = 0
+
+    def request(self):
+        with self.condition:
+            self.request_num += 1
+            self.pending = True
+            if self.current_token is not None:
+                # the running capture is stale now
+                self.current_token.cancel()
+            self.condition.notify()
+
+    def run(self):
+        busy = False
+        while True:
+            with self.condition:
+                while self.running and not self.pending:
+                    self.condition.wait()
+                if not self.running:
+                    break
+                self.pending = False
+                token = CaptureToken(self.timeout)
+                self.current_token = token
+
+            if not busy:
+                busy = True
+                self.on_busy(True)
+            self._capture(token)
+
+            with self.condition:
+                self.current_token = None
+                idle = not self.pending
+            if idle:
+                busy = False
+                self.on_busy(False)
+
+        if busy:
+            self.on_busy(False)
+
+    def _capture(self, token: CaptureToken):
+        time_stamp = time.perf_counter()
+        try:
+            logger.info("Getting axtree...")
+            current_tree = get_accessibility_tree(token)
+        except Exception as e:
+            logger.error(f"Failed to get AXTree: {e}")
+            return
+        if current_tree is None:  # cancelled, expired or TODO: temp for Windows
+            if token.is_cancelled():
+                self.cancelled_num += 1
+            return
+        logger.info(f"Time to get AXTree: {time.perf_counter() - time_stamp}")
+        self.capture_num += 1
+        self.on_tree(time_stamp, current_tree)
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            if self.current_token is not None:
+                self.current_token.cancel()
+            self.condition.notify()
+        if self.is_alive():
+            self.join()
+        logger.info(
+            f"AXTreeCaptureWorker: {self.request_num} requests, "
+            f"{self.capture_num} trees, {self.cancelled_num} cancelled"
+        )
+
+
 class KeyFrameDetector:
-    def __init__(self, socketio):
+    def __init__(
+        self,
+        socketio,
+        cpu_budget: float = 0.1,
+        axtree_timeout: float = 10.0,
+        snapshot_mode: str = "full",
+        a11y_service=None,
+    ):
         self.keyframe_detector = Thread(target=self.detect_keyframes)
+        # cached top window queries shared with the A11yListener
+        self.a11y_service = a11y_service
+        # polls fast after input or screen changes, slow when idle
+        self.scheduler = CaptureScheduler(cpu_budget=cpu_budget)
         self.running = False
         self.axtree_queue = Queue()
-        self.executor_stack = []
+        # "delta": store the changes since the previous tree, see A11ySnapshotEncoder
+        self.snapshot_encoder = A11ySnapshotEncoder() if snapshot_mode == "delta" else None
+        self.capture_worker = AXTreeCaptureWorker(
+            self.save_axtree, self.on_capture_busy, timeout=axtree_timeout
+        )
         self.mouse_listener = mouse.Listener(
             on_click=self.on_click,
             on_scroll=self.on_scroll,
@@ -63,118 +174,71 @@ class KeyFrameDetector:
             self.trigger_save_axtree()
             self.scrolling = False
 
-    def push_executor(self, executor: ThreadPoolExecutor) -> None:
-        self.executor_stack.append(executor)
-
-    def pop_executor(self) -> ThreadPoolExecutor:
-        return self.executor_stack.pop()
-
     def trigger_save_axtree(self):
         # Don't save axtree when using browser
         if system() == "Darwin":
-            top_window = get_top_window()
+            top_window = self.top_window()
             if top_window["kCGWindowOwnerName"] in BROWSER_NAME_LIST["macos"]:
                 logger.info("Browser is detected. Skip saving AXTree.")
                 return
         elif system() == "Windows":
-            top_window = get_top_window_name()
+            top_window = self.top_window_name()
             if top_window in BROWSER_NAME_LIST["windows"]:
                 logger.info("Browser is detected. Skip saving AXTree.")
                 return
 
         logger.info("triggered save axtree")
+        # Process the keyframe: Save AXTree
+        self.capture_worker.request()
+
+    def top_window(self):
+        if self.a11y_service is not None:
+            return self.a11y_service.top_window()
+        return get_top_window()
+
+    def top_window_name(self):
+        if self.a11y_service is not None:
+            return self.a11y_service.top_window_name()
+        return get_top_window_name()
+
+    def on_capture_busy(self, busy: bool):
         # send_notification("Start", "Please don't move")
-        self.socketio.emit("axtree", {"status": "start"})
+        self.socketio.emit("axtree", {"status": "start" if busy else "end"})
 
-        # Process the keyframe: Save AXTree
-        # pop all the executors
-        while len(self.executor_stack) > 0:
-            logger.info(f"Shutting down {len(self.executor_stack)} executors...")
-            executor = self.pop_executor()
-            executor.shutdown(wait=False)
-        new_executor = ThreadPoolExecutor()
-        new_executor.submit(self.save_axtree)
-
-    def save_axtree(self):
-        time_stamp = time.perf_counter()
-        try:
-            logger.info("Getting axtree...")
-            current_tree = get_accessibility_tree()
-            if current_tree is None:  # TODO: temp for Windows
-                return
-        except Exception as e:
-            logger.error(f"Failed to get AXTree: {e}")
-            return
-        time_now = time.perf_counter()
-        logger.info(f"Time to get AXTree: {time_now - time_stamp}")
+    def save_axtree(self, time_stamp, current_tree):
         current_tree["time_stamp"] = time_stamp # add time_stamp attr into axtree itself
-        self.axtree_queue.put(
-            {"time_stamp": time_stamp, "axtree": current_tree}, block=False
-        )
-        # send_notification("End", "")
-        self.socketio.emit("axtree", {"status": "end"})
+        record = {"time_stamp": time_stamp, "axtree": current_tree}
+        if self.snapshot_encoder is not None:
+            record = self.snapshot_encoder.encode(record)
+        self.axtree_queue.put(record, block=False)
         logger.info("A Tree Saved!")
-        self.pop_executor()
 
-    """def capture_screen_array(self, sct):
+    def capture_screen_array(self, sct):
+        # primary monitor, BGRA
         screenshot = sct.grab(sct.monitors[1])
-        img = np.array(screenshot)
-        return img"""
-
-    def capture_screen_array(self):
-        # pyautogui automatically get the primary window
-        screenshot = pyautogui.screenshot()
-        img = np.array(screenshot)
+        img = np.asarray(screenshot)
         return img
 
-    def calculate_pixel_difference_ratio(self, img1, img2):
-        # RGBA
-        width, height, _ = img1.shape
-        # To avoid the Notification window
-        img1 = img1[int(0.33 * width) :, : height - 200]
-        img2 = img2[int(0.33 * width) :, : height - 200]
-        difference = np.any(img1 != img2, axis=-1)
-        changed_pixels = np.sum(difference)
-        total_pixels = img1.shape[0] * img1.shape[1]
-        diff_ratio = changed_pixels / max(1000000, total_pixels)
-        return diff_ratio
-
-        """if system() == "Darwin":
-            top_window = get_top_window()
-            top_window_pixels = (
-                top_window["kCGWindowBounds"]["Width"]
-                * top_window["kCGWindowBounds"]["Height"]
-            )
-            diff_ratio = changed_pixels / max(1000000, total_pixels)
-            return diff_ratio
-        elif system() == "Windows":
-            from screeninfo import get_monitors
-
-            main_monitor = get_monitors()[0]
-            screen_width = main_monitor.width
-            screen_height = main_monitor.height
-
-            screen_pixels = screen_width * screen_height
-            diff_ratio = changed_pixels / max(1000000, screen_pixels)
-            return diff_ratio"""
-
     def detect_keyframes(self):
         with mss.mss() as sct:
-            previous_img = None
+            frame_differ = TiledFrameDiffer()
+            capture_time = 0.0
+            tick_cpu_time = 0.0
 
             stable_count = 0
             stable_threshold = 3  # 监控多少帧来判断稳定
             stable_detect_started = False
 
             while self.running:
+                tick_start = time.perf_counter()
+                tick_cpu_start = time.thread_time()
+                current_img = self.capture_screen_array(sct)
+                capture_time += time.perf_counter() - tick_start
 
-                # current_img = self.capture_screen_array(sct)
-                current_img = self.capture_screen_array()
-
-                if previous_img is not None:
-                    diff_ratio = self.calculate_pixel_difference_ratio(
-                        previous_img, current_img
-                    )
+                diff_ratio = frame_differ.update(current_img)
+                tick_cpu = time.thread_time() - tick_cpu_start
+                tick_cpu_time += tick_cpu
+                if diff_ratio is not None:
                     if diff_ratio > 0.4:
                         logger.info(
                             "Possible user action detected due to significant change in diff of diff."
@@ -189,23 +253,40 @@ class KeyFrameDetector:
                                     self.trigger_save_axtree()
                                     stable_count = 0
                                     stable_detect_started = False
-                previous_img = current_img
-                time.sleep(0.15)
+                self.scheduler.update(diff_ratio, tick_cpu)
+                self.scheduler.wait()
+
+            stats = frame_differ.stats()
+            ticks = max(1, stats["ticks"])
+            logger.info(
+                f"KeyFrameDetector: {stats['ticks']} ticks, capture avg {capture_time / ticks * 1000:.1f}ms, "
+                f"diff avg {stats['avg_diff_time'] * 1000:.1f}ms max {stats['max_diff_time'] * 1000:.1f}ms, "
+                f"{stats['full_compares']} full-resolution compares, "
+                f"cpu avg {tick_cpu_time / ticks * 1000:.1f}ms per tick"
+            )
+            scheduler_stats = self.scheduler.stats()
+            logger.info(
+                f"KeyFrameDetector: capture rate {scheduler_stats['rate']:.2f}/s, "
+                f"last interval {scheduler_stats['interval']:.2f}s, "
+                f"decisions {scheduler_stats['decisions']}"
+            )
+
+    def notify_input(self):
+        self.scheduler.notify_input()
 
     def start(self):
         self.running = True
+        self.capture_worker.start()
         self.keyframe_detector.start()
         self.mouse_listener.start()
-        # Push a new executor to save the first AXTree
 
     def stop(self):
         self.running = False
+        self.scheduler.wake()
         self.mouse_listener.stop()
         self.keyframe_detector.join()
-        # Terminate all the executors
-        while len(self.executor_stack) > 0:
-            executor = self.pop_executor()
-            executor.shutdown()
+        # cancel the running capture
+        self.capture_worker.stop()
 
 
 if __name__ == "__main__":
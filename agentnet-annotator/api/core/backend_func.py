@@ -7,6 +7,7 @@ from flask import jsonify, request
 
 from .constants import *
 from .logger import logger
+from .event_log import read_raw_events
 from .utils import (
     RECORDING_DIR,
     REVIEW_RECORDING_DIR,
@@ -15,6 +16,7 @@ from .utils import (
     find_mp4,
     get_latest_folder,
     check_recording_visualizable,
+    read_encrypted_json,
     read_encrypted_jsonl,
     write_encrypted_json,
     write_encrypted_jsonl,
@@ -241,7 +243,6 @@ def annotate_task(recording_name, socketservice):
 
         return jsonify({"success": "Save task name and description successfully"}), 200
 
-    raw_events_path = os.path.join(folder_path, "events.jsonl")
     event_buffer_path = os.path.join(folder_path, "event_buffer.jsonl")
     reduced_events_complete_path = os.path.join(
         folder_path, "reduced_events_complete.jsonl"
@@ -265,8 +266,7 @@ def annotate_task(recording_name, socketservice):
 
     os.makedirs(new_folder_path, exist_ok=True)
     # events.jsonl
-    with open(raw_events_path, encoding="utf-8") as f:
-        raw_events = [json.loads(line) for line in f]
+    raw_events = read_raw_events(folder_path)
     new_raw_events = [
         event
         for event in raw_events
@@ -366,6 +366,9 @@ def annotate_task(recording_name, socketservice):
     os.mkdir(os.path.join(new_folder_path, "video_clips"))
     video_clips = os.listdir(os.path.join(folder_path, "video_clips"))
     video_clips.sort(key=lambda x: int(x.split("_")[0]))
+    overlay_path = os.path.join(folder_path, VIDEO_OVERLAY_FILE)
+    overlays = read_encrypted_json(overlay_path) if os.path.exists(overlay_path) else {}
+    new_overlays = {}
     for idx, clip_name in enumerate(video_clips[start_idx : end_idx + 1]):
         clip_action = clip_name.split("_")[1].split(".")[0]
         new_clip_name = f"{idx}_{clip_action}.mp4"
@@ -373,6 +376,12 @@ def annotate_task(recording_name, socketservice):
             os.path.join(folder_path, "video_clips", clip_name),
             os.path.join(new_folder_path, "video_clips", new_clip_name),
         )
+        if clip_name in overlays:
+            new_overlays[new_clip_name] = overlays[clip_name]
+    if new_overlays:
+        write_encrypted_json(
+            os.path.join(new_folder_path, VIDEO_OVERLAY_FILE), new_overlays
+        )
 
     # edit full video
     old_video_path = find_mp4(folder_path)
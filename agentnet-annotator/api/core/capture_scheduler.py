@@ -0,0 +1,104 @@
+import time
+from threading import Event
+
+
+class CaptureScheduler:
+    """
+    Interval between two keyframe captures.
+
+    Captures run every min_interval after an input event or a screen change,
+    and back off by a factor of backoff up to max_interval once the screen
+    has been idle for idle_after seconds. The capture and diff CPU time never
+    exceeds cpu_budget of one core, whatever the activity.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 0.15,
+        max_interval: float = 1.0,
+        idle_after: float = 2.0,
+        backoff: float = 1.5,
+        cpu_budget: float = 0.1,
+        change_ratio: float = 0.01,
+    ):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.idle_after = idle_after
+        self.backoff = backoff
+        self.cpu_budget = cpu_budget
+        # diff ratio from which the screen counts as changing
+        self.change_ratio = change_ratio
+
+        self.interval = min_interval
+        self.wake_event = Event()
+        self.input_pending = False
+        self.last_activity = time.perf_counter()
+        self.tick_cpu_time = None
+
+        # metrics
+        self.start_time = time.perf_counter()
+        self.tick_num = 0
+        self.decisions = {"input": 0, "change": 0, "active": 0, "backoff": 0, "budget": 0}
+
+    def notify_input(self):
+        """
+        Called from the recorder thread on user input, wakes a backed-off wait
+        """
+        self.input_pending = True
+        if self.interval > self.min_interval:
+            self.wake_event.set()
+
+    def update(self, diff_ratio, tick_cpu_time: float) -> float:
+        """
+        Interval until the next capture, after a capture that took
+        tick_cpu_time seconds of CPU and measured diff_ratio
+        """
+        now = time.perf_counter()
+        self.tick_num += 1
+
+        if self.input_pending:
+            self.input_pending = False
+            self.last_activity = now
+            decision = "input"
+        elif diff_ratio is not None and diff_ratio >= self.change_ratio:
+            self.last_activity = now
+            decision = "change"
+        else:
+            decision = "active"
+
+        if now - self.last_activity < self.idle_after:
+            interval = self.min_interval
+        else:
+            interval = min(self.max_interval, self.interval * self.backoff)
+            decision = "backoff"
+
+        # moving average of the CPU time of a tick
+        if self.tick_cpu_time is None:
+            self.tick_cpu_time = tick_cpu_time
+        else:
+            self.tick_cpu_time = 0.8 * self.tick_cpu_time + 0.2 * tick_cpu_time
+        budget_interval = self.tick_cpu_time / self.cpu_budget
+        if interval < budget_interval:
+            interval = budget_interval
+            decision = "budget"
+
+        self.interval = interval
+        self.decisions[decision] += 1
+        return interval
+
+    def wait(self):
+        self.wake_event.wait(self.interval)
+        self.wake_event.clear()
+
+    def wake(self):
+        self.wake_event.set()
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self.start_time
+        return {
+            "ticks": self.tick_num,
+            "interval": self.interval,
+            "rate": self.tick_num / max(elapsed, 1e-6),
+            "tick_cpu_time": self.tick_cpu_time or 0.0,
+            "decisions": dict(self.decisions),
+        }
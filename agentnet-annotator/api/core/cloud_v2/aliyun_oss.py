@@ -281,6 +281,7 @@ class AliyunOSSClient:
         remote_folder_path: str,
         max_workers: int = 5,
         progress_callback: Optional[Callable[[int, int, str], None]] = None,
+        replacements: Optional[Dict[str, str]] = None,
     ) -> Dict[str, any]:
         if not os.path.exists(local_folder_path):
             raise FileNotFoundError(f"Local folder {local_folder_path} does not exist")
@@ -290,6 +291,12 @@ class AliyunOSSClient:
 
         # Get all files in the folder
         file_list = self._get_all_files(local_folder_path)
+        # remote path -> local file uploaded in place of the one in the folder
+        if replacements:
+            file_list = [
+                (replacements.get(remote_path, local_file), remote_path)
+                for local_file, remote_path in file_list
+            ]
 
         if not file_list:
             logger.warning(f"No files found in folder {local_folder_path}")
@@ -425,8 +432,9 @@ def upload_folder_concurrent(
     remote_folder_path: str,
     max_workers: int = 5,
     progress_callback: Optional[Callable[[int, int, str], None]] = None,
+    replacements: Optional[Dict[str, str]] = None,
 ) -> Dict[str, any]:
     client = get_oss_client()
     return client.upload_folder_concurrent(
-        local_folder_path, remote_folder_path, max_workers, progress_callback
+        local_folder_path, remote_folder_path, max_workers, progress_callback, replacements
     )
@@ -35,6 +35,10 @@ RECORDING_STATUS_TO_VIS_STATUS = {
 
 EXCLUDE_LIST = ["recording_status.json", "hub_task_id.txt"]
 INCLUDE_LIST = ["video_clips", "reduced_events_vis.jsonl"]
+# optional binary event log, written instead of events.jsonl
+EVENT_LOG_FILE = "events.bin"
+# overlays of stream-copied clips, keyed by clip file name, drawn by the player
+VIDEO_OVERLAY_FILE = "video_overlays.json"
 COMPLETE_DATA_LIST = [
     "events.jsonl",
     "event_buffer.jsonl",
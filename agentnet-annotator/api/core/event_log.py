@@ -0,0 +1,238 @@
+import os
+import json
+
+import numpy as np
+
+from .constants import EVENT_LOG_FILE
+from .jsonl_writer import JsonlWriter
+
+MAGIC = b"AGNTEVT1"
+
+ACTIONS = ["move", "click", "scroll", "press", "release", "pause", "resume"]
+ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+MOVE_CODE = ACTION_CODES["move"]
+
+# record flags
+PRESSED = 1
+INT_COORDS = 2
+
+NO_STRING = 0xFFFF
+
+# one fixed-size little-endian record per event, read back with np.memmap
+EVENT_DTYPE = np.dtype(
+    [
+        ("time_stamp", "<f8"),
+        ("event_idx", "<u4"),
+        ("x", "<f8"),
+        ("y", "<f8"),
+        ("dx", "<i4"),
+        ("dy", "<i4"),
+        ("action", "u1"),
+        ("flags", "u1"),
+        ("button", "<u2"),
+        ("name", "<u2"),
+        ("pynput_key", "<u2"),
+    ]
+)
+
+
+def get_strings_path(path):
+    """
+    Key names and buttons are stored once in a string table next to the log
+    """
+    return path + ".strings"
+
+
+class EventLogWriter(JsonlWriter):
+    """
+    Append raw events to a binary event log of EVENT_DTYPE records
+    """
+
+    binary = True
+
+    def __init__(self, path: str, fsync_interval: float = 0.2, batch_size: int = 1024):
+        super().__init__(path, fsync_interval=fsync_interval, batch_size=batch_size)
+        if self.file.tell() == 0:
+            self.file.write(MAGIC)
+        self.strings = {}
+        strings_path = get_strings_path(path)
+        if os.path.exists(strings_path):
+            for idx, string in enumerate(read_strings(strings_path)):
+                self.strings[string] = idx
+        self.strings_file = open(strings_path, "a", encoding="utf-8")
+
+    def _string_id(self, string):
+        if string is None:
+            return NO_STRING
+        if string not in self.strings:
+            if len(self.strings) >= NO_STRING:
+                raise ValueError("EventLogWriter: string table is full")
+            self.strings[string] = len(self.strings)
+            self.strings_file.write(json.dumps(string, ensure_ascii=False) + "\n")
+        return self.strings[string]
+
+    def encode_record(self, event):
+        record = np.zeros((), dtype=EVENT_DTYPE)
+        record["time_stamp"] = event["time_stamp"]
+        record["event_idx"] = event.get("event_idx", 0)
+        record["action"] = ACTION_CODES[event["action"]]
+        flags = 0
+        if "x" in event:
+            record["x"], record["y"] = event["x"], event["y"]
+            if isinstance(event["x"], int) and isinstance(event["y"], int):
+                flags |= INT_COORDS
+        if event.get("pressed"):
+            flags |= PRESSED
+        record["flags"] = flags
+        record["dx"], record["dy"] = event.get("dx", 0), event.get("dy", 0)
+        record["button"] = self._string_id(event.get("button"))
+        record["name"] = self._string_id(event.get("name"))
+        record["pynput_key"] = self._string_id(event.get("pynput_key"))
+        return record.tobytes()
+
+    def _sync(self):
+        # the string table goes to disk before the records using it
+        if not self.strings_file.closed:
+            self.strings_file.flush()
+            os.fsync(self.strings_file.fileno())
+        super()._sync()
+
+    def close(self):
+        super().close()
+        self.strings_file.close()
+
+
+def read_strings(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class EventLog:
+    """
+    Memory-mapped view of a binary event log.
+
+    The columns (time_stamp, x, y, action...) are numpy arrays over the file,
+    event(idx) rebuilds the dict the recorder wrote to events.jsonl.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an event log")
+        size = os.path.getsize(path) - len(MAGIC)
+        # a crash can leave a partial record at the end
+        count = size // EVENT_DTYPE.itemsize
+        if count > 0:
+            self.records = np.memmap(
+                path, dtype=EVENT_DTYPE, mode="r", offset=len(MAGIC), shape=(count,)
+            )
+        else:
+            self.records = np.zeros(0, dtype=EVENT_DTYPE)
+        strings_path = get_strings_path(path)
+        self.strings = read_strings(strings_path) if os.path.exists(strings_path) else []
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, column):
+        return self.records[column]
+
+    def _string(self, string_id):
+        return None if string_id == NO_STRING else self.strings[string_id]
+
+    def _coords(self, record):
+        if record["flags"] & INT_COORDS:
+            return int(record["x"]), int(record["y"])
+        return float(record["x"]), float(record["y"])
+
+    def event(self, idx) -> dict:
+        record = self.records[idx]
+        action = ACTIONS[record["action"]]
+        event = {"time_stamp": float(record["time_stamp"]), "action": action}
+        if action in ("move", "click", "scroll"):
+            event["x"], event["y"] = self._coords(record)
+        if action == "click":
+            event["button"] = self._string(record["button"])
+            event["pressed"] = bool(record["flags"] & PRESSED)
+        elif action == "scroll":
+            event["dx"], event["dy"] = int(record["dx"]), int(record["dy"])
+        elif action in ("press", "release"):
+            event["name"] = self._string(record["name"])
+            event["pynput_key"] = self._string(record["pynput_key"])
+        event["event_idx"] = int(record["event_idx"])
+        return event
+
+    def events(self, start: int = 0):
+        for idx in range(start, len(self)):
+            yield self.event(idx)
+
+    def move_runs(self, start: int = 0):
+        """
+        Yield (start, end) of every run of consecutive move records
+        """
+        is_move = self.records["action"][start:] == MOVE_CODE
+        if len(is_move) == 0:
+            return
+        # run boundaries: where is_move flips
+        edges = np.flatnonzero(np.diff(is_move.astype(np.int8))) + 1
+        bounds = np.concatenate(([0], edges, [len(is_move)]))
+        for run_start, run_end in zip(bounds[:-1], bounds[1:]):
+            if is_move[run_start]:
+                yield start + int(run_start), start + int(run_end)
+
+    def move_trace(self, start: int, end: int):
+        """
+        (x, y) tuples and timestamps of the moves in [start, end)
+        """
+        records = self.records[start:end]
+        xs, ys = records["x"], records["y"]
+        if np.all(records["flags"] & INT_COORDS):
+            xs, ys = xs.astype(np.int64), ys.astype(np.int64)
+        return list(zip(xs.tolist(), ys.tolist())), records["time_stamp"].tolist()
+
+
+def get_event_log_path(recording_path):
+    return os.path.join(recording_path, EVENT_LOG_FILE)
+
+
+def has_event_log(recording_path):
+    return os.path.exists(get_event_log_path(recording_path))
+
+
+def read_raw_events(recording_path) -> list:
+    """
+    Raw events of a recording, from the event log when it has one
+    """
+    if has_event_log(recording_path):
+        return list(EventLog(get_event_log_path(recording_path)).events())
+    with open(os.path.join(recording_path, "events.jsonl"), encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def jsonl_to_event_log(jsonl_path, log_path):
+    with open(jsonl_path, encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    for path in (log_path, get_strings_path(log_path)):
+        if os.path.exists(path):
+            os.remove(path)
+    writer = EventLogWriter(log_path)
+    for event in events:
+        writer.write(event)
+    writer.close()
+
+
+def event_log_to_jsonl(log_path, jsonl_path):
+    event_log = EventLog(log_path)
+    with open(jsonl_path, "w", encoding="utf-8") as f:
+        for event in event_log.events():
+            f.write(json.dumps(event) + "\n")
+
+
+def ensure_events_jsonl(recording_path):
+    """
+    Write events.jsonl from the event log, for the consumers of the jsonl
+    """
+    jsonl_path = os.path.join(recording_path, "events.jsonl")
+    if not os.path.exists(jsonl_path) and has_event_log(recording_path):
+        event_log_to_jsonl(get_event_log_path(recording_path), jsonl_path)
@@ -0,0 +1,137 @@
+import time
+from typing import Optional
+
+import numpy as np
+
+# BGRA -> gray weights, in 1/256
+GRAY_WEIGHTS = np.array([29, 150, 77, 0], dtype=np.uint16)
+
+
+class TiledFrameDiffer:
+    """
+    Ratio of changed pixels between consecutive screenshots.
+
+    Every frame is sampled every `step` pixels into a small grayscale grid,
+    the grids are compared per tile of tile x tile samples, and only the
+    tiles that changed are compared pixel by pixel at full resolution.
+    The ratio is changed pixels over max(min_pixels, pixels in the compared
+    region), counted in the compared tiles only.
+
+    This approximates the full-frame comparison from below. A change that
+    touches no sample point, like a caret or a small text edit between the
+    samples of a 4K screen (step 8 or more), or that leaves the sampled
+    luminance the same, is not seen, and its tiles count 0. Such frames
+    can pass the < 0.01 stability test of the keyframe detector while the
+    screen is still changing. A change seen in a tile is counted exactly.
+    """
+
+    def __init__(
+        self,
+        grid_width: int = 320,
+        tile: int = 16,
+        tile_threshold: float = 0.0,
+        top_crop: float = 0.33,
+        right_crop: int = 200,
+        min_pixels: int = 1000000,
+    ):
+        self.grid_width = grid_width
+        self.tile = tile
+        # mean gray difference above which a tile is compared in full
+        self.tile_threshold = tile_threshold
+        # to avoid the notification windows
+        self.top_crop = top_crop
+        self.right_crop = right_crop
+        self.min_pixels = min_pixels
+
+        self.previous_frame = None
+        self.previous_grid = None
+
+        # metrics
+        self.tick_num = 0
+        self.full_compare_num = 0
+        self.total_diff_time = 0.0
+        self.max_diff_time = 0.0
+
+    def _region(self, frame):
+        height, width = frame.shape[:2]
+        return frame[int(self.top_crop * height) :, : max(1, width - self.right_crop)]
+
+    def _step(self, region):
+        return max(1, region.shape[1] // self.grid_width)
+
+    def _grid(self, region, step):
+        samples = region[::step, ::step]
+        channels = samples.shape[-1]
+        gray = samples @ GRAY_WEIGHTS[:channels]
+        return (gray >> 8).astype(np.int16)
+
+    def _changed_tiles(self, grid, previous_grid):
+        diff = np.abs(grid - previous_grid)
+        rows, cols = diff.shape
+        pad_rows, pad_cols = -rows % self.tile, -cols % self.tile
+        if pad_rows or pad_cols:
+            diff = np.pad(diff, ((0, pad_rows), (0, pad_cols)))
+        tiles = diff.reshape(
+            diff.shape[0] // self.tile, self.tile, diff.shape[1] // self.tile, self.tile
+        )
+        return tiles.mean(axis=(1, 3)) > self.tile_threshold
+
+    def _count_changed_pixels(self, region, previous_region, changed_tiles, step):
+        size = self.tile * step
+        changed_pixels = 0
+        for tile_row in np.flatnonzero(changed_tiles.any(axis=1)):
+            row_slice = slice(tile_row * size, (tile_row + 1) * size)
+            # compare each run of consecutive changed tiles in one slice
+            row = changed_tiles[tile_row].astype(np.int8)
+            edges = np.flatnonzero(np.diff(np.concatenate(([0], row, [0]))))
+            for run_start, run_end in zip(edges[::2], edges[1::2]):
+                col_slice = slice(run_start * size, run_end * size)
+                changed_pixels += int(
+                    np.count_nonzero(
+                        np.any(
+                            region[row_slice, col_slice]
+                            != previous_region[row_slice, col_slice],
+                            axis=-1,
+                        )
+                    )
+                )
+        return changed_pixels
+
+    def update(self, frame: np.ndarray) -> Optional[float]:
+        """
+        Diff ratio of frame against the previous frame, None for the first
+        frame or after a resolution change
+        """
+        start_time = time.perf_counter()
+        region = self._region(frame)
+        step = self._step(region)
+        grid = self._grid(region, step)
+
+        diff_ratio = None
+        if self.previous_frame is not None and self.previous_frame.shape == frame.shape:
+            changed_tiles = self._changed_tiles(grid, self.previous_grid)
+            changed_pixels = 0
+            if changed_tiles.any():
+                self.full_compare_num += 1
+                changed_pixels = self._count_changed_pixels(
+                    region, self._region(self.previous_frame), changed_tiles, step
+                )
+            total_pixels = region.shape[0] * region.shape[1]
+            diff_ratio = changed_pixels / max(self.min_pixels, total_pixels)
+
+        self.previous_frame = frame
+        self.previous_grid = grid
+
+        diff_time = time.perf_counter() - start_time
+        self.tick_num += 1
+        self.total_diff_time += diff_time
+        self.max_diff_time = max(self.max_diff_time, diff_time)
+        return diff_ratio
+
+    def stats(self) -> dict:
+        return {
+            "ticks": self.tick_num,
+            "full_compares": self.full_compare_num,
+            "avg_diff_time": self.total_diff_time / max(1, self.tick_num),
+            "max_diff_time": self.max_diff_time,
+        }
@@ -0,0 +1,157 @@
+import os
+import json
+import time
+from queue import Queue, Empty
+from threading import Thread
+
+from .logger import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_line(data) -> str:
+    """
+    Serialize one record to a JSON line, with orjson when it is installed
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(data).decode("utf-8")
+        except TypeError:
+            # e.g. ints over 64 bits or non-str keys, left to the json module
+            pass
+    return json.dumps(data, ensure_ascii=False)
+
+
+class JsonlWriter(Thread):
+    """
+    Append records to a jsonl file from a dedicated thread.
+
+    Records are drained from the queue in batches and written in one chunk,
+    the file is flushed after every batch and fsynced at most every
+    fsync_interval seconds, which bounds what a crash can lose.
+    """
+
+    BACKLOG_WARNING = 10000
+    binary = False
+
+    def __init__(
+        self,
+        path: str,
+        encode=dumps_line,
+        fsync_interval: float = 0.2,
+        batch_size: int = 1024,
+    ):
+        super().__init__(daemon=True)
+        self.path = path
+        self.encode = encode
+        self.fsync_interval = fsync_interval
+        self.batch_size = batch_size
+
+        self.queue = Queue()
+        if self.binary:
+            self.file = open(path, "ab", buffering=1 << 20)
+        else:
+            self.file = open(path, "a", encoding="utf-8", buffering=1 << 20)
+        self.running = False
+        self.last_fsync = time.perf_counter()
+
+        # metrics
+        self.record_num = 0
+        self.batch_num = 0
+        self.max_queue_depth = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def write(self, record):
+        self.queue.put((time.perf_counter(), record), block=False)
+
+    def run(self):
+        self.running = True
+        while self.running or not self.queue.empty():
+            try:
+                batch = [self.queue.get(timeout=self.fsync_interval)]
+            except Empty:
+                self._sync()
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except Empty:
+                    break
+            self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        queue_depth = len(batch) + self.queue.qsize()
+        if queue_depth > self.BACKLOG_WARNING > self.max_queue_depth:
+            logger.warning(
+                f"JsonlWriter: {queue_depth} records queued for {os.path.basename(self.path)}"
+            )
+        self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+        chunks = []
+        for _, record in batch:
+            try:
+                chunks.append(self.encode_record(record))
+            except Exception as e:
+                logger.exception(f"JsonlWriter: failed to encode record: {str(e)}")
+        self.file.write((b"" if self.binary else "").join(chunks))
+        self.file.flush()
+
+        # latency from enqueue to the write reaching the OS
+        written_time = time.perf_counter()
+        for enqueue_time, _ in batch:
+            latency = written_time - enqueue_time
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+        self.record_num += len(batch)
+        self.batch_num += 1
+
+        if written_time - self.last_fsync >= self.fsync_interval:
+            self._sync()
+
+    def encode_record(self, record):
+        return self.encode(record) + "\n"
+
+    def _sync(self):
+        if self.file.closed:
+            return
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.last_fsync = time.perf_counter()
+
+    def stats(self) -> dict:
+        return {
+            "records": self.record_num,
+            "batches": self.batch_num,
+            "queue_depth": self.queue.qsize(),
+            "max_queue_depth": self.max_queue_depth,
+            "avg_latency": self.total_latency / max(1, self.record_num),
+            "max_latency": self.max_latency,
+        }
+
+    def close(self):
+        """
+        Write what is still queued, fsync and close the file
+        """
+        self.running = False
+        if self.is_alive():
+            self.join()
+        else:
+            # never started, write the queue from the caller
+            batch = []
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            if batch:
+                self._write_batch(batch)
+        self._sync()
+        self.file.close()
+
+        stats = self.stats()
+        logger.info(
+            f"JsonlWriter: {os.path.basename(self.path)}: {stats['records']} records "
+            f"in {stats['batches']} batches, max queue depth {stats['max_queue_depth']}, "
+            f"write latency avg {stats['avg_latency'] * 1000:.1f}ms max {stats['max_latency'] * 1000:.1f}ms"
+        )
@@ -1,4 +1,5 @@
 from loguru import logger as _logger
+import multiprocessing
 import sys
 import os
 
@@ -19,8 +20,9 @@ sys.stdout = open(sys.stdout.fileno(), mode='w', encoding='utf-8', buffering=1)
 # Add a handler for stdout (console output)
 logger.add(sys.stdout, level="INFO", colorize=True)
 
-# Add a handler for file logging
-logger.add(logger_path, level="INFO", colorize=False, mode="w")
+# Add a handler for file logging, worker processes append to the parent's log
+log_mode = "a" if multiprocessing.parent_process() is not None else "w"
+logger.add(logger_path, level="INFO", colorize=False, mode=log_mode)
 
 # Print the absolute path of the logger file
 abs_logger_path = os.path.abspath(logger_path)
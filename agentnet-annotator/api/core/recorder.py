@@ -1,10 +1,8 @@
-import json
 import os
 import time
 from datetime import datetime
 from platform import system
-from queue import Queue
-from threading import Thread
+from queue import Queue, Empty
 import uuid
 
 from pynput import keyboard, mouse
@@ -18,9 +16,13 @@ from .utils import (
     get_key_name,
     get_key_str,
     init_encrpted_jsonl,
-    write_encrypt_line,
+    encrypt_data,
 )
+from .jsonl_writer import JsonlWriter, dumps_line
+from .event_log import EventLogWriter, get_event_log_path
 from .a11y_listener import A11yListener
+from .a11y_service import A11yService
+from .a11y import create_focus_source
 from .axtree_getter import KeyFrameDetector
 from .logger import logger
 
@@ -38,7 +40,11 @@ class Recorder(QThread):
         natural_scrolling: bool,
         generate_window_a11y: bool = False,
         generate_element_a11y: bool = True,
-
+        fsync_interval: float = 0.2,
+        event_log_format: str = "jsonl",
+        keyframe_cpu_budget: float = 0.1,
+        a11y_snapshot_mode: str = "full",
+        focus_tracking: str = "poll",
     ):
         super().__init__()
 
@@ -56,24 +62,39 @@ class Recorder(QThread):
         )
 
         self.event_queue = Queue()
-        self.events_file = open(
-            os.path.join(self.recording_path, "events.jsonl"), "a", encoding="utf-8"
-        )
+        # events are written in batches from a writer thread, fsynced every fsync_interval
+        self.fsync_interval = fsync_interval
+        if event_log_format == "binary":
+            self.events_writer = EventLogWriter(
+                get_event_log_path(self.recording_path),
+                fsync_interval=fsync_interval,
+            )
+        else:
+            self.events_writer = JsonlWriter(
+                os.path.join(self.recording_path, "events.jsonl"),
+                fsync_interval=fsync_interval,
+            )
         if generate_window_a11y:
             a11y_path = os.path.join(self.recording_path, "a11y.jsonl")
             init_encrpted_jsonl(a11y_path)
-            self.a11y_file = open(a11y_path, "a", encoding="utf-8")
+            self.a11y_writer = JsonlWriter(
+                a11y_path, encode=encode_line, fsync_interval=fsync_interval
+            )
         if generate_element_a11y:
             element_path = os.path.join(self.recording_path, "element.jsonl")
             init_encrpted_jsonl(element_path)
-            self.element_file = open(element_path, "a", encoding="utf-8")
+            self.element_writer = JsonlWriter(
+                element_path, encode=encode_line, fsync_interval=fsync_interval
+            )
 
         html_path = os.path.join(self.recording_path, "html.jsonl")
         init_encrpted_jsonl(html_path)
         self.html_file = open(html_path, "a", encoding="utf-8")
         top_window_path = os.path.join(self.recording_path, "top_window.jsonl")
         init_encrpted_jsonl(top_window_path)
-        self.top_window_file = open(top_window_path, "a", encoding="utf-8")
+        self.top_window_writer = JsonlWriter(
+            top_window_path, encode=encode_line, fsync_interval=fsync_interval
+        )
 
         self.metadata_manager = MetadataManager(
             recording_path=self.recording_path,
@@ -96,16 +117,32 @@ class Recorder(QThread):
             on_press=self.on_press, on_release=self.on_release
         )
 
+        # top window and element queries shared by the a11y producers
+        self.a11y_service = None
         if (generate_window_a11y or generate_element_a11y) and system() != "Linux":
+            self.a11y_service = A11yService(create_focus_source(focus_tracking))
             self.a11y_listener = A11yListener(
-                generate_window_a11y, generate_element_a11y
+                generate_window_a11y, generate_element_a11y, self.a11y_service
             )
 
         # TODO: Only save a11y data when required
         if generate_window_a11y:
-            self.keyframe_detector = KeyFrameDetector(self.socketio)
+            self.keyframe_detector = KeyFrameDetector(
+                self.socketio,
+                cpu_budget=keyframe_cpu_budget,
+                snapshot_mode=a11y_snapshot_mode,
+                a11y_service=self.a11y_service,
+            )
 
         self.event_count = 0
+        self.online_reducer = None
+
+    def set_online_reducer(self, reducer):
+        """
+        Feed every recorded event to the reducer, which reduces the recording
+        while it is in progress
+        """
+        self.online_reducer = reducer
 
     def on_move(self, x, y):
         if not self._is_paused:
@@ -173,10 +210,14 @@ class Recorder(QThread):
         self._is_recording = True
 
         self.metadata_manager.collect()
+        for writer in self._get_writers():
+            writer.start()
         self.obs_client.start_recording()
         self.metadata_manager.set_video_start_timestamp(time.perf_counter())
         self.mouse_listener.start()
         self.keyboard_listener.start()
+        if self.a11y_service is not None:
+            self.a11y_service.start()
         if self.gen_element and system() != "Linux":
             self.a11y_listener.start()
             logger.info("A11y listener start.")
@@ -185,49 +226,56 @@ class Recorder(QThread):
             logger.info("Keyframe detector start.")
 
         while self._is_recording:
-            event = self.event_queue.get()
-            event["event_idx"] = self.event_count
-            self.event_count += 1
-
-            self.events_file.write(json.dumps(event) + "\n")
-
-            if self.gen_window:
-                axtree_queue = self.keyframe_detector.axtree_queue
-                if not axtree_queue.empty():
-                    logger.info("write_axtree_data")
-                    write_encrypt_line(self.a11y_file, axtree_queue.get())
-
-            if self.gen_element and system() != "Linux":
-                element_queue = self.a11y_listener.element_queue
-                if not element_queue.empty():
-                    logger.info("write_element_data")
-                    write_encrypt_line(self.element_file, element_queue.get())
-
-            if system() != "Linux":
-                top_window_queue = self.a11y_listener.top_window_queue
-                if not top_window_queue.empty():
-                    write_encrypt_line(self.top_window_file,
-                                    top_window_queue.get())
+            # drain the event queue in batches, the writer thread does the I/O
+            try:
+                events = [self.event_queue.get(timeout=self.fsync_interval)]
+            except Empty:
+                events = []
+            while events and not self.event_queue.empty():
+                events.append(self.event_queue.get_nowait())
+
+            # clicks, scrolls and keys are about to change the screen
+            if self.gen_window and any(event["action"] != "move" for event in events):
+                self.keyframe_detector.notify_input()
+
+            for event in events:
+                event["event_idx"] = self.event_count
+                self.event_count += 1
+                self.events_writer.write(event)
+
+                # pause and resume only mark the video, there is nothing to reduce
+                if self.online_reducer is not None and event["action"] not in (
+                    "pause",
+                    "resume",
+                ):
+                    # the reducer annotates the event in place
+                    self.online_reducer.feed_event(dict(event))
+
+            self._drain_a11y_queues()
 
         logger.info("Recorder: run done.")
 
-    def write_axtree_data(self, keyframe_detector, a11y_file):
-        while not keyframe_detector.axtree_queue.empty():
-            write_encrypt_line(a11y_file, keyframe_detector.axtree_queue.get())
-
-        a11y_file.flush()
-
-    def write_element_data(self, a11y_listener, element_file):
-        while not a11y_listener.element_queue.empty():
-            write_encrypt_line(element_file, a11y_listener.element_queue.get())
-        element_file.flush()
+    def _get_writers(self):
+        writers = [self.events_writer, self.top_window_writer]
+        if self.gen_window:
+            writers.append(self.a11y_writer)
+        if self.gen_element:
+            writers.append(self.element_writer)
+        return writers
 
-    def write_top_window_data(self, a11y_listener, top_window_file):
-        while not a11y_listener.top_window_queue.empty():
-            write_encrypt_line(
-                top_window_file, a11y_listener.top_window_queue.get())
+    def _drain_a11y_queues(self):
+        if self.gen_window:
+            drain_queue(self.keyframe_detector.axtree_queue, self.a11y_writer)
+        if self.gen_element and system() != "Linux":
+            drain_queue(self.a11y_listener.element_queue, self.element_writer)
+        if system() != "Linux":
+            drain_queue(self.a11y_listener.top_window_queue, self.top_window_writer)
 
-        top_window_file.flush()
+    def get_writer_stats(self) -> dict:
+        return {
+            os.path.basename(writer.path): writer.stats()
+            for writer in self._get_writers()
+        }
 
     def stop_recording(self):
         logger.info("Recorder: stop_recording")
@@ -244,47 +292,23 @@ class Recorder(QThread):
                 self.a11y_listener.stop()
             if self.gen_window:
                 self.keyframe_detector.stop()
-
-            # Process remaining a11ytree data in a separate thread
-            if self.gen_window:
-                a11y_writer_thread = Thread(
-                    target=self.write_axtree_data,
-                    args=(self.keyframe_detector, self.a11y_file),
-                )
-                a11y_writer_thread.start()
-            if self.gen_element and system() != "Linux":
-                element_writer_thread = Thread(
-                    target=self.write_element_data,
-                    args=(self.a11y_listener, self.element_file),
-                )
-                element_writer_thread.start()
-
-            if system() != "Linux":
-                top_window_writer_thread = Thread(
-                    target=self.write_top_window_data,
-                    args=(self.a11y_listener, self.top_window_file),
-                )
-                top_window_writer_thread.start()
-
-            # Wait for the writer thread to complete
-            if self.gen_window:
-                a11y_writer_thread.join()
-            if self.gen_element and system() != "Linux":
-                element_writer_thread.join()
-            if system() != "Linux":
-                top_window_writer_thread.join()
+            if self.a11y_service is not None:
+                # finishes the element queries in flight
+                self.a11y_service.stop()
+
+            # the run loop exits within one queue timeout, then hand the
+            # remaining a11y data to the writers
+            self.wait()
+            self._drain_a11y_queues()
             self.obs_client.stop_recording()
 
             self.metadata_manager.add_obs_record_state_timings(
                 self.obs_client.record_state_events
             )
 
-            self.events_file.close()
+            for writer in self._get_writers():
+                writer.close()
             self.metadata_manager.save_metadata()
-            if self.gen_window:
-                self.a11y_file.close()
-            if self.gen_element and system() != "Linux":
-                self.element_file.close()
 
             # self.recording_stopped.emit()
         logger.info("Recorder: stop_recording done.")
@@ -319,3 +343,12 @@ class Recorder(QThread):
         os.makedirs(recording_path, exist_ok=True)
 
         return recording_path
+
+
+def encode_line(data) -> str:
+    return encrypt_data(dumps_line(data))
+
+
+def drain_queue(queue: Queue, writer: JsonlWriter):
+    while not queue.empty():
+        writer.write(queue.get_nowait())
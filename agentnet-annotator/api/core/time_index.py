@@ -0,0 +1,58 @@
+from bisect import bisect_left
+from typing import List, Optional
+
+
+class TimeSeriesIndex:
+    """
+    Sorted index over the timestamps of a list of records (events, element,
+    html, a11y samples...), answering nearest / predecessor / successor
+    queries in O(log n).
+
+    Queries return positions in the original list, so the caller keeps
+    indexing its own data. The list is not copied or reordered.
+    """
+
+    def __init__(self, data: List[dict], key: str = "time_stamp"):
+        self.data = data
+        # stable sort, records with equal timestamps keep their file order
+        self.order = sorted(range(len(data)), key=lambda idx: data[idx][key])
+        self.time_stamps = [data[idx][key] for idx in self.order]
+
+    def __len__(self):
+        return len(self.order)
+
+    def nearest(self, time_stamp: float) -> Optional[int]:
+        """
+        Position of the record closest to time_stamp, the later one on a tie
+        """
+        if len(self.order) == 0:
+            return None
+        pos = bisect_left(self.time_stamps, time_stamp)
+        if pos == len(self.order):
+            pos -= 1
+        elif pos > 0 and (
+            time_stamp - self.time_stamps[pos - 1]
+            < self.time_stamps[pos] - time_stamp
+        ):
+            pos -= 1
+        return self.order[pos]
+
+    def pred(self, time_stamp: float) -> Optional[int]:
+        """
+        Position of the last record strictly before time_stamp, or the first
+        record if there is none
+        """
+        if len(self.order) == 0:
+            return None
+        pos = bisect_left(self.time_stamps, time_stamp)
+        return self.order[max(0, pos - 1)]
+
+    def succ(self, time_stamp: float) -> Optional[int]:
+        """
+        Position of the first record at or after time_stamp, or the last
+        record if there is none
+        """
+        if len(self.order) == 0:
+            return None
+        pos = bisect_left(self.time_stamps, time_stamp)
+        return self.order[min(len(self.order) - 1, pos)]
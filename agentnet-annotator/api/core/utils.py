@@ -20,6 +20,7 @@ from PIL import Image
 
 from .logger import logger
 from .constants import VK_CODE, INCLUDE_LIST, COMPLETE_DATA_LIST
+from .event_log import EventLog, get_event_log_path, has_event_log
 from cryptography.fernet import Fernet
 
 fernet = Fernet(b"afdCZlmzMe6PiDCs1nPSaJIUMsTvesgrpLCCt1u5ML8=")
@@ -87,6 +88,10 @@ def check_recording_completeness(directory):
     for file_name in COMPLETE_DATA_LIST:
         file_path = os.path.join(directory, file_name)
 
+        if file_name == "events.jsonl" and has_event_log(directory):
+            check_result["events"] = len(EventLog(get_event_log_path(directory))) > 0
+            continue
+
         # Check if the file exists
         if not os.path.exists(file_path):
             check_result[file_name.split(".")[0]] = False
@@ -455,22 +460,23 @@ def fix_windows_dpi_scaling():
 
 
 # NOTE: install ffmpeg.exe and put it in /api first.
+def get_ffmpeg_path():
+    if getattr(sys, "frozen", False) and hasattr(sys, "_MEIPASS"):
+        if system() == "Windows":
+            return Path(sys._MEIPASS) / "ffmpeg" / "ffmpeg.exe"
+        return Path(sys._MEIPASS) / "ffmpeg" / "ffmpeg"
+    if system() == "Windows":
+        return Path(__file__).parent.parent / "ffmpeg.exe"
+    return "ffmpeg"
+
+
 def cut_video(
     old_video_path: str, new_video_path: str, start_time: float, end_time: float
 ):
     os.makedirs(new_video_path, exist_ok=True)
     output_file_path = os.path.join(new_video_path, "video.mp4")
     old_video_path = old_video_path.replace(" ", "\\ ")
-    if getattr(sys, "frozen", False) and hasattr(sys, "_MEIPASS"):
-        if system() == "Darwin":
-            ffmpeg_path = Path(sys._MEIPASS) / "ffmpeg" / "ffmpeg"
-        elif system() == "Windows":
-            ffmpeg_path = Path(sys._MEIPASS) / "ffmpeg" / "ffmpeg.exe"
-    else:
-        if system() == "Darwin":
-            ffmpeg_path = "ffmpeg"
-        elif system() == "Windows":
-            ffmpeg_path = Path(__file__).parent.parent / "ffmpeg.exe"
+    ffmpeg_path = get_ffmpeg_path()
     if system() == "Darwin":
         command = f"{ffmpeg_path} -ss {start_time} -to {end_time} -i {old_video_path} -c copy {output_file_path}"
     else:
@@ -504,6 +510,43 @@ def cut_video(
         return False
 
 
+def stream_copy_clip(
+    video_path: str, output_path: str, start_time: float, end_time: float
+):
+    """
+    Cut [start_time, end_time) out of the video without re-encoding.
+    The copy starts at the keyframe before start_time, the mp4 edit list
+    makes players start at start_time.
+    """
+    command = [
+        str(get_ffmpeg_path()),
+        "-y",
+        "-loglevel",
+        "error",
+        "-ss",
+        f"{start_time:.3f}",
+        "-to",
+        f"{end_time:.3f}",
+        "-i",
+        str(video_path),
+        "-c",
+        "copy",
+        "-an",
+        str(output_path),
+    ]
+    try:
+        result = subprocess.run(
+            command, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+        )
+    except OSError as e:
+        logger.error(f"Error running ffmpeg: {e}")
+        return False
+    if result.returncode != 0:
+        logger.error(f"FFmpeg Error: {result.stderr}")
+        return False
+    return True
+
+
 def get_key_name(key):
     if isinstance(key, KeyCode):
         if key.char is None:
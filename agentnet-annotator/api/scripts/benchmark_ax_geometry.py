@@ -0,0 +1,77 @@
+"""
+Micro-benchmark of AXFrame parsing on saved AXValue repr strings, runs off macOS.
+
+    python scripts/benchmark_ax_geometry.py [reprs.txt] [--repeat N]
+
+reprs.txt holds one repr(AXValue) per line, built-in samples are used
+without it.
+"""
+
+import os
+import re
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, "../"))
+sys.path.append(parent_dir)
+from core.a11y.ax_geometry import parse_ax_value_repr
+
+SAMPLE_REPRS = [
+    "<AXValue 0x600003d9c3c0> {value = x:0.000000 y:25.000000 w:1440.000000 h:875.000000 type = kAXValueCGRectType}",
+    "<AXValue 0x600003d9c480> {value = x:-1.500000 y:-38.000000 w:26.000000 h:26.000000 type = kAXValueCGRectType}",
+    "<AXValue 0x600003d9c4e0> {value = x:718.000000 y:412.500000 type = kAXValueCGPointType}",
+    "<AXValue 0x600003d9c540> {value = w:320.000000 h:48.000000 type = kAXValueCGSizeType}",
+    "<AXValue 0x600003d9c5a0> {value = location:0 length:12 type = kAXValueCFRangeType}",
+]
+
+
+def parse_with_searches(rep: str) -> dict:
+    """
+    The parser used before: one re.search per field
+    """
+    x_value = re.search(r"x:(-?[\d.]+)", rep)
+    y_value = re.search(r"y:(-?[\d.]+)", rep)
+    w_value = re.search(r"w:(-?[\d.]+)", rep)
+    h_value = re.search(r"h:(-?[\d.]+)", rep)
+    type_value = re.search(r"type\s?=\s?(\w+)", rep)
+    return {
+        "x": float(x_value.group(1)) if x_value else None,
+        "y": float(y_value.group(1)) if y_value else None,
+        "w": float(w_value.group(1)) if w_value else None,
+        "h": float(h_value.group(1)) if h_value else None,
+        "type": type_value.group(1) if type_value else None,
+    }
+
+
+def benchmark(parse, reprs, repeat):
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        for rep in reprs:
+            parse(rep)
+    return (time.perf_counter() - start_time) / (repeat * len(reprs))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark AXValue repr parsing.")
+    parser.add_argument("reprs", nargs="?", help="file with one AXValue repr per line")
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    reprs = SAMPLE_REPRS
+    if args.reprs:
+        with open(args.reprs, "r", encoding="utf-8") as f:
+            reprs = [line.strip() for line in f if line.strip()]
+
+    for rep in reprs:
+        if parse_ax_value_repr(rep) != parse_with_searches(rep):
+            raise SystemExit(f"Parsers disagree on: {rep}")
+
+    searches_time = benchmark(parse_with_searches, reprs, args.repeat)
+    single_pass_time = benchmark(parse_ax_value_repr, reprs, args.repeat)
+    print(f"{len(reprs)} reprs x {args.repeat}")
+    print(f"re.search per field: {searches_time * 1e6:.2f} us/value")
+    print(f"single pass:         {single_pass_time * 1e6:.2f} us/value")
+    print(f"speedup:             {searches_time / single_pass_time:.2f}x")
@@ -0,0 +1,98 @@
+"""
+Throughput of the macOS AXTree walk on a fake in-memory tree, runs off macOS.
+
+    python scripts/benchmark_ax_walker.py [--depth D] [--fanout F] [--latency SECONDS]
+
+Every backend call sleeps --latency seconds, like the round trip to the
+app being read. The walk is timed reading every attribute with its own
+call and reading all the attributes of a node in one call.
+"""
+
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, "../"))
+sys.path.append(parent_dir)
+from core.a11y.ax_backend import FakeAXBackend, FakeAXElement, walk_ax_tree
+
+# the reserved keys of core/a11y/_darwin.py
+ATTRIBUTES = [
+    "AXEnabled",
+    "AXFocused",
+    "AXFullScreen",
+    "AXTitle",
+    "AXChildrenInNavigationOrder",
+    "AXChildren",
+    "AXFrame",
+    "AXRole",
+    "AXHelp",
+    "AXRoleDescription",
+    "AXSubrole",
+    "AXURL",
+    "AXValue",
+    "AXDescription",
+    "AXDOMIdentifier",
+    "AXSelected",
+    "AXInvalid",
+    "AXRows",
+    "AXColumns",
+]
+CHILDREN_KEY = "AXColumns"
+BBOX = (0, 0, 1440, 900)
+
+
+def build_fake_tree(depth: int, fanout: int, index: int = 0) -> FakeAXElement:
+    """
+    Full tree of fake elements, children listed under AXChildren and
+    AXChildrenInNavigationOrder like real apps do
+    """
+    children = []
+    if depth > 0:
+        children = [build_fake_tree(depth - 1, fanout, i) for i in range(fanout)]
+    return FakeAXElement(
+        {
+            "AXEnabled": True,
+            "AXFocused": False,
+            "AXTitle": f"element {index}",
+            "AXChildren": children,
+            "AXChildrenInNavigationOrder": list(children),
+            "AXFrame": {"x": 10.0 * index, "y": 20.0, "w": 100.0, "h": 24.0,
+                        "type": "kAXValueCGRectType"},
+            "AXRole": "AXGroup" if children else "AXButton",
+            "AXRoleDescription": "group" if children else "button",
+            "AXDescription": "",
+        }
+    )
+
+
+def benchmark(root, latency: float, batch: bool):
+    backend = FakeAXBackend(call_latency=latency)
+    start_time = time.perf_counter()
+    tree, switched, walker = walk_ax_tree(
+        root, BBOX, backend, ATTRIBUTES, CHILDREN_KEY, batch=batch, max_calls=10**6
+    )
+    return tree, walker.call_num, backend.call_num, time.perf_counter() - start_time
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the AXTree walk.")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--fanout", type=int, default=6)
+    parser.add_argument("--latency", type=float, default=0.0002)
+    args = parser.parse_args()
+
+    root = build_fake_tree(args.depth, args.fanout)
+    results = {}
+    for label, batch in (("per attribute", False), ("batched", True)):
+        tree, node_num, call_num, elapsed = benchmark(root, args.latency, batch)
+        results[label] = tree
+        print(
+            f"{label:14s} {node_num} nodes, {call_num} calls, "
+            f"{elapsed:.3f}s, {node_num / elapsed:.0f} nodes/s"
+        )
+    if results["per attribute"] != results["batched"]:
+        raise SystemExit("Walks disagree")
@@ -0,0 +1,120 @@
+"""
+Time to resolve clicks on recorded element dumps with DarwinElementIndex,
+which parse_elements uses, against building and scoring a
+DarwinElementDescriber tree per click, runs off macOS.
+
+    python scripts/benchmark_element_scoring.py [DUMP ...] [--clicks N]
+
+A dump is a recording folder, whose element.jsonl trees are read, or a JSON
+file of one tree. Without dumps core/a11y/Element/test.json is used. Every
+tree is clicked at the center of up to --clicks of its frames, and the
+index has to pick the same target as the describer.
+"""
+
+import copy
+import json
+import os
+import sys
+import time
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.abspath(os.path.join(current_dir, "../"))
+sys.path.append(parent_dir)
+from core.a11y.Element.DarwinElementDescriber import DarwinElementDescriber
+from core.a11y.Element.DarwinElementIndex import DarwinElementIndex
+
+DEFAULT_DUMP = os.path.join(parent_dir, "core", "a11y", "Element", "test.json")
+
+
+def load_trees(path: str) -> list:
+    if os.path.isdir(path):
+        # read_encrypted_jsonl, without the dependencies of core.utils
+        with open(os.path.join(path, "element.jsonl"), "r", encoding="utf-8") as f:
+            element_data = [json.loads(line) for line in f if line.strip()]
+        return [row["a11y_tree"] for row in element_data if isinstance(row.get("a11y_tree"), dict)]
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.load(f)]
+
+
+def click_points(tree: dict, click_num: int) -> list:
+    """
+    Centers of the first click_num frames of tree, in preorder
+    """
+    points = []
+    stack = [tree]
+    while stack and len(points) < click_num:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        frame = node.get("AXFrame")
+        if isinstance(frame, dict) and None not in (frame.get("w"), frame.get("h")):
+            points.append((frame["x"] + frame["w"] / 2, frame["y"] + frame["h"] / 2))
+        for key in ("AXChildren", "AXChildrenInNavigationOrder", "AXVisibleChildren", "AXRows"):
+            stack.extend(reversed(node.get(key) or []))
+    return points
+
+
+def score(tree: dict, x: float, y: float):
+    """
+    Target of the describer, the build and the scoring time
+    """
+    tree = copy.deepcopy(tree)
+    start_time = time.perf_counter()
+    describer = DarwinElementDescriber(x, y).build_from_json(tree, rule="general")
+    build_time = time.perf_counter()
+    describer.calculate_score()
+    target = describer.find_most_score_node()
+    score_time = time.perf_counter()
+    return target.to_dict(), build_time - start_time, score_time - build_time
+
+
+def index_targets(tree: dict, points: list):
+    """
+    Targets of the index at points, the build and the resolving time
+    """
+    start_time = time.perf_counter()
+    index = DarwinElementIndex(tree)
+    build_time = time.perf_counter()
+    targets = [index.target(x, y) for x, y in points]
+    return targets, build_time - start_time, time.perf_counter() - build_time
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the element describer scoring.")
+    parser.add_argument("dumps", nargs="*", default=[DEFAULT_DUMP])
+    parser.add_argument("--clicks", type=int, default=20)
+    args = parser.parse_args()
+
+    trees = [tree for path in args.dumps for tree in load_trees(path)]
+    elapsed = {
+        "describer build": 0.0,
+        "describer scoring": 0.0,
+        "index build": 0.0,
+        "index resolve": 0.0,
+    }
+    click_num = mismatch_num = 0
+    for tree in trees:
+        points = click_points(tree, args.clicks)
+        targets, build_time, resolve_time = index_targets(tree, points)
+        elapsed["index build"] += build_time
+        elapsed["index resolve"] += resolve_time
+        for (x, y), index_target in zip(points, targets):
+            target, build_time, score_time = score(tree, x, y)
+            elapsed["describer build"] += build_time
+            elapsed["describer scoring"] += score_time
+            click_num += 1
+            if index_target != target:
+                mismatch_num += 1
+                print(f"Targets differ at ({x}, {y}): {index_target} != {target}")
+
+    print(f"{len(trees)} trees, {click_num} clicks")
+    for label, seconds in elapsed.items():
+        print(f"{label:18s} {seconds:.3f}s")
+    describer_time = elapsed["describer build"] + elapsed["describer scoring"]
+    index_time = elapsed["index build"] + elapsed["index resolve"]
+    if index_time:
+        print(f"speedup            {describer_time / index_time:.1f}x")
+    if mismatch_num:
+        raise SystemExit(f"{mismatch_num} targets differ")
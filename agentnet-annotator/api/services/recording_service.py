@@ -25,7 +25,7 @@ from core.utils import (
     check_recording_broken,
 )
 from core.backend_func import read_recording_status
-from core.constants import SUCCEED, FAILED
+from core.constants import SUCCEED, FAILED, VIDEO_OVERLAY_FILE
 
 
 class RecordingService:
@@ -42,6 +42,18 @@ class RecordingService:
         self.natural_scrolling_checkbox_checked = True
         self.generate_window_a11y = False
         self.generate_element_a11y = True
+        # "process_pool": time shards over spawned workers,
+        # "stream_copy": ffmpeg cuts without re-encoding, the player draws the overlays
+        self.clip_render_mode = "single_pass"
+        self.clip_workers = None  # process_pool workers, None: one per CPU core
+        self.online_reduction = False  # True: reduce events on the recorder thread while recording
+        self.events_fsync_interval = 0.2  # seconds of events a crash can lose
+        self.event_log_format = "jsonl"  # "binary": memory-mappable events.bin
+        self.trace_compression = None  # "rdp" or "time_bucket": lossy, see compress_trace
+        self.trace_max_error = 2.0  # pixels, for "rdp"
+        self.keyframe_cpu_budget = 0.1  # share of one core for keyframe detection
+        self.a11y_snapshot_mode = "full"  # "delta": base and delta a11y records, read with A11yTimeline
+        self.focus_tracking = "poll"  # "push": WinEvent hook on Windows, polls elsewhere
 
         # Setup reducer queue processing
         self.reducer_queue = Queue()
@@ -63,6 +75,11 @@ class RecordingService:
                 natural_scrolling=self.natural_scrolling_checkbox_checked,
                 generate_window_a11y=self.generate_window_a11y,
                 generate_element_a11y=self.generate_element_a11y,
+                fsync_interval=self.events_fsync_interval,
+                event_log_format=self.event_log_format,
+                keyframe_cpu_budget=self.keyframe_cpu_budget,
+                a11y_snapshot_mode=self.a11y_snapshot_mode,
+                focus_tracking=self.focus_tracking,
             )
             recording_path = self.recorder_thread.recording_path
 
@@ -73,9 +90,16 @@ class RecordingService:
                 configs={
                     "generate_window_a11y": self.generate_window_a11y,
                     "generate_element_a11y": self.generate_element_a11y,
+                    "clip_render_mode": self.clip_render_mode,
+                    "clip_workers": self.clip_workers,
+                    "trace_compression": self.trace_compression,
+                    "trace_max_error": self.trace_max_error,
                 },
             )
 
+            if self.online_reduction:
+                self.recorder_thread.set_online_reducer(self.reducer)
+
             # Handle task hub data if provided
             if task_hub_data:
                 self._save_task_hub_data(recording_path, task_hub_data)
@@ -195,10 +219,19 @@ class RecordingService:
             event = self.opened_single_recording["events"][int(event_index)]
             video_name = get_video_by_id(video_path=videos_folder_path, id=event["id"])
 
-            return SUCCEED, {
+            result = {
                 "success": "Video path retrieved successfully",
                 "path": os.path.join(videos_folder_path, video_name),
             }
+            # stream-copied clips carry their overlay in a sidecar
+            overlay_path = os.path.join(
+                os.path.dirname(videos_folder_path), VIDEO_OVERLAY_FILE
+            )
+            if os.path.exists(overlay_path):
+                overlay = read_encrypted_json(overlay_path).get(video_name)
+                if overlay is not None:
+                    result["overlay"] = overlay
+            return SUCCEED, result
 
         except Exception as e:
             logger.warning(f"RecordingService: get_video_path failed: {e}")
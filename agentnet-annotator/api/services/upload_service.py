@@ -1,5 +1,7 @@
 import threading
 import os
+import shutil
+import tempfile
 
 from queue import Queue
 
@@ -13,6 +15,8 @@ from core.utils import (
     get_apps,
 )
 from core.logger import logger
+from core.event_log import ensure_events_jsonl
+from core.a11y_snapshot import expand_a11y_snapshots
 from core.constants import SUCCEED, FAILED
 
 
@@ -26,12 +30,24 @@ def upload_recording(recording_name):
         upload_recording_name = timestamp + "_" + recording_name
 
         oss_path = "recordings/" + upload_recording_name
+        # recordings with a binary event log are uploaded with events.jsonl too
+        ensure_events_jsonl(recording_path)
+        # and with a full tree in every a11y record, expanded into a copy so
+        # that the recording keeps its delta encoded a11y.jsonl
+        expanded_dir = tempfile.mkdtemp(prefix="a11y_upload_")
+        expanded_path = os.path.join(expanded_dir, "a11y.jsonl")
+        replacements = {}
         # logger.warning(post_data)
 
         try:
+            if expand_a11y_snapshots(
+                os.path.join(recording_path, "a11y.jsonl"), expanded_path
+            ):
+                replacements["a11y.jsonl"] = expanded_path
             upload_folder_concurrent(
                 local_folder_path=recording_path,
-                remote_folder_path=oss_path
+                remote_folder_path=oss_path,
+                replacements=replacements,
             )
 
         except Exception as e:
@@ -41,6 +57,8 @@ def upload_recording(recording_name):
                 "recording_name": recording_name,
                 "message": f"Upload_recording failed: \n{str(e)}.",
             }
+        finally:
+            shutil.rmtree(expanded_dir, ignore_errors=True)
 
         logger.info(f"Successfully upload {recording_name}.")
 
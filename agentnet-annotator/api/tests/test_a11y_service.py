@@ -0,0 +1,104 @@
+import json
+
+import pytest
+
+import core.a11y_service
+from core.a11y.focus import FakeFocusSource
+from core.a11y_service import A11yService
+from core.jsonl_writer import JsonlWriter
+
+
+class FakeDesktop:
+    """
+    Foreground window of the tests, read by the A11yService queries
+    """
+
+    def __init__(self, name: str, key=1):
+        self.name = name
+        self.key = key
+        self.name_reads = 0
+
+    def get_top_window_name(self):
+        self.name_reads += 1
+        return self.name
+
+    def get_top_window(self):
+        return {"kCGWindowOwnerName": self.name}
+
+    def get_foreground_key(self):
+        return self.key
+
+
+@pytest.fixture
+def desktop(monkeypatch):
+    desktop = FakeDesktop("Finder")
+    monkeypatch.setattr(core.a11y_service, "get_top_window_name", desktop.get_top_window_name)
+    monkeypatch.setattr(core.a11y_service, "get_top_window", desktop.get_top_window)
+    monkeypatch.setattr(core.a11y_service, "get_foreground_key", desktop.get_foreground_key)
+    return desktop
+
+
+@pytest.fixture
+def service(desktop):
+    focus_source = FakeFocusSource()
+    service = A11yService(focus_source, ttl=60.0)
+    service.start()
+    yield service
+    service.stop()
+
+
+def test_subscribe_delivers_current_name(service):
+    calls = []
+    service.subscribe_top_window(lambda time_stamp, name: calls.append(name))
+    assert calls == ["Finder"]
+
+
+def test_repeated_names_are_deduplicated(service):
+    calls = []
+    service.subscribe_top_window(lambda time_stamp, name: calls.append((time_stamp, name)))
+    service.focus_source.emit("Finder", 1.0)
+    service.focus_source.emit("Safari", 2.0)
+    service.focus_source.emit("Safari", 3.0)
+    service.focus_source.emit("Finder", 4.0)
+    assert [name for _, name in calls] == ["Finder", "Safari", "Finder"]
+    assert [time_stamp for time_stamp, _ in calls[1:]] == [2.0, 4.0]
+
+
+def test_focus_change_invalidates_cache(service, desktop):
+    assert service.top_window_name() == "Finder"
+    assert service.top_window_name() == "Finder"
+    assert desktop.name_reads == 1
+
+    # the foreground key has not changed yet, only the focus source knows
+    desktop.name = "Safari"
+    service.focus_source.emit("Safari")
+    assert service.top_window_name() == "Safari"
+    assert service.top_window() == {"kCGWindowOwnerName": "Safari"}
+    assert desktop.name_reads == 2
+
+
+def test_focus_changes_reach_top_window_jsonl(service, monkeypatch, tmp_path):
+    pytest.importorskip("pynput")
+    import core.a11y_listener
+    from core.a11y_listener import A11yListener
+
+    # no mouse hook, only the top window subscription of the listener
+    monkeypatch.setattr(core.a11y_listener.mouse, "Listener", lambda on_click: None)
+    listener = A11yListener(False, False, service)
+    service.subscribe_top_window(listener._on_top_window)
+    service.focus_source.emit("Safari", 12.5)
+    service.focus_source.emit("Safari", 13.0)
+    service.focus_source.emit("Terminal", 14.25)
+    service.unsubscribe_top_window(listener._on_top_window)
+
+    path = tmp_path / "top_window.jsonl"
+    writer = JsonlWriter(str(path))
+    # drain_queue of the recorder
+    while not listener.top_window_queue.empty():
+        writer.write(listener.top_window_queue.get_nowait())
+    writer.close()
+
+    with open(path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [record["top_window_name"] for record in records] == ["Finder", "Safari", "Terminal"]
+    assert [record["time_stamp"] for record in records[1:]] == [12.5, 14.25]
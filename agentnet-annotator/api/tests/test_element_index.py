@@ -0,0 +1,48 @@
+import copy
+import json
+import os
+
+import pytest
+
+from core.a11y.Element.DarwinElementDescriber import DarwinElementDescriber
+from core.a11y.Element.DarwinElementIndex import DarwinElementIndex
+
+TEST_DUMP = os.path.join(
+    os.path.dirname(__file__), "..", "core", "a11y", "Element", "test.json"
+)
+
+
+def frame_centers(tree: dict) -> list:
+    centers = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        frame = node.get("AXFrame")
+        if isinstance(frame, dict) and None not in (frame.get("w"), frame.get("h")):
+            centers.append((frame["x"] + frame["w"] / 2, frame["y"] + frame["h"] / 2))
+        for key in ("AXChildren", "AXChildrenInNavigationOrder", "AXVisibleChildren", "AXRows"):
+            stack.extend(child for child in node.get(key) or [] if isinstance(child, dict))
+    return centers
+
+
+def describer_target(tree: dict, x: float, y: float) -> dict:
+    describer = DarwinElementDescriber(x, y).build_from_json(
+        copy.deepcopy(tree), rule="general"
+    )
+    describer.calculate_score()
+    return describer.find_most_score_node().to_dict()
+
+
+@pytest.fixture(scope="module")
+def tree():
+    with open(TEST_DUMP, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_index_matches_describer(tree):
+    index = DarwinElementIndex(tree)
+    # every frame center, and clicks between and outside the frames
+    points = frame_centers(tree)
+    points += [(x, y) for x in range(-50, 1500, 150) for y in range(-50, 1000, 150)]
+    for x, y in points:
+        assert index.target(x, y) == describer_target(tree, x, y), (x, y)
@@ -0,0 +1,92 @@
+import numpy as np
+
+from core.frame_diff import TiledFrameDiffer
+
+HEIGHT, WIDTH = 600, 840
+
+
+def full_frame_ratio(img1, img2):
+    """
+    The ratio KeyFrameDetector computed before TiledFrameDiffer
+    """
+    rows, cols, _ = img1.shape
+    # To avoid the Notification window
+    img1 = img1[int(0.33 * rows) :, : cols - 200]
+    img2 = img2[int(0.33 * rows) :, : cols - 200]
+    changed_pixels = np.sum(np.any(img1 != img2, axis=-1))
+    total_pixels = img1.shape[0] * img1.shape[1]
+    return changed_pixels / max(1000000, total_pixels)
+
+
+def diff_ratio(differ, previous, current):
+    assert differ.update(previous) is None
+    return differ.update(current)
+
+
+def random_frame(rng):
+    return rng.integers(0, 256, (HEIGHT, WIDTH, 4), dtype=np.uint8)
+
+
+def changed_frames(rng, align: int = 1):
+    """
+    A frame and the same frame with a few rectangles redrawn, their corners
+    and sizes multiples of align in the compared region
+    """
+    previous = random_frame(rng)
+    current = previous.copy()
+    top_crop = int(0.33 * HEIGHT)
+    for _ in range(rng.integers(1, 5)):
+        top = top_crop + rng.integers(0, (HEIGHT - top_crop - 40) // align) * align
+        left = rng.integers(0, (WIDTH - 240) // align) * align
+        height = rng.integers(1, 200 // align) * align
+        width = rng.integers(1, 200 // align) * align
+        # the gray levels of random pixels are far from 0 most of the time
+        current[top : top + height, left : left + width] = 0
+    return previous, current
+
+
+def test_matches_full_frame_ratio():
+    rng = np.random.default_rng(0)
+    differ = TiledFrameDiffer()
+    step = differ._step(differ._region(random_frame(rng)))
+    for _ in range(20):
+        # changes covering whole sample cells are all seen
+        previous, current = changed_frames(rng, align=step)
+        ratio = diff_ratio(TiledFrameDiffer(), previous, current)
+        assert ratio == full_frame_ratio(previous, current)
+
+
+def test_never_above_full_frame_ratio():
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        previous, current = changed_frames(rng)
+        ratio = diff_ratio(TiledFrameDiffer(), previous, current)
+        assert ratio <= full_frame_ratio(previous, current)
+
+
+def test_identical_frames():
+    frame = random_frame(np.random.default_rng(2))
+    assert diff_ratio(TiledFrameDiffer(), frame, frame.copy()) == 0
+
+
+def test_change_between_samples_is_missed():
+    differ = TiledFrameDiffer(grid_width=80)
+    previous = np.zeros((HEIGHT, WIDTH, 4), dtype=np.uint8)
+    current = previous.copy()
+    step = differ._step(differ._region(previous))
+    assert step == 8
+    # a caret one pixel wide, between two sample columns
+    top = int(0.33 * HEIGHT) + 10
+    current[top : top + 20, step + step // 2] = 255
+    assert full_frame_ratio(previous, current) > 0
+    assert differ.update(previous) is None
+    assert differ.update(current) == 0
+
+
+def test_same_luminance_is_missed():
+    previous = np.zeros((HEIGHT, WIDTH, 4), dtype=np.uint8)
+    current = previous.copy()
+    # +1 blue is below one gray level
+    current[int(0.33 * HEIGHT) :, :, 0] = 1
+    assert full_frame_ratio(previous, current) > 0
+    assert diff_ratio(TiledFrameDiffer(), previous, current) == 0
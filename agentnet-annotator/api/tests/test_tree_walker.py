@@ -0,0 +1,97 @@
+import threading
+import time
+
+from core.a11y.tree_walker import CAPTURE_POOL, ELEMENT_POOL, TreeWalker
+
+LATENCY = 0.005  # seconds per node read, like the round trip to the app
+
+
+def slow_tree_walker(
+    fanout: int, depth: int, time_budget: float, pool_name: str = CAPTURE_POOL
+) -> TreeWalker:
+    """
+    Walker over a full tree of tuples, every node read taking LATENCY
+    """
+
+    def visit(node, node_depth):
+        time.sleep(LATENCY)
+        children = [node + (i,) for i in range(fanout)] if len(node) < depth else []
+        return {"id": node, "children": []}, children
+
+    def attach(data, children):
+        data["children"] = children
+
+    return TreeWalker(
+        visit, attach, max_calls=10**6, time_budget=time_budget, pool_name=pool_name
+    )
+
+
+def count_nodes(tree: dict) -> int:
+    return 1 + sum(count_nodes(child) for child in tree["children"])
+
+
+def overlapping_walks(capture: TreeWalker, element: TreeWalker) -> dict:
+    """
+    Trees of the two walks, element starting while capture is running
+    """
+    trees = {}
+
+    def walk(name, walker):
+        trees[name] = walker.walk(())
+
+    capture_thread = threading.Thread(target=walk, args=("capture", capture))
+    capture_thread.start()
+    time.sleep(0.05)
+    element_thread = threading.Thread(target=walk, args=("element", element))
+    element_thread.start()
+    capture_thread.join()
+    element_thread.join()
+    return trees
+
+
+def test_overlapping_walks_complete():
+    # a long window capture is running when a click asks for its element
+    capture = slow_tree_walker(fanout=6, depth=4, time_budget=30.0)
+    element = slow_tree_walker(fanout=5, depth=2, time_budget=0.5)
+    trees = overlapping_walks(capture, element)
+
+    assert count_nodes(trees["capture"]) == 1 + 6 + 6**2 + 6**3 + 6**4
+    assert not capture.timed_out
+    assert count_nodes(trees["element"]) == 1 + 5 + 5**2
+    assert not element.timed_out
+
+
+def test_element_pool_does_not_wait_for_capture():
+    capture = slow_tree_walker(fanout=6, depth=4, time_budget=30.0)
+    element = slow_tree_walker(
+        fanout=5, depth=2, time_budget=0.5, pool_name=ELEMENT_POOL
+    )
+    start_time = time.perf_counter()
+    trees = {}
+    element_time = {}
+
+    def walk_element():
+        trees["element"] = element.walk(())
+        element_time["elapsed"] = time.perf_counter() - start_time
+
+    capture_thread = threading.Thread(
+        target=lambda: trees.setdefault("capture", capture.walk(()))
+    )
+    capture_thread.start()
+    time.sleep(0.05)
+    element_thread = threading.Thread(target=walk_element)
+    element_thread.start()
+    element_thread.join()
+    assert count_nodes(trees["element"]) == 1 + 5 + 5**2
+    assert not element.timed_out
+    # 31 nodes over 8 threads of its own, the capture still running
+    assert capture_thread.is_alive()
+    capture_thread.join()
+    assert count_nodes(trees["capture"]) == 1 + 6 + 6**2 + 6**3 + 6**4
+
+
+def test_time_budget_truncates():
+    walker = slow_tree_walker(fanout=6, depth=4, time_budget=0.1)
+    tree = walker.walk(())
+    assert walker.timed_out
+    assert 1 <= count_nodes(tree) < 1 + 6 + 6**2 + 6**3 + 6**4
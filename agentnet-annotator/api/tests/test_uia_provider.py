@@ -0,0 +1,84 @@
+from core.a11y.uia_provider import FakeControl, FakeControlProvider, walk_control_tree
+
+
+class OrderedProvider(FakeControlProvider):
+    """
+    FakeControlProvider keeping the names of the controls in read order
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.read_names = []
+
+    def read(self, control):
+        with self.lock:
+            self.read_names.append(control.name)
+        return super().read(control)
+
+
+def control_tree(fanout: int, depth: int, name: str = "0") -> FakeControl:
+    children = []
+    if depth > 0:
+        children = [
+            control_tree(fanout, depth - 1, f"{name}.{i}") for i in range(fanout)
+        ]
+    return FakeControl(name, children=children)
+
+
+def tree_names(tree: dict) -> list:
+    names = [tree["Name"]]
+    for child in tree["Children"]:
+        names.extend(tree_names(child))
+    return names
+
+
+def max_depth(tree: dict) -> int:
+    return max([max_depth(child) for child in tree["Children"]], default=tree["Depth"])
+
+
+def test_full_tree():
+    provider = FakeControlProvider()
+    tree, walker = walk_control_tree(control_tree(3, 3), provider)
+    assert len(tree_names(tree)) == 1 + 3 + 9 + 27
+    assert provider.call_num == 1 + 3 + 9 + 27
+    assert max_depth(tree) == 3
+    assert tree["ControlType"] == "PaneControl"
+    assert not walker.truncated and not walker.timed_out
+
+
+def test_breadth_first_order():
+    provider = OrderedProvider()
+    tree, _ = walk_control_tree(control_tree(2, 3), provider, workers=1)
+    depths = [name.count(".") for name in provider.read_names]
+    assert depths == sorted(depths)
+    # the children keep their order under their parent
+    assert [child["Name"] for child in tree["Children"]] == ["0.0", "0.1"]
+    assert [child["Name"] for child in tree["Children"][1]["Children"]] == ["0.1.0", "0.1.1"]
+
+
+def test_depth_limit():
+    tree, walker = walk_control_tree(control_tree(2, 5), FakeControlProvider(), max_depth=2)
+    assert max_depth(tree) == 2
+    assert len(tree_names(tree)) == 1 + 2 + 4
+    assert walker.truncated
+
+
+def test_width_limit():
+    tree, walker = walk_control_tree(control_tree(10, 2), FakeControlProvider(), max_width=4)
+    assert [len(child["Children"]) for child in tree["Children"]] == [4] * 4
+    assert walker.truncated
+
+
+def test_call_limit():
+    provider = FakeControlProvider()
+    tree, walker = walk_control_tree(control_tree(5, 4), provider, max_calls=50)
+    assert len(tree_names(tree)) == 50
+    assert provider.call_num == 50
+    assert walker.truncated and not walker.timed_out
+
+
+def test_time_budget_marks_partial():
+    provider = FakeControlProvider(call_latency=0.01)
+    tree, walker = walk_control_tree(control_tree(4, 4), provider, time_budget=0.05)
+    assert len(tree_names(tree)) < 1 + 4 + 16 + 64 + 256
+    assert walker.timed_out and walker.truncated
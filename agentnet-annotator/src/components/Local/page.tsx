@@ -54,6 +54,7 @@ import ClearIcon from "@mui/icons-material/Clear";
 import { useMain } from "../../context/MainContext";
 import "react-edit-text/dist/index.css";
 import EditableText from "../utils/EditableTextArea";
+import VideoOverlay, { VideoOverlayDict } from "../utils/VideoOverlay";
 import { SERVER_URL } from "../../public/constant";
 import ReactJson from "@microlink/react-json-view";
 const ReactPlayer = _ReactPlayer as unknown as React.FC<ReactPlayerProps>;
@@ -254,6 +255,8 @@ const Page = () => {
     const [scrollDelta, setScrollDelta] = useState<number>(0);
     const [videoClipSrcDict, setVideoClipSrcDict] = useState<VideoDict>({});
     const [videoClipSrc, setVideoClipSrc] = useState("");
+    const [videoOverlayDict, setVideoOverlayDict] = useState<VideoOverlayDict>({});
+    const [clipTime, setClipTime] = useState(0);
     const [fullVideoSrc, setFullVideoSrc] = useState("");
     const [openSnackbar, setOpenSnackbar] = useState(false);
     const [message, setMessage] = useState("");
@@ -322,6 +325,10 @@ const Page = () => {
         }
     }, [videoClipSrcDict, activeStep]);
 
+    useEffect(() => {
+        setClipTime(0);
+    }, [videoClipSrc]);
+
     useEffect(() => {
         console.log(recordingData);
         setRecordingName(recordingData.recording_name as string);
@@ -366,6 +373,13 @@ const Page = () => {
                     ...prevDict,
                     [index]: path,
                 }));
+                // stream-copied clips come with the overlay to draw over them
+                if (resjson.overlay) {
+                    setVideoOverlayDict((prevDict) => ({
+                        ...prevDict,
+                        [path]: resjson.overlay,
+                    }));
+                }
             } catch (error) {
                 console.error("Error fetching video:", error);
             }
@@ -392,6 +406,7 @@ const Page = () => {
         };
         if (recordingName != "") {
             setVideoClipSrcDict({});
+            setVideoOverlayDict({});
             // TODO: fetch based on needs
             for (let i = 0; i < eventsList.length; i++) {
                 fetchVideoClip(i);
@@ -1407,19 +1422,39 @@ const Page = () => {
                                                 variant="plain"
                                                 maxHeight="70vh"
                                             >
-                                                <ReactPlayer
-                                                    url={`file:///${videoClipSrc}`}
-                                                    controls={false}
+                                                <div
                                                     style={{
                                                         position: "absolute",
                                                         top: 0,
                                                         left: 0,
+                                                        width: "100%",
+                                                        height: "100%",
                                                     }}
-                                                    playing={playing}
-                                                    onEnded={handleVideoClipEnd}
-                                                    width="100%"
-                                                    height="100%"
-                                                />
+                                                >
+                                                    <ReactPlayer
+                                                        url={`file:///${videoClipSrc}`}
+                                                        controls={false}
+                                                        style={{
+                                                            position: "absolute",
+                                                            top: 0,
+                                                            left: 0,
+                                                        }}
+                                                        playing={playing}
+                                                        onEnded={handleVideoClipEnd}
+                                                        onProgress={({ playedSeconds }) =>
+                                                            setClipTime(playedSeconds)
+                                                        }
+                                                        progressInterval={50}
+                                                        width="100%"
+                                                        height="100%"
+                                                    />
+                                                    {videoOverlayDict[videoClipSrc] && (
+                                                        <VideoOverlay
+                                                            overlay={videoOverlayDict[videoClipSrc]}
+                                                            time={clipTime}
+                                                        />
+                                                    )}
+                                                </div>
                                             </AspectRatio>
                                         ) : (
                                             <p>No Video Support</p>
@@ -53,6 +53,7 @@ import ClearIcon from "@mui/icons-material/Clear";
 import { useMain } from "../../context/MainContext";
 import "react-edit-text/dist/index.css";
 import EditableText from "../utils/EditableTextArea";
+import VideoOverlay, { VideoOverlayDict } from "../utils/VideoOverlay";
 import { eventProp, Title2String } from "../Local/page";
 
 const ReactPlayer = _ReactPlayer as unknown as React.FC<ReactPlayerProps>;
@@ -83,6 +84,8 @@ const ReviewPage = () => {
     const [scrollDelta, setScrollDelta] = useState<number>(0);
     const [videoClipSrcDict, setVideoClipSrcDict] = useState<VideoDict>({});
     const [videoClipSrc, setVideoClipSrc] = useState("");
+    const [videoOverlayDict, setVideoOverlayDict] = useState<VideoOverlayDict>({});
+    const [clipTime, setClipTime] = useState(0);
     const [openSnackbar, setOpenSnackbar] = useState(false);
     const [message, setMessage] = useState("");
     const [severity, setSeverity] = useState("success"); // 'success', 'error', 'warning', 'neutral'
@@ -123,6 +126,10 @@ const ReviewPage = () => {
         }
     }, [videoClipSrcDict, activeStep]);
 
+    useEffect(() => {
+        setClipTime(0);
+    }, [videoClipSrc]);
+
     useEffect(() => {
         console.log(recordingData);
         setRecordingName(recordingData.recording_name as string);
@@ -156,12 +163,20 @@ const ReviewPage = () => {
                     ...prevDict,
                     [index]: path,
                 }));
+                // stream-copied clips come with the overlay to draw over them
+                if (resjson.overlay) {
+                    setVideoOverlayDict((prevDict) => ({
+                        ...prevDict,
+                        [path]: resjson.overlay,
+                    }));
+                }
             } catch (error) {
                 console.error("Error fetching video:", error);
             }
         };
         if (recordingName != "") {
             setVideoClipSrcDict({});
+            setVideoOverlayDict({});
             // TODO: fetch based on needs
             for (let i = 0; i < eventsList.length; i++) {
                 fetchVideoClip(i);
@@ -1196,19 +1211,39 @@ const ReviewPage = () => {
                                                 variant="plain"
                                                 maxHeight="70vh"
                                             >
-                                                <ReactPlayer
-                                                    url={`file:///${videoClipSrc}`}
-                                                    controls={false}
+                                                <div
                                                     style={{
                                                         position: "absolute",
                                                         top: 0,
                                                         left: 0,
+                                                        width: "100%",
+                                                        height: "100%",
                                                     }}
-                                                    playing={playing}
-                                                    onEnded={handleVideoClipEnd}
-                                                    width="100%"
-                                                    height="100%"
-                                                />
+                                                >
+                                                    <ReactPlayer
+                                                        url={`file:///${videoClipSrc}`}
+                                                        controls={false}
+                                                        style={{
+                                                            position: "absolute",
+                                                            top: 0,
+                                                            left: 0,
+                                                        }}
+                                                        playing={playing}
+                                                        onEnded={handleVideoClipEnd}
+                                                        onProgress={({ playedSeconds }) =>
+                                                            setClipTime(playedSeconds)
+                                                        }
+                                                        progressInterval={50}
+                                                        width="100%"
+                                                        height="100%"
+                                                    />
+                                                    {videoOverlayDict[videoClipSrc] && (
+                                                        <VideoOverlay
+                                                            overlay={videoOverlayDict[videoClipSrc]}
+                                                            time={clipTime}
+                                                        />
+                                                    )}
+                                                </div>
                                             </AspectRatio>
                                         ) : (
                                             <p>No Video Support</p>
@@ -0,0 +1,149 @@
+import * as React from "react";
+
+// Overlays of stream-copied clips, see Action.overlay_dump in the backend.
+// Points are in video pixels, "start"/"end" in seconds from the clip start.
+export interface OverlayShape {
+    shape: "circle" | "polyline" | "polygon" | "text" | "arrow";
+    color: string;
+    thickness?: number;
+    start?: number;
+    end?: number;
+    center?: number[];
+    radius?: number;
+    points?: number[][];
+    fill?: boolean;
+    text?: string;
+    origin?: number[];
+    font_scale?: number;
+    from?: number[];
+    to?: number[];
+    tip_length?: number;
+}
+
+export interface VideoOverlayData {
+    start_time: number;
+    end_time: number;
+    width: number;
+    height: number;
+    shapes: OverlayShape[];
+}
+
+export interface VideoOverlayDict {
+    [path: string]: VideoOverlayData;
+}
+
+// pixel height of a font_scale 1 cv2.FONT_HERSHEY_SIMPLEX line
+const FONT_SIZE = 30;
+// angle of the arrow tips, as drawn by cv2.arrowedLine
+const TIP_ANGLE = Math.PI / 4;
+
+const isVisible = (shape: OverlayShape, time: number) =>
+    (shape.start === undefined || shape.start <= time) &&
+    (shape.end === undefined || time < shape.end);
+
+const toPoints = (points: number[][]) =>
+    points.map((point) => point.join(",")).join(" ");
+
+const renderShape = (shape: OverlayShape, key: number) => {
+    const strokeWidth = shape.thickness ?? 1;
+    switch (shape.shape) {
+        case "circle":
+            return (
+                <circle
+                    key={key}
+                    cx={shape.center![0]}
+                    cy={shape.center![1]}
+                    r={shape.radius}
+                    fill="none"
+                    stroke={shape.color}
+                    strokeWidth={strokeWidth}
+                />
+            );
+        case "polyline":
+            return (
+                <polyline
+                    key={key}
+                    points={toPoints(shape.points!)}
+                    fill="none"
+                    stroke={shape.color}
+                    strokeWidth={strokeWidth}
+                />
+            );
+        case "polygon":
+            return (
+                <polygon
+                    key={key}
+                    points={toPoints(shape.points!)}
+                    fill={shape.fill ? shape.color : "none"}
+                    stroke={shape.color}
+                    strokeWidth={strokeWidth}
+                />
+            );
+        case "text":
+            // the origin is the bottom-left corner of the text, like cv2.putText
+            return (
+                <text
+                    key={key}
+                    x={shape.origin![0]}
+                    y={shape.origin![1]}
+                    fill={shape.color}
+                    fontSize={FONT_SIZE * (shape.font_scale ?? 1)}
+                    fontFamily="sans-serif"
+                    fontWeight={strokeWidth > 1 ? "bold" : "normal"}
+                >
+                    {shape.text}
+                </text>
+            );
+        case "arrow": {
+            const [x1, y1] = shape.from!;
+            const [x2, y2] = shape.to!;
+            const angle = Math.atan2(y1 - y2, x1 - x2);
+            const tipLength =
+                Math.hypot(x2 - x1, y2 - y1) * (shape.tip_length ?? 0.1);
+            const tip = (side: number) =>
+                [
+                    x2 + tipLength * Math.cos(angle + side * TIP_ANGLE),
+                    y2 + tipLength * Math.sin(angle + side * TIP_ANGLE),
+                ].join(",");
+            return (
+                <polyline
+                    key={key}
+                    points={`${x1},${y1} ${x2},${y2} ${tip(1)} ${x2},${y2} ${tip(-1)}`}
+                    fill="none"
+                    stroke={shape.color}
+                    strokeWidth={strokeWidth}
+                />
+            );
+        }
+        default:
+            return null;
+    }
+};
+
+// Draws the overlay of a clip over its player at the playback time (seconds)
+export default function VideoOverlay({
+    overlay,
+    time,
+}: {
+    overlay: VideoOverlayData;
+    time: number;
+}) {
+    return (
+        <svg
+            viewBox={`0 0 ${overlay.width} ${overlay.height}`}
+            preserveAspectRatio="xMidYMid meet"
+            style={{
+                position: "absolute",
+                top: 0,
+                left: 0,
+                width: "100%",
+                height: "100%",
+                pointerEvents: "none",
+            }}
+        >
+            {overlay.shapes.map((shape, key) =>
+                isVisible(shape, time) ? renderShape(shape, key) : null
+            )}
+        </svg>
+    );
+}